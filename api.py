@@ -0,0 +1,551 @@
+import os
+from pathlib import Path
+
+import scanner
+import journal
+import metrics
+import executor
+import normalize
+import collisions
+
+# the LIStA Excel template; bundled next to the modules, also in the executable
+TEMPLATE_PATH = Path(__file__).parent / 'template.xlsx'
+
+
+class ListaToolsError(Exception):
+    """Base class of the errors raised by the functions of this module, in addition to the OSError of the file system
+    and the errors of pandas when reading a DROID csv"""
+
+
+class ConflictError(ListaToolsError):
+    """Raised when planning with on_conflict='abort' if new names are taken. Nothing was changed
+
+    :param list[tuple[pathlib.Path, pathlib.Path, None]] conflicts: The source and the planned destination of every
+        move whose name is taken
+    """
+    def __init__(self, conflicts):
+        src, dst, _ = conflicts[0]
+        count = len(conflicts)
+        super().__init__(f"{count} new name{' is' if count == 1 else 's are'} already taken, e.g. {src} → {dst.name}")
+        self.conflicts = conflicts
+
+
+class JournalError(ListaToolsError):
+    """Raised by apply() if the journal can't be written, with the OSError as its cause. If apply() raises it, nothing
+    was changed; if it is raised while iterating, applying was stopped and can be continued with the journal"""
+
+
+class Plan:
+    """Planned renames or moves in a directory, see plan_clean_filenames(), plan_rename() and plan_exdir(). Nothing is
+    changed until the plan is applied with apply()
+
+    :param str command: Name of the command the plan is recorded as in the journal
+    :param pathlib.Path target_dir: The directory the plan changes
+    :param list[tuple[int, pathlib.Path, pathlib.Path, str]] changes: (ID, element, new element, type) for every
+        selected element, with all name collisions resolved; the new element is the element if it stays as it is
+    :param list[tuple[str, pathlib.Path, pathlib.Path | None]] operations: The operations as (kind, src, dst) in an
+        order they can be applied in; 'move' renames src to dst, 'rmdir' removes the directory src
+    :param list[tuple[pathlib.Path, pathlib.Path, pathlib.Path | None]] conflicts: The source, the planned destination
+        and the resolved destination of every move whose name was taken; None if it is skipped
+    :param int scanned: Number of elements that were read
+    """
+    def __init__(self, command, target_dir, changes, operations, conflicts=(), scanned=0):
+        self.command = command
+        self.target_dir = target_dir
+        self.changes = changes
+        self.operations = operations
+        self.conflicts = list(conflicts)
+        self.scanned = scanned
+
+    @classmethod
+    def from_journal(cls, state):
+        """Returns the plan of an interrupted command, to be continued with apply(plan, state=state)
+
+        :param journal.JournalState state: The journal of the command, see load_journal()
+        :return Plan: The plan, without changes
+        """
+        return cls(state.command, state.target_dir, [], state.operations)
+
+    def summary(self):
+        """Counts the changes by type of element, see preview.summary()
+
+        :return str: e.g. "3 elements will be renamed (2 File, 1 Directory), 5 stay the same"
+        """
+        import preview
+        return preview.summary(self.changes)
+
+    def write(self, dst):
+        """Writes all changes to a file, as JSON lines if the name ends with .jsonl and as csv otherwise
+
+        :param pathlib.Path dst: Path to the file
+        :raises OSError: If the file can't be written
+        """
+        import preview
+        writer = preview.PlanWriter(dst, self.target_dir)
+        try:
+            for change in self.changes:
+                writer.write(change)
+        finally:
+            writer.close()
+
+
+def scan(target_dir, recursive=False, element_filter=None, progress=None):
+    """Lists the elements of a directory
+
+    :param pathlib.Path target_dir: The directory
+    :param bool recursive: Also lists the elements of all subdirectories, ordered bottom-up so the elements of a
+        directory come before the directory itself. Renaming them in this order never renames a directory before its
+        elements
+    :param filters.Filter | None element_filter: Only returns the selected elements and doesn't read excluded
+        directories
+    :param typing.Callable[[int], None] | None progress: Called with the number of elements listed so far after every
+        directory
+    :raises OSError: If a directory can't be read
+    :return tuple[list[scanner.Entry], list[pathlib.Path]]: The selected elements and all elements that were listed,
+        whose names are taken
+    """
+    if not recursive:
+        listed = scanner.scan(target_dir)
+        entries = listed if element_filter is None else element_filter.apply(listed)
+        if progress is not None:
+            progress(len(listed))
+    else:
+        listed = []
+        entries = []
+        for _, directory_entries, subdirectories in scanner.walk(target_dir):
+            listed.extend(directory_entries)
+            if element_filter is not None:
+                directory_entries = element_filter.apply(directory_entries, subdirectories)
+            entries.extend(directory_entries)
+            if progress is not None:
+                progress(len(listed))
+        entries.reverse()  # every directory was listed before its elements
+    return entries, [entry.path for entry in listed]
+
+
+def plan_clean_filenames(target_dir, recursive=False, on_conflict='suffix', element_filter=None, progress=None,
+                         recorder=None):
+    """Plans to clean up the names of the elements of a directory, see normalize.clean_stems()
+
+    :param str | pathlib.Path target_dir: The absolute path to the directory, which the journal is found by
+    :param bool recursive: Also cleans up the names of all elements in subdirectories
+    :param str on_conflict: What happens if a new name is taken; one of collisions.POLICIES
+    :param filters.Filter | None element_filter: Only cleans up the names of the selected elements
+    :param typing.Callable[[int], None] | None progress: Called with the number of elements scanned so far after
+        every directory, see scan()
+    :param metrics.Metrics | None recorder: Records the time spent scanning and planning
+    :raises OSError: If a directory can't be read
+    :raises ConflictError: If on_conflict is 'abort' and new names are taken
+    :return Plan: The plan
+    """
+    target_dir = Path(target_dir)
+    recorder = recorder or metrics.Metrics()
+    with recorder.phase('scan'):
+        entries, existing = scan(target_dir, recursive, element_filter, progress)
+    with recorder.phase('plan'):
+        new_stems = normalize.clean_stems([entry.path.stem for entry in entries])
+        changes = [(idx, entry.path, entry.path.with_stem(new_stem), entry.type)
+                   for idx, (entry, new_stem) in enumerate(zip(entries, new_stems), 1)]
+        return _resolve_renames('clean-filenames', target_dir, changes, existing, on_conflict)
+
+
+def plan_rename(target_dir, prefix, on_conflict='suffix', element_filter=None, progress=None, recorder=None):
+    """Plans to add a prefix to the names of all elements of a directory
+
+    :param str | pathlib.Path target_dir: The absolute path to the directory, which the journal is found by
+    :param any prefix: The prefix to add
+    :param str on_conflict: What happens if a new name is taken; one of collisions.POLICIES
+    :param filters.Filter | None element_filter: Only renames the selected elements
+    :param typing.Callable[[int], None] | None progress: Called with the number of elements scanned, see scan()
+    :param metrics.Metrics | None recorder: Records the time spent scanning and planning
+    :raises OSError: If the directory can't be read
+    :raises ConflictError: If on_conflict is 'abort' and new names are taken
+    :return Plan: The plan
+    """
+    target_dir = Path(target_dir)
+    recorder = recorder or metrics.Metrics()
+    with recorder.phase('scan'):
+        entries, existing = scan(target_dir, element_filter=element_filter, progress=progress)
+    with recorder.phase('plan'):
+        changes = [(idx, entry.path, entry.path.with_name(f"{prefix}{entry.name}"), entry.type)
+                   for idx, entry in enumerate(entries, 1)]  # uses idx as ID; starts at 1
+        return _resolve_renames('rename', target_dir, changes, existing, on_conflict)
+
+
+def _resolve_renames(command, target_dir, changes, existing, on_conflict):
+    """Resolves the name collisions of planned renames and returns their plan"""
+    resolution = collisions.resolve([(src, dst) for _, src, dst, _ in changes], existing, on_conflict)
+    if resolution.conflicts and on_conflict == 'abort':
+        raise ConflictError(resolution.conflicts)
+    changes = [(idx, src, dst, element_type)
+               for (idx, src, _, element_type), dst in zip(changes, resolution.destinations)]
+    # in the order of the resolution, so names are freed before they are taken again
+    operations = [('move', changes[n][1], changes[n][2]) for n in resolution.order]
+    return Plan(command, target_dir, changes, operations, resolution.conflicts, len(existing))
+
+
+def plan_exdir(target_dir, recursion=True, on_conflict='suffix', element_filter=None, progress=None, recorder=None):
+    """Walks a directory once and plans to move the elements of its directories into it and to remove the directories
+    afterwards. An element in a directory gets the names of all directories above it in upper case as prefix, e.g.
+    ./a/b/c.txt → ./A_ B_ c.txt, which is the same result as extracting one layer at a time. Symlinks are moved like
+    files and never followed
+
+    :param str | pathlib.Path target_dir: The absolute path to the directory, which the journal is found by
+    :param bool recursion: If False, only the elements of the directories in the target directory are moved and their
+        subdirectories are kept as they are
+    :param str on_conflict: What happens if a new name is taken; one of collisions.POLICIES
+    :param filters.Filter | None element_filter: Only moves the selected elements. Excluded directories are not walked
+        and kept as they are; with recursion all other directories are walked, since they are removed and not moved
+    :param typing.Callable[[int], None] | None progress: Called with the number of elements scanned so far after
+        every directory
+    :param metrics.Metrics | None recorder: Records the time spent scanning and planning
+    :raises OSError: If a directory can't be read
+    :raises ConflictError: If on_conflict is 'abort' and new names are taken
+    :return Plan: The plan; scanned doesn't count the elements of the target directory itself
+    """
+    target_dir = Path(target_dir)
+    recorder = recorder or metrics.Metrics()
+    changes = []
+    directories = []
+    prefixes = {}  # the prefix of the elements of every directory that is walked
+    kept = set()  # directories with elements that are not moved
+    scanned = 0
+    # walking the directories and planning the moves are interleaved, so both count as 'scan'
+    with recorder.phase('scan'):
+        walk = scanner.walk(target_dir)
+        # files in the target directory are already where they need to be, so only its directories are walked
+        _, existing, subdirectories = next(walk)
+        if element_filter is not None:
+            subdirectories[:] = [entry for entry in subdirectories if not element_filter.excludes(entry.name)]
+        prefixes.update((entry.path, f"{entry.name.upper()}_ ") for entry in subdirectories)
+        for directory, entries, subdirectories in walk:
+            scanned += len(entries)
+            prefix = prefixes.pop(directory)
+            directories.append(directory)
+            for entry in entries:
+                if element_filter is not None and element_filter.excludes(entry.name):
+                    kept.add(directory)
+                elif recursion and entry.type == scanner.DIRECTORY:
+                    prefixes[entry.path] = f"{prefix}{entry.name.upper()}_ "
+                elif element_filter is None or element_filter.selects(entry):
+                    changes.append((len(changes) + 1, entry.path, target_dir / f"{prefix}{entry.name}", entry.type))
+                else:
+                    kept.add(directory)
+            if not recursion:
+                subdirectories.clear()  # moved as a whole
+            elif element_filter is not None:
+                subdirectories[:] = [entry for entry in subdirectories if entry.path in prefixes]
+            if progress is not None:
+                progress(scanned)
+
+    with recorder.phase('plan'):
+        resolution = collisions.resolve([(src, dst) for _, src, dst, _ in changes],
+                                        [entry.path for entry in existing], on_conflict)
+        if resolution.conflicts and on_conflict == 'abort':
+            raise ConflictError(resolution.conflicts)
+        changes = [(idx, src, dst, element_type)
+                   for (idx, src, _, element_type), dst in zip(changes, resolution.destinations)]
+        # the directories of skipped elements are not empty afterwards
+        kept.update(src.parent for src, _, resolved in resolution.conflicts if resolved is None)
+        # a directory is not empty afterwards if it or one of its subdirectories keeps an element
+        for directory in list(kept):
+            while directory.parent != target_dir and directory.parent not in kept:
+                directory = directory.parent
+                kept.add(directory)
+        # children come before their parents, so every directory is empty by the time it is removed; every directory
+        # was added before its subdirectories
+        operations = [('move', changes[n][1], changes[n][2]) for n in resolution.order]
+        operations += [('rmdir', directory, None) for directory in reversed(directories) if directory not in kept]
+    return Plan('exdir', target_dir, changes, operations, resolution.conflicts, scanned)
+
+
+def load_journal(target_dir, journal_dir):
+    """Reads the journal of the last command that changed a directory
+
+    :param str | pathlib.Path target_dir: The absolute path to the directory
+    :param pathlib.Path journal_dir: The directory the journals are kept in
+    :raises OSError: If the journal can't be read
+    :raises ListaToolsError: If the journal is damaged
+    :return journal.JournalState | None: The journal or None if there is none
+    """
+    jn = journal.Journal(journal.Journal.path_for(journal_dir, target_dir))
+    if not jn.path.exists():
+        return None
+    try:
+        return jn.load()
+    except (ValueError, KeyError, TypeError) as E:
+        raise ListaToolsError(f"The journal {jn.path} is damaged") from E
+
+
+def is_applied(kind, src, dst):
+    """Checks if an operation was already applied
+
+    :param str kind: 'move' or 'rmdir'
+    :param pathlib.Path src: The element that is moved or the directory that is removed
+    :param pathlib.Path | None dst: Where the element is moved to
+    :return bool: True if the operation was applied
+    """
+    if kind == 'move':
+        return not os.path.lexists(src) and os.path.lexists(dst)
+    return not os.path.lexists(src)
+
+
+def apply(plan, jobs=1, journal_dir=None, state=None, progress=None, recorder=None):
+    """Applies the operations of a plan while the returned iterator is consumed and yields the outcome of every
+    operation as soon as it is finished. An operation that fails doesn't stop the others, but a directory is not
+    removed if moving one of its elements failed.
+
+    With journal_dir, the plan is recorded in the journal of the target directory first, like the commands of
+    lista-tools do, and the progress is written to it at least every journal.BATCH_SIZE operations. An interrupted
+    run, e.g. because the iterator wasn't consumed to the end, can then be continued by passing the state returned by
+    load_journal() and an applied one undone with lista-tools undo
+
+    :param Plan plan: The plan
+    :param int jobs: Number of operations applied at the same time, see executor.run()
+    :param pathlib.Path | None journal_dir: The directory the journals are kept in; no journal is written if None
+    :param journal.JournalState | None state: The journal of an interrupted run, if it is continued
+    :param typing.Callable[[int, int], None] | None progress: Called with the number of finished operations and the
+        number of all operations after every operation
+    :param metrics.Metrics | None recorder: Records the time spent applying and writing the journal
+    :raises JournalError: If the plan can't be recorded in the journal, raised immediately, or, when iterating, if the
+        progress can't be
+    :return typing.Iterator[tuple[int, str | None, OSError | None]]: The index of every operation, 'applied', 'kept'
+        if it is a directory that is not removed or 'skipped' if it was applied by the interrupted run, and the error
+        it raised
+    """
+    recorder = recorder or metrics.Metrics()
+    operations = plan.operations
+    jn = journal.Journal(journal.Journal.path_for(journal_dir, plan.target_dir)) if journal_dir is not None else None
+    try:
+        with recorder.phase('journal'):
+            if jn is not None and state is None:
+                jn.start(plan.command, plan.target_dir, operations)
+            elif jn is not None:
+                jn.resume()
+    except OSError as OSE:
+        raise JournalError("An error occurred when writing the journal. No changes were made") from OSE
+    return _apply(operations, jobs, jn, state, progress, recorder)
+
+
+def _apply(operations, jobs, jn, state, progress, recorder):
+    """Applies the operations once the plan was recorded in the journal, see apply()"""
+    start, failed = (0, set()) if state is None else (state.done, state.failed)
+    keep = {operations[n][1].parent for n in failed}  # directories that can't be removed
+
+    def apply_operation(n):
+        """Runs on the threads of the executor; returns 'applied', 'kept' or 'skipped'"""
+        kind, src, dst = operations[n]
+        # the operations after the last progress written to the journal may already have been applied
+        if state is not None and n < start + journal.BATCH_SIZE and is_applied(kind, src, dst):
+            return 'skipped'
+        if kind == 'move':
+            src.rename(dst)
+        elif src in keep:  # moving one of its elements failed
+            return 'kept'
+        else:
+            src.rmdir()
+        return 'applied'
+
+    finished = bytearray(len(operations))
+    done = committed = start  # all operations before done are finished
+    # operations are only started up to one batch after the progress written to the journal, so at most one batch has
+    # to be checked when continuing
+    results = executor.run(operations, apply_operation, jobs, start, lambda: committed + journal.BATCH_SIZE)
+    try:
+        for count, (n, outcome, error) in enumerate(recorder.iterate('apply', results), start + 1):
+            if error is not None or outcome == 'kept':
+                keep.add(operations[n][1].parent)
+                if jn is not None:
+                    jn.fail(n)
+            yield n, outcome, error
+            if progress is not None:
+                progress(count, len(operations))
+            finished[n] = 1
+            while done < len(operations) and finished[done]:
+                done += 1
+            if jn is not None and done - committed >= journal.BATCH_SIZE // 2:
+                with recorder.phase('journal'):
+                    jn.commit(done)
+                committed = done
+        if jn is not None:
+            with recorder.phase('journal'):
+                jn.commit(len(operations))
+                jn.complete()
+    except OSError as OSE:
+        raise JournalError("An error occurred when writing the journal. Stopped to keep the journal accurate") \
+            from OSE
+    finally:
+        # also if the caller stops iterating; the running operations are finished first
+        results.close()
+        if jn is not None:
+            jn.close()
+
+
+def open_writer(dst, output_format='csv', template_path=TEMPLATE_PATH):
+    """Creates the output file of a DROID csv conversion
+
+    :param str | pathlib.Path dst: Path to the output file or, with the parquet format, the partition file of the
+        accession, see inventory.partition_path()
+    :param str output_format: One of template.FORMATS or 'parquet'
+    :param str | pathlib.Path template_path: Path to the LIStA Excel template, used with the xlsx format
+    :raises OSError: If the file can't be created
+    :raises zipfile.BadZipFile: If the template is not a valid xlsx file
+    :raises ImportError: If the format is parquet and pyarrow is not installed
+    :return template.CsvWriter | template.XlsxWriter | inventory.ParquetWriter: The writer
+    """
+    import template
+    import inventory
+    if output_format == 'parquet':
+        return inventory.ParquetWriter(Path(dst))
+    if output_format == 'xlsx':
+        return template.XlsxWriter(Path(template_path), Path(dst))
+    return template.CsvWriter(Path(dst))
+
+
+class DroidReader:
+    """Reads a DROID csv and yields its rows formatted like droid-csv writes them, chunk by chunk. The file is opened
+    right away, so an error opening it is raised before iterating
+
+    :param str | pathlib.Path src: Path to the DROID csv
+    :param int chunk_size: Number of rows read at a time
+    :param str engine: The csv parser to use; one of droid.ENGINES
+    :param str multi_format: How rows with multiple formats are folded; one of droid.MULTI_FORMAT_MODES
+    :param bool remove_folders: Whether to remove folders
+    :param bool paths: Adds the columns RELATIVE_PATH and DEPTH, rebuilt from ID and PARENT_ID in a first pass
+    :param droid.Hierarchy | None hierarchy: Adds the columns RELATIVE_PATH and DEPTH from a hierarchy that was already
+        read with droid.read_hierarchy(), e.g. to check its orphans first
+    :param filters.Filter | None element_filter: Only yields the rows of the selected elements
+    :param tuple[str] | None drop: Columns that are not read, defaults to droid.DROPPED_COLUMNS
+    :param typing.Callable[[int], None] | None progress: Called with the number of rows read so far after every chunk
+    :param metrics.Metrics | None recorder: Records the time spent reading, filtering and formatting and the number
+        of rows parsed
+    :raises OSError: If the file can't be read
+    :raises ImportError: If the engine is pyarrow and pyarrow is not installed
+    :raises ValueError: If the paths can't be rebuilt
+    :raises pandas.errors.ParserError: If a row can't be parsed when rebuilding the paths
+    """
+    def __init__(self, src, chunk_size=100000, engine='c', multi_format='join', remove_folders=False, paths=False,
+                 hierarchy=None, element_filter=None, drop=None, progress=None, recorder=None):
+        import droid
+        import filters
+        src = Path(src)
+        if paths and hierarchy is None:
+            hierarchy = droid.read_hierarchy(src, chunk_size, engine)
+        self.hierarchy = hierarchy
+        self.rows = 0  # rows read so far, including the ones removed by remove_folders and the filter
+        self.max_id = 0  # the largest ID read so far
+        self._reader = droid.read_chunks(src, chunk_size, drop=droid.DROPPED_COLUMNS if drop is None else drop,
+                                         engine=engine, multi_format=multi_format)
+        self._row_filter = filters.RowFilter(element_filter) if element_filter is not None else None
+        self._remove_folders = remove_folders
+        self._progress = progress
+        self._recorder = recorder or metrics.Metrics()
+
+    def __iter__(self):
+        """Yields the formatted rows
+
+        :raises pandas.errors.ParserError: If a row can't be parsed
+        :raises ValueError: If a column needed by the filter is missing
+        :return typing.Iterator[pandas.DataFrame]: The formatted rows, indexed by their 1-based row number
+        """
+        import droid
+        recorder = self._recorder
+        # the dtypes are fixed by droid.COLUMNS, so every chunk is parsed the same way regardless of the values it
+        # contains; unused columns are not parsed at all
+        for chunk in recorder.iterate('read', self._reader):
+            self.rows += len(chunk)
+            recorder.count('rows_parsed', len(chunk))
+            if 'ID' in chunk.columns and chunk['ID'].notna().any():
+                self.max_id = max(self.max_id, int(chunk['ID'].max()))
+            if self._row_filter is not None:
+                with recorder.phase('filter'):
+                    chunk = self._row_filter.apply(chunk)
+            with recorder.phase('format'):
+                chunk = droid.format_chunk(chunk, self._remove_folders, self.hierarchy)
+            yield chunk
+            if self._progress is not None:
+                self._progress(self.rows)
+
+
+class Conversion:
+    """What convert_droid() did
+
+    :param list[pathlib.Path] paths: The output files
+    :param int rows: Number of rows read, including the ones removed by remove_folders and the filter
+    :param int rows_written: Number of rows written
+    :param int max_id: The largest ID read; the IDs of inputs merged after this one are shifted by it
+    """
+    def __init__(self, paths, rows, rows_written, max_id):
+        self.paths = paths
+        self.rows = rows
+        self.rows_written = rows_written
+        self.max_id = max_id
+
+
+def convert_droid(src, dst, output_format='csv', template_path=TEMPLATE_PATH, chunk_size=100000, engine='c',
+                  multi_format='join', remove_folders=False, paths=False, element_filter=None, writer=None,
+                  progress=None, recorder=None):
+    """Converts a DROID csv like droid-csv does, see DroidReader. Incomplete output files are removed if it fails
+
+    :param str | pathlib.Path src: Path to the DROID csv
+    :param str | pathlib.Path | None dst: Path to the output file, see open_writer(); not used if writer is passed
+    :param str output_format: One of template.FORMATS or 'parquet'
+    :param str | pathlib.Path template_path: Path to the LIStA Excel template, used with the xlsx format
+    :param int chunk_size: Number of rows read, formatted and written at a time
+    :param str engine: The csv parser to use; one of droid.ENGINES
+    :param str multi_format: How rows with multiple formats are folded; one of droid.MULTI_FORMAT_MODES
+    :param bool remove_folders: Whether to remove folders
+    :param bool paths: Adds the columns RELATIVE_PATH and DEPTH
+    :param filters.Filter | None element_filter: Only writes the rows of the selected elements
+    :param any writer: Writes the rows instead of a writer created for dst; needs write(), close() and paths like the
+        writers of open_writer(). Its files are removed as well if the conversion fails
+    :param typing.Callable[[int], None] | None progress: Called with the number of rows read so far after every chunk
+        was written
+    :param metrics.Metrics | None recorder: Records the time spent reading, filtering, formatting and writing and the
+        number of rows parsed
+    :raises OSError: If a file can't be read or written
+    :raises ImportError: If the engine or the format needs pyarrow and it is not installed
+    :raises ValueError: If the paths can't be rebuilt or a column needed by the filter is missing
+    :raises zipfile.BadZipFile: If the template is not a valid xlsx file
+    :raises pandas.errors.ParserError: If a row can't be parsed
+    :return Conversion: The output files and the number of rows
+    """
+    recorder = recorder or metrics.Metrics()
+    try:
+        reader = DroidReader(src, chunk_size, engine, multi_format, remove_folders, paths,
+                             element_filter=element_filter, progress=progress, recorder=recorder)
+        if writer is None:
+            writer = open_writer(dst, output_format, template_path)
+        rows_written = 0
+        for chunk in reader:
+            with recorder.phase('write'):
+                writer.write(chunk)
+            rows_written += len(chunk)
+        with recorder.phase('write'):
+            writer.close()
+    except BaseException:
+        if writer is not None:
+            remove_partial_output(writer)
+        raise
+    return Conversion(writer.paths, reader.rows, rows_written, reader.max_id)
+
+
+def remove_partial_output(writer):
+    """Closes and deletes output files that could not be written completely
+
+    :param any writer: The writer of the files, e.g. one of open_writer()
+    :return list[tuple[pathlib.Path, OSError | None]]: Every file and the error raised when deleting it, if any
+    """
+    try:
+        writer.close()
+    except OSError:
+        pass  # the files are removed anyway
+    removed = []
+    for path in writer.paths:
+        try:
+            path.unlink(missing_ok=True)
+        except OSError as OSE:
+            removed.append((path, OSE))
+        else:
+            removed.append((path, None))
+    return removed
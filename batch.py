@@ -0,0 +1,97 @@
+import pickle
+import zipfile
+import pandas as pd
+
+import api
+
+
+class Result:
+    """What converting one DROID csv in a worker process did
+
+    :param pathlib.Path src: The DROID csv
+    """
+    def __init__(self, src):
+        self.src = src
+        self.paths = []  # the output files or the part file; empty if the file could not be converted
+        self.rows = 0  # rows read, including the rows removed by --remove-folders and the filter
+        self.rows_written = 0
+        self.max_id = 0
+        self.error = None  # (text, error) if the file could not be converted
+
+
+def convert(src, dst, options, part=None):
+    """Converts one DROID csv like droid-csv does, see api.convert_droid(); runs in a worker process, so all errors are
+    returned instead of reported. Incomplete output files are removed
+
+    :param pathlib.Path src: The DROID csv
+    :param pathlib.Path dst: The output file or, with the parquet format, the partition file of the accession
+    :param dict options: chunk_size, engine, multi_format, output_format, remove_folders, paths, template_path and
+        filter, a filters.Filter or None
+    :param pathlib.Path | None part: Writes the formatted chunks to this file instead of dst, so they can be merged
+    :return Result: The result
+    """
+    result = Result(src)
+    try:
+        conversion = api.convert_droid(src, dst, options['output_format'], options['template_path'],
+                                       options['chunk_size'], options['engine'], options['multi_format'],
+                                       options['remove_folders'], options['paths'], options['filter'],
+                                       writer=PartWriter(part) if part is not None else None)
+    except pd.errors.ParserError as PE:
+        result.error = ("An error occurred when parsing the input file. This may be caused by some rows having more "
+                        "entries than there are header columns", str(PE))
+    except (OSError, ValueError, zipfile.BadZipFile) as E:
+        result.error = ("An error occurred when converting the input file", str(E))
+    else:
+        result.paths = conversion.paths
+        result.rows = conversion.rows
+        result.rows_written = conversion.rows_written
+        result.max_id = conversion.max_id
+    return result
+
+
+def renumber(chunk, rows_before, ids_before):
+    """Continues the row numbers and IDs of a chunk after the inputs merged before it. PARENT_ID is shifted like ID, so
+    it still points at the same element
+
+    :param pandas.DataFrame chunk: Formatted rows of one input
+    :param int rows_before: Number of rows read from the inputs before
+    :param int ids_before: Sum of the largest IDs of the inputs before
+    :return pandas.DataFrame: The chunk
+    """
+    chunk.index += rows_before
+    for column in ('ID', 'PARENT_ID'):
+        if column in chunk.columns:
+            chunk[column] += ids_before
+    return chunk
+
+
+class PartWriter:
+    """Writes formatted chunks to a temporary file, keeping their dtypes, so they are written to the merged output like
+    the chunks of a single input
+
+    :param pathlib.Path path: Path to the part file
+    """
+    def __init__(self, path):
+        self.paths = [path]
+        self.f = open(path, 'wb')
+
+    def write(self, chunk):
+        pickle.dump(chunk, self.f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def close(self):
+        self.f.close()
+
+
+def read_part(path):
+    """Yields the chunks written by PartWriter
+
+    :param pathlib.Path path: Path to the part file
+    :raises OSError: If the file can't be read
+    :return typing.Iterator[pandas.DataFrame]: The chunks
+    """
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
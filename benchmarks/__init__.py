@@ -0,0 +1 @@
+"""Benchmarks and generators of test data at archive scale; the scripts are run directly, see their docstrings"""
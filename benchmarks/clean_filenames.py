@@ -0,0 +1,47 @@
+"""Compares cleaning up a million synthetic file names with the previous re.sub() per substitution,
+normalize.clean_stem() per name and normalize.clean_stems() in batches, and checks that all give the same names
+
+Usage: python benchmarks/clean_filenames.py [NAMES]
+"""
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import normalize  # noqa: E402
+
+# mostly names like the ones in the archive, with some special characters
+CHARACTERS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789" * 4 + "äöüßÄÖÜ _-.,()&'é€"
+
+
+def previous(stems):
+    cleaned = []
+    for stem in stems:
+        new_stem = re.sub(r"[^a-zäöüßA-ZÄÖÜ0-9_-]", '_', stem)
+        for pattern, replacement in normalize.SUBSTITUTIONS.items():
+            new_stem = re.sub(pattern, replacement, new_stem)
+        cleaned.append(new_stem)
+    return cleaned
+
+
+def per_name(stems):
+    return [normalize.clean_stem(stem) for stem in stems]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rng = random.Random(0)
+    stems = [''.join(rng.choices(CHARACTERS, k=rng.randint(5, 40))) for _ in range(count)]
+    results = {}
+    for name, function in (('previous', previous), ('per name', per_name), ('batches', normalize.clean_stems)):
+        start = time.perf_counter()
+        results[name] = function(stems)
+        print(f"{name:<9} {time.perf_counter() - start:6.2f} s")
+    if any(result != results['previous'] for result in results.values()):
+        print("results differ")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Compares parse time and peak memory of reading a DROID csv without and with the column schema in droid.COLUMNS
+
+Usage: python benchmarks/droid_csv.py [ROWS]
+"""
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from benchmarks import generators  # noqa: E402
+
+VARIANTS = ('untyped', 'schema', 'schema-pyarrow', 'schema-chunked')
+
+
+def peak_rss_mb():
+    """Returns the peak resident memory of this process in MB or None if it can't be measured on this platform"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run(variant, path):
+    """Reads the file like the passed variant and prints the elapsed time and peak memory as JSON"""
+    import pandas as pd
+    import droid
+    start = time.perf_counter()
+    if variant == 'untyped':  # how droid-csv read files before the schema was introduced
+        df = pd.read_csv(path)
+        df = df.astype({'SIZE': 'Int64', 'ID': 'Int64', 'PARENT_ID': 'Int64', 'FORMAT_COUNT': 'Int64'})
+        df = df.drop(list(droid.DROPPED_COLUMNS), axis=1)
+    else:
+        engine = 'pyarrow' if variant == 'schema-pyarrow' else 'c'
+        chunk_size = 100000 if variant == 'schema-chunked' else sys.maxsize
+        for _ in droid.read_chunks(path, chunk_size, engine=engine):
+            pass
+    print(json.dumps({'seconds': round(time.perf_counter() - start, 2), 'peak_rss_mb': peak_rss_mb()}))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'droid.csv'
+        # without rows with multiple formats, which the untyped variant can't read
+        generators.generate_droid_csv(path, rows, multi_format=0)
+        print(f"{rows} rows, {path.stat().st_size / (1024 * 1024):.1f} MB")
+        for variant in VARIANTS:
+            # every variant runs in its own process, so the peak memory of one doesn't hide the others
+            result = subprocess.run([sys.executable, __file__, '--run', variant, str(path)], capture_output=True,
+                                    text=True)
+            if result.returncode != 0:
+                print(f"{variant:<16} failed: {result.stderr.strip().splitlines()[-1]}")
+                continue
+            numbers = json.loads(result.stdout)
+            print(f"{variant:<16} {numbers['seconds']:>8} s {numbers['peak_rss_mb']:>10} MB peak RSS")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == '--run':
+        run(sys.argv[2], sys.argv[3])
+    else:
+        main()
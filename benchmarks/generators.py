@@ -0,0 +1,124 @@
+"""Generators of reproducible test data at archive scale: directory trees of empty files and DROID csv exports. The
+same arguments always give the same data"""
+import csv
+import hashlib
+import random
+from pathlib import Path
+
+# characters names are built from; 'mixed' is closest to what donors deliver
+CHARSETS = {
+    'ascii': "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-",
+    'umlauts': "abcdefghijklmnopqrstuvwxyzäöüßÄÖÜ",
+    'spaces': "abcdefghijklmnopqrstuvwxyz     ",
+    'punctuation': "abcdefghijklmnopqrstuvwxyz.,;()[]&'+!#",
+    'mixed': "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789" * 3 + "äöüßÄÖÜ _-.,()&'é",
+}
+EXTENSIONS = ('pdf', 'docx', 'doc', 'xlsx', 'jpg', 'tif', 'txt', 'msg', 'mp3', 'html')
+# (PUID, MIME type, format name, format version) DROID typically reports for the extensions above
+FORMATS = (
+    ('fmt/276', 'application/pdf', 'Acrobat PDF 1.7 - Portable Document Format', '1.7'),
+    ('fmt/412', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+     'Microsoft Word for Windows', '2007 onwards'),
+    ('fmt/40', 'application/msword', 'Microsoft Word Document', '97-2003'),
+    ('fmt/214', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'Microsoft Excel 2007 onwards',
+     '2007 onwards'),
+    ('fmt/43', 'image/jpeg', 'JPEG File Interchange Format', '1.01'),
+    ('fmt/353', 'image/tiff', 'Tagged Image File Format', ''),
+    ('x-fmt/111', 'text/plain', 'Plain Text File', ''),
+    ('x-fmt/430', 'application/vnd.ms-outlook', 'Microsoft Outlook Email Message', ''),
+    ('fmt/134', 'audio/mpeg', 'MPEG 1/2 Audio Layer 3', ''),
+    ('fmt/96', 'text/html', 'Hypertext Markup Language', ''),
+)
+# folders are nested at most this deep
+MAX_DEPTH = 8
+DROID_HEADER = ('ID', 'PARENT_ID', 'URI', 'FILE_PATH', 'NAME', 'METHOD', 'STATUS', 'SIZE', 'TYPE', 'EXT',
+                'LAST_MODIFIED', 'EXTENSION_MISMATCH', 'MD5_HASH', 'FORMAT_COUNT', 'PUID', 'MIME_TYPE', 'FORMAT_NAME',
+                'FORMAT_VERSION')
+
+
+def random_name(rng, charset, length=(4, 24)):
+    """Returns a random name that never starts or ends with a space or a dot, which Windows doesn't allow"""
+    name = ''.join(rng.choices(CHARSETS[charset], k=rng.randint(*length))).strip(' .')
+    return name or 'x'
+
+
+def generate_tree(root, width=5, depth=3, files=20, charset='mixed', seed=0):
+    """Creates a tree of empty files: root and every directory down to depth levels below it contain files files and
+    width subdirectories
+
+    :param pathlib.Path root: The directory to create the tree in; created if it doesn't exist
+    :param int width: Number of subdirectories per directory
+    :param int depth: Number of directory levels below root
+    :param int files: Number of files per directory
+    :param str charset: The characters of the names; one of CHARSETS
+    :param int seed: Seed of the random names
+    :return tuple[int, int]: The number of files and directories created
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    created_files = created_directories = 0
+    stack = [(root, 0)]
+    while stack:
+        directory, level = stack.pop()
+        # the counter keeps names unique, also on case-insensitive file systems
+        for n in range(files):
+            (directory / f"{random_name(rng, charset)} {n}.{rng.choice(EXTENSIONS)}").touch()
+        created_files += files
+        if level < depth:
+            for n in range(width):
+                subdirectory = directory / f"{random_name(rng, charset)} {n}"
+                subdirectory.mkdir()
+                stack.append((subdirectory, level + 1))
+            created_directories += width
+    return created_files, created_directories
+
+
+def generate_droid_csv(path, rows, multi_format=0.001, folders=0.05, seed=0):
+    """Writes a DROID csv of a synthetic archive. Every row is a file, a folder or, for a share of the files, a file
+    DROID matched to two formats, which adds a second group of format columns to the end of the row like DROID does
+
+    :param pathlib.Path path: Where to write the file
+    :param int rows: Number of rows to write
+    :param float multi_format: Share of the files that are matched to two formats
+    :param float folders: Share of the rows that are folders
+    :param int seed: Seed of the random values
+    :return int: The number of rows with two formats
+    """
+    rng = random.Random(seed)
+    multi_format_rows = 0
+    # (ID, path) of the folder open on every level, like DROID, which lists the elements depth-first
+    open_folders = []
+    with open(path, 'w', encoding='utf8', newline='') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL, lineterminator='\n')
+        writer.writerow(DROID_HEADER)
+        for n in range(rows):
+            row_id = n + 2  # DROID starts counting at 2
+            modified = (f"20{rng.randint(10, 23)}-{rng.randint(1, 12):02}-{rng.randint(1, 28):02}"
+                        f"T{rng.randint(0, 23):02}:{rng.randint(0, 59):02}:{rng.randint(0, 59):02}")
+            if n == 0 or rng.random() < folders:
+                level = rng.randint(1, min(len(open_folders) + 1, MAX_DEPTH))
+                parent_id, parent_path = open_folders[level - 2] if level > 1 else ('', r'D:\Archiv')
+                name = random_name(rng, 'mixed')
+                file_path = f"{parent_path}\\{name}"
+                open_folders = open_folders[:level - 1] + [(row_id, file_path)]
+                writer.writerow((row_id, parent_id, _uri(file_path) + '/', file_path, name, '', 'Done', '', 'Folder',
+                                 '', modified, 'false', '', '', '', '', '', ''))
+                continue
+            parent_id, parent_path = rng.choice(open_folders)
+            extension = rng.randrange(len(EXTENSIONS))
+            name = f"{random_name(rng, 'mixed')}.{EXTENSIONS[extension]}"
+            file_path = f"{parent_path}\\{name}"
+            row = [row_id, parent_id, _uri(file_path), file_path, name, 'Signature', 'Done', rng.randint(0, 10 ** 8),
+                   'File', EXTENSIONS[extension], modified, 'false',
+                   hashlib.md5(file_path.encode('utf8')).hexdigest(), 1, *FORMATS[extension]]
+            if rng.random() < multi_format:
+                row[13] = 2
+                row.extend(FORMATS[(extension + 1) % len(FORMATS)])
+                multi_format_rows += 1
+            writer.writerow(row)
+    return multi_format_rows
+
+
+def _uri(file_path):
+    return 'file:/' + file_path.replace('\\', '/').replace(' ', '%20')
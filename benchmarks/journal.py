@@ -0,0 +1,45 @@
+"""Measures the overhead of the rename journal: applies the same rename plan with api.apply() once without and once
+with a journal directory, so the journal is written, committed and synced like by the commands of lista-tools
+
+Usage: python benchmarks/journal.py [FILES] [RUNS] [JOBS]
+"""
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import api  # noqa: E402
+
+
+def create(directory, files):
+    directory.mkdir()
+    for n in range(files):
+        (directory / f"{n}.txt").touch()
+    return api.plan_rename(directory, 'renamed_')
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    jobs = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    times = {'plain': [], 'journaled': []}
+    # the variants take turns, so changes in the speed of the file system affect both the same
+    for run in range(runs):
+        for name in times:
+            with tempfile.TemporaryDirectory() as tmp:
+                plan = create(Path(tmp) / name, files)
+                journal_dir = Path(tmp) / 'journals' if name == 'journaled' else None
+                start = time.perf_counter()
+                failures = sum(error is not None for _, _, error in api.apply(plan, jobs, journal_dir))
+                times[name].append(time.perf_counter() - start)
+                if failures:
+                    sys.exit(f"{failures} renames failed")
+    for name, measured in times.items():
+        print(f"{name:<10} median {statistics.median(measured):6.2f} s  min {min(measured):6.2f} s")
+    print(f"overhead   {(statistics.median(times['journaled']) / statistics.median(times['plain']) - 1) * 100:5.1f} %")
+
+
+if __name__ == '__main__':
+    main()
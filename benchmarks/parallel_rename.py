@@ -0,0 +1,73 @@
+"""Measures exdir and rename with different numbers of jobs on a local directory, with a fixed latency added to every
+rename and removed directory to simulate a network drive. Also checks that every number of jobs gives the same result
+
+Usage: python benchmarks/parallel_rename.py [FILES] [LATENCY_MS] [JOBS ...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from main import ListaTools  # noqa: E402
+
+
+def generate(root, files, seed=0):
+    """Creates a tree of files in nested directories, the same for the same seed"""
+    rng = random.Random(seed)
+    directories = [root]
+    for n in range(files):
+        if rng.random() < 0.1:
+            directory = rng.choice(directories) / f"dir {n}"
+            directory.mkdir()
+            directories.append(directory)
+        (rng.choice(directories) / f"file {n}.txt").touch()
+
+
+def snapshot(root):
+    return sorted(str(path.relative_to(root)) for path in root.rglob('*'))
+
+
+def with_latency(function, latency):
+    def delayed(*args, **kwargs):
+        time.sleep(latency)  # releases the GIL like waiting for the network does
+        return function(*args, **kwargs)
+    return delayed
+
+
+def measure(tmp, command, files, jobs):
+    root = tmp / f"{command}-{jobs}"
+    root.mkdir()
+    generate(root, files)
+    ltt = ListaTools()
+    ltt.journal_dir = tmp / 'journals'
+    ltt.insert_params(logging='none', noconfirm=True, target_dir=root, offline=True)
+    start = time.perf_counter()
+    if command == 'exdir':
+        ltt.exdir(recursion=True, jobs=jobs)
+    else:
+        ltt.rename(prefix='P_', jobs=jobs)
+    return time.perf_counter() - start, snapshot(root)
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.005
+    jobs_list = [int(jobs) for jobs in sys.argv[3:]] or [1, 4, 16]
+    os.rename = with_latency(os.rename, latency)
+    os.rmdir = with_latency(os.rmdir, latency)
+    print(f"{files} files, {latency * 1000:.1f} ms latency")
+    with tempfile.TemporaryDirectory() as tmp:
+        for command in ('exdir', 'rename'):
+            results = {}
+            for jobs in jobs_list:
+                elapsed, results[jobs] = measure(Path(tmp), command, files, jobs)
+                print(f"{command:<7} jobs {jobs:>3}  {elapsed:7.2f} s")
+            if any(result != results[jobs_list[0]] for result in results.values()):
+                print(f"{command}: results differ between the numbers of jobs")
+
+
+if __name__ == '__main__':
+    main()
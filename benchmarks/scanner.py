@@ -0,0 +1,61 @@
+"""Compares listing a directory with scanner.scan() against the previous Path.iterdir(), resolve() and is_dir(),
+is_file() and is_symlink() per element. Counts the stat calls made through the os module; the ones os.DirEntry makes
+itself, only on file systems that don't report the type with the directory, are not included
+
+Usage: python benchmarks/scanner.py [FILES]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import scanner  # noqa: E402
+
+
+def element_type(path):
+    if path.is_dir():
+        return "Directory"
+    elif path.is_file():
+        return "File"
+    elif path.is_symlink():
+        return "Symlink"
+    return "Other"
+
+
+def previous(directory):
+    return [(element.resolve(), element_type(element.resolve())) for element in directory.iterdir()]
+
+
+def scanned(directory):
+    return [(entry.path, entry.type) for entry in scanner.scan(directory)]
+
+
+def counting(function, counter):
+    def counted(*args, **kwargs):
+        counter[0] += 1
+        return function(*args, **kwargs)
+    return counted
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        for n in range(files):
+            (directory / f"file {n}.txt").touch()
+        counter = [0]
+        stat, lstat = os.stat, os.lstat
+        os.stat, os.lstat = counting(stat, counter), counting(lstat, counter)
+        for name, function in (('previous', previous), ('scanner', scanned)):
+            counter[0] = 0
+            start = time.perf_counter()
+            function(directory)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<9} {elapsed:6.2f} s  {counter[0] / files:5.2f} stat calls per element")
+        os.stat, os.lstat = stat, lstat
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Measures the cold start latency of 'lista-tools rename --help', once with network access and once with an
+unreachable network like on air-gapped workstations. Every run starts a new process with an empty version cache
+
+Usage: python benchmarks/startup.py [MAIN_PY] [RUNS]
+"""
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TIMEOUT = 60
+
+
+def measure(main_py, env, runs):
+    """Returns the wall times of starting main_py with 'rename --help' in seconds; runs that take longer than TIMEOUT
+    seconds are counted as TIMEOUT"""
+    times = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as cache:
+            run_env = os.environ | env | {'LOCALAPPDATA': cache, 'XDG_CACHE_HOME': cache}
+            start = time.perf_counter()
+            try:
+                subprocess.run([sys.executable, str(main_py), 'rename', '--help'], env=run_env, capture_output=True,
+                               timeout=TIMEOUT)
+                times.append(time.perf_counter() - start)
+            except subprocess.TimeoutExpired:
+                times.append(TIMEOUT)
+    return times
+
+
+def main():
+    main_py = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent.parent / 'main.py'
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print(f"{main_py}, {runs} runs")
+    # used as proxy, a socket that accepts connections but never answers stalls requests like a network that drops
+    # all packets
+    with socket.socket() as blackhole:
+        blackhole.bind(('127.0.0.1', 0))
+        blackhole.listen(64)
+        proxy = f'http://127.0.0.1:{blackhole.getsockname()[1]}'
+        for name, env in (('network', {}), ('unreachable', {'HTTPS_PROXY': proxy, 'HTTP_PROXY': proxy})):
+            times = measure(main_py, env, runs)
+            print(f"{name:<12} median {statistics.median(times):6.2f} s  min {min(times):6.2f} s  "
+                  f"max {max(times):6.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+"""Times droid-csv, exdir, rename and clean-filenames on generated data and records wall time, peak RSS and syscall
+counts in a JSON file, so versions can be compared. Every run starts a new process on fresh data with an empty cache.
+Read and write syscalls are taken from /proc/self/io, so they are only counted on Linux; all syscalls are counted
+with strace in an additional run if it is installed
+
+Usage: python benchmarks/suite.py [--scale SCALE] [--runs RUNS] [--main MAIN_PY] [--out RESULTS]
+       python benchmarks/suite.py --compare OLD_RESULTS NEW_RESULTS
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from benchmarks import generators  # noqa: E402
+
+# rows of the DROID csv, files in the directory renamed by rename and clean-filenames and (width, depth, files) of the
+# tree extracted by exdir
+SCALES = {
+    'small': {'rows': 100000, 'files': 10000, 'tree': (4, 3, 20)},
+    'medium': {'rows': 1000000, 'files': 100000, 'tree': (5, 4, 40)},
+    'large': {'rows': 5000000, 'files': 500000, 'tree': (8, 4, 50)},
+}
+BENCHMARKS = ('droid-csv', 'exdir', 'rename', 'clean-filenames')
+METRICS = ('seconds', 'peak_rss_mb', 'read_syscalls', 'write_syscalls', 'syscalls')
+# runs main.py like 'python main.py' would and writes what the process measured about itself to the file passed first
+LAUNCHER = '''
+import atexit, json, os, runpy, sys
+result, main_py = sys.argv[1:3]
+
+def report():
+    numbers = {}
+    try:
+        import resource
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        numbers['peak_rss_mb'] = round(maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/io') as f:
+            io = dict(line.split(': ') for line in f.read().splitlines())
+        numbers['read_syscalls'], numbers['write_syscalls'] = int(io['syscr']), int(io['syscw'])
+    except OSError:
+        pass
+    with open(result, 'w') as f:
+        json.dump(numbers, f)
+
+atexit.register(report)
+sys.argv = sys.argv[2:]
+sys.path[0] = os.path.dirname(os.path.abspath(main_py))
+runpy.run_path(main_py, run_name='__main__')
+'''
+
+
+def prepare(benchmark, scale, data, work):
+    """Creates fresh input for one run of a benchmark
+
+    :param str benchmark: One of BENCHMARKS
+    :param dict scale: One of SCALES
+    :param pathlib.Path data: Directory with the input shared by all runs
+    :param pathlib.Path work: Empty directory for the input and output of this run
+    :return list[str]: The arguments of main.py that run the benchmark
+    """
+    if benchmark == 'droid-csv':
+        return ['droid-csv', str(data / 'droid.csv'), '-o', str(work / 'output.csv')]
+    if benchmark == 'exdir':
+        width, depth, files = scale['tree']
+        generators.generate_tree(work / 'tree', width, depth, files)
+        return ['--target-dir', str(work / 'tree'), 'exdir']
+    generators.generate_tree(work / 'files', width=0, depth=0, files=scale['files'])
+    if benchmark == 'rename':
+        return ['--target-dir', str(work / 'files'), 'rename', 'Bench']
+    return ['--target-dir', str(work / 'files'), 'clean-filenames']
+
+
+def measure(main_py, options, arguments, work, strace=False):
+    """Runs main.py once in a new process with an empty cache
+
+    :param pathlib.Path main_py: The main.py to run
+    :param list[str] options: Options passed before the arguments
+    :param list[str] arguments: The arguments returned by prepare()
+    :param pathlib.Path work: The directory of the run
+    :param bool strace: Counts all syscalls with strace instead of measuring anything else
+    :return dict: The measured METRICS; 'error' holds the last line of stderr if the run failed
+    """
+    cache = work / 'cache'
+    cache.mkdir()
+    env = os.environ | {'LOCALAPPDATA': str(cache), 'XDG_CACHE_HOME': str(cache)}
+    result, strace_out = work / 'result.json', work / 'strace.txt'
+    command = [sys.executable, '-c', LAUNCHER, str(result), str(main_py), *options, *arguments]
+    if strace:
+        command = ['strace', '-f', '-c', '-o', str(strace_out), *command]
+    start = time.perf_counter()
+    process = subprocess.run(command, cwd=work, env=env, capture_output=True, text=True)
+    seconds = round(time.perf_counter() - start, 3)
+    if process.returncode != 0 or not result.exists():
+        lines = process.stderr.strip().splitlines()
+        return {'error': lines[-1] if lines else f"exit code {process.returncode}"}
+    if strace:
+        # the last line is the total: % time, seconds, usecs/call, calls, [errors,] 'total'
+        total = strace_out.read_text().strip().splitlines()[-1].split()
+        return {'syscalls': int(total[3])}
+    return {'seconds': seconds, **json.loads(result.read_text())}
+
+
+def run_suite(main_py, scale_name, runs, benchmarks):
+    """Runs the benchmarks and prints a line per benchmark
+
+    :param pathlib.Path main_py: The main.py to run
+    :param str scale_name: One of SCALES
+    :param int runs: Number of runs per benchmark
+    :param list[str] benchmarks: Names from BENCHMARKS
+    :return dict: The results as written to the results file
+    """
+    scale = SCALES[scale_name]
+    help_text = subprocess.run([sys.executable, str(main_py), '--help'], capture_output=True, text=True).stdout
+    # versions before --offline was added contact GitHub on every start
+    options = ['-y', '-l', 'none'] + (['--offline'] if '--offline' in help_text else [])
+    strace = shutil.which('strace') is not None
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        data = Path(tmp) / 'data'
+        data.mkdir()
+        if 'droid-csv' in benchmarks:
+            generators.generate_droid_csv(data / 'droid.csv', scale['rows'])
+        for benchmark in benchmarks:
+            numbers = {metric: [] for metric in METRICS}
+            for run in range(runs + strace):
+                work = Path(tmp) / f'{benchmark}-{run}'
+                work.mkdir()
+                measured = measure(main_py, options, prepare(benchmark, scale, data, work), work,
+                                   strace=run == runs)
+                # main.py exits normally after reporting errors, e.g. versions that can't read rows with multiple
+                # formats
+                if benchmark == 'droid-csv' and 'error' not in measured and not (work / 'output.csv').exists():
+                    measured = {'error': "no output file was written"}
+                shutil.rmtree(work)
+                if 'error' in measured:
+                    numbers['error'] = measured['error']
+                    break
+                for metric, value in measured.items():
+                    numbers[metric].append(value)
+            results[benchmark] = numbers
+            print(f"{benchmark:<16} " + ("failed: " + numbers['error'] if 'error' in numbers else
+                                         '  '.join(f"{_median(numbers[metric])} {metric}" for metric in METRICS
+                                                   if numbers[metric])))
+    return {
+        'version': _read_version(main_py),
+        'commit': _read_commit(main_py),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': scale_name,
+        'runs': runs,
+        'benchmarks': results,
+    }
+
+
+def compare(old, new):
+    """Prints the median of every metric of two results files and the change between them"""
+    print(f"{old['version']} ({old['commit']}) → {new['version']} ({new['commit']}), scale {new['scale']}")
+    if old['scale'] != new['scale']:
+        print(f"warning: the old results were measured at scale {old['scale']}")
+    for benchmark in BENCHMARKS:
+        if benchmark not in old['benchmarks'] or benchmark not in new['benchmarks']:
+            continue
+        for metric in METRICS:
+            before = _median(old['benchmarks'][benchmark].get(metric, []))
+            after = _median(new['benchmarks'][benchmark].get(metric, []))
+            if before is None or after is None:
+                continue
+            change = f"{(after - before) / before:+7.1%}" if before else ''
+            print(f"{benchmark:<16} {metric:<15} {before:>12} → {after:<12} {change}")
+
+
+def _median(values):
+    return round(statistics.median(values), 3) if values else None
+
+
+def _read_version(main_py):
+    try:
+        return (main_py.parent / 'VERSION').read_text().strip()
+    except OSError:
+        return None
+
+
+def _read_commit(main_py):
+    try:
+        process = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=main_py.parent, capture_output=True,
+                                 text=True)
+    except OSError:
+        return None
+    commit = process.stdout.strip()
+    return commit if process.returncode == 0 and re.fullmatch(r'[0-9a-f]+', commit) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks lista-tools on generated data")
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--main', type=Path, default=Path(__file__).parent.parent / 'main.py',
+                        help="The main.py to benchmark, e.g. of a checkout of another version")
+    parser.add_argument('--out', type=Path, default=None, help="Writes the results to this JSON file")
+    parser.add_argument('--benchmark', action='append', choices=BENCHMARKS, help="Runs only this benchmark, can be "
+                        "passed multiple times")
+    parser.add_argument('--compare', nargs=2, type=Path, metavar=('OLD', 'NEW'), help="Compares two results files")
+    args = parser.parse_args()
+    if args.compare:
+        old, new = (json.loads(path.read_text(encoding='utf8')) for path in args.compare)
+        compare(old, new)
+        return
+    main_py = args.main.resolve()
+    print(f"{main_py}, scale {args.scale}, {args.runs} runs")
+    results = run_suite(main_py, args.scale, args.runs, args.benchmark or list(BENCHMARKS))
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2), encoding='utf8')
+
+
+if __name__ == '__main__':
+    main()
@@ -55,6 +55,7 @@ PyInstaller.__main__.run([
     '-i', '../../lista-tools.ico',
     '--add-data=../../VERSION;.',
     '--add-data=../update/dist/update.exe;.',
+    '--add-data=../../template.xlsx;.',
 
 ])
 
@@ -0,0 +1,119 @@
+import unicodedata
+
+# what happens to an element whose new name is already taken: 'suffix' adds a counter to the name, e.g. a_1.txt,
+# 'skip' leaves the element as it is and 'abort' stops before anything is changed
+POLICIES = ('suffix', 'skip', 'abort')
+
+
+def path_key(path):
+    """Returns the key two paths share if a file system may treat them as the same element: Windows and macOS ignore
+    the case of names and macOS also the difference between composed and decomposed characters
+
+    :param pathlib.Path path: The path
+    :return tuple[pathlib.Path, str]: The directory and the normalized, case-folded name
+    """
+    return path.parent, unicodedata.normalize('NFC', path.name).casefold()
+
+
+class Resolution:
+    """Planned moves with every name collision resolved, see resolve()
+
+    :param list[pathlib.Path] destinations: Where every move goes, in the order of the planned moves; the source if
+        the move is skipped
+    :param list[int] order: The planned moves in an order they can be applied in, without the skipped ones
+    :param list[tuple[pathlib.Path, pathlib.Path, pathlib.Path | None]] conflicts: The source, the planned
+        destination and the resolved destination of every move whose name was taken; None if it is skipped
+    """
+    def __init__(self, destinations, order, conflicts):
+        self.destinations = destinations
+        self.order = order
+        self.conflicts = conflicts
+
+
+def resolve(moves, existing, policy='suffix'):
+    """Finds every planned move whose destination is taken, by an element that stays where it is or by the destination
+    of an earlier move, comparing names like path_key(). A name that is freed by another move can be used once that
+    move was applied, so that move is ordered first; moves that free each other's names in a cycle are conflicts.
+    Every name is looked up in a dict, so no file system access is needed and the time is linear in the number of moves
+
+    :param list[tuple[pathlib.Path, pathlib.Path]] moves: The planned moves as (src, dst); src == dst means the
+        element stays as it is
+    :param typing.Iterable[pathlib.Path] existing: All elements in the directories the moves go to, including the
+        sources of the moves
+    :param str policy: How conflicts are resolved; one of POLICIES. With 'abort' they are resolved like with 'skip'
+    :return Resolution: The resolved moves
+    """
+    taken = {path_key(path) for path in existing}
+    src_keys = [path_key(src) for src, _ in moves]
+    dst_keys = [path_key(dst) for _, dst in moves]
+    freeing = {src_keys[n]: n for n, (src, dst) in enumerate(moves) if src != dst}
+    claimed = set()  # destinations of the moves resolved so far
+    counters = {}  # the next counter tried for every name, so suffixes are found without trying all used ones
+    destinations = [None] * len(moves)
+    order = []
+    conflicts = []
+    resolving = set()  # the moves waiting for the moves that free their names
+
+    def free(key, n):
+        """Checks if move n can use key; the move that frees it was already resolved, if there is one"""
+        if key in claimed:
+            return False
+        if key not in taken or key == src_keys[n]:
+            return True
+        m = freeing.get(key)
+        if m is None or m in resolving:  # stays where it is or frees the name in a cycle
+            return False
+        # the name is free if the element that has it is moved away, but not if it is skipped
+        return path_key(destinations[m]) != key
+
+    def visit(n):
+        src, dst = moves[n]
+        if src == dst:
+            destinations[n], key = src, src_keys[n]
+        elif free(dst_keys[n], n):
+            destinations[n], key = dst, dst_keys[n]
+        elif policy == 'suffix':
+            destinations[n] = _suffixed(dst, taken, claimed, counters)
+            key = path_key(destinations[n])
+            conflicts.append((src, dst, destinations[n]))
+        else:
+            destinations[n], key = src, src_keys[n]
+            conflicts.append((src, dst, None))
+        resolving.discard(n)
+        claimed.add(key)
+        if destinations[n] != src:
+            order.append(n)
+
+    # the move that frees the name of a move is resolved before it. Chains of such moves, e.g. 1.txt → 2.txt → 3.txt,
+    # can be as long as the plan, so they are followed with a stack instead of recursion
+    for first in range(len(moves)):
+        if destinations[first] is not None:
+            continue
+        stack = [first]
+        resolving.add(first)
+        while stack:
+            n = stack[-1]
+            src, dst = moves[n]
+            key = dst_keys[n]
+            # the same checks as free(), up to the move that frees the name
+            m = freeing.get(key) if src != dst and key not in claimed and key != src_keys[n] else None
+            if m is not None and m not in resolving and destinations[m] is None:
+                stack.append(m)
+                resolving.add(m)
+            else:
+                stack.pop()
+                visit(n)
+    return Resolution(destinations, order, conflicts)
+
+
+def _suffixed(dst, taken, claimed, counters):
+    """Returns dst with the lowest counter added to its name that is neither taken nor claimed, e.g. a_2.txt"""
+    base = path_key(dst)
+    counter = counters.get(base, 1)
+    while True:
+        candidate = dst.with_name(f"{dst.stem}_{counter}{dst.suffix}")
+        key = path_key(candidate)
+        counter += 1
+        if key not in taken and key not in claimed:
+            counters[base] = counter
+            return candidate
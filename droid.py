@@ -0,0 +1,323 @@
+import io
+import csv
+import numpy as np
+import pandas as pd
+
+try:  # pyarrow is optional and only used if it is installed and requested
+    import pyarrow
+    import pyarrow.csv
+except ImportError:
+    pyarrow = None
+
+# all columns of a DROID export and the dtypes they are parsed with. integer columns are read straight into nullable
+# integers and columns with few distinct values as categoricals
+COLUMNS = {
+    'ID': 'Int64',
+    'PARENT_ID': 'Int64',
+    'URI': 'str',
+    'FILE_PATH': 'str',
+    'NAME': 'str',
+    'METHOD': 'category',
+    'STATUS': 'category',
+    'SIZE': 'Int64',
+    'TYPE': 'category',
+    'EXT': 'str',
+    'LAST_MODIFIED': 'str',
+    # categories are booleans so the values are written as 'True' and 'False' like before
+    'EXTENSION_MISMATCH': pd.CategoricalDtype([False, True]),
+    'MD5_HASH': 'str',
+    'FORMAT_COUNT': 'Int64',
+    'PUID': 'category',
+    'MIME_TYPE': 'category',
+    'FORMAT_NAME': 'category',
+    'FORMAT_VERSION': 'str',
+}
+# columns that are not present in the LIStA Excel template
+DROPPED_COLUMNS = ('URI', 'FILE_PATH', 'METHOD', 'STATUS')
+ENGINES = ('c', 'pyarrow')
+# ways rows that DROID matched to multiple formats are folded into the standard columns; 'join' joins the values of all
+# formats with MULTI_FORMAT_SEPARATOR, 'rows' adds a copy of the row for every additional format
+MULTI_FORMAT_MODES = ('join', 'rows')
+MULTI_FORMAT_SEPARATOR = ' | '
+# columns read to rebuild the paths and depths, see Hierarchy
+HIERARCHY_COLUMNS = ('ID', 'PARENT_ID', 'NAME', 'TYPE')
+
+
+def read_header(path):
+    """Reads the header row of a DROID csv
+
+    :param str | pathlib.Path path: Path to the DROID csv
+    :return list[str]: The column names
+    """
+    with open(path, 'r', encoding='utf8', newline='') as f:
+        return next(csv.reader(f), [])
+
+
+def read_chunks(path, chunk_size, drop=DROPPED_COLUMNS, engine='c', multi_format='join'):
+    """Reads a DROID csv in chunks, skipping dropped columns entirely and parsing all others with the dtypes in
+    COLUMNS. Columns unknown to COLUMNS are read as strings. The index of the chunks continues across chunks, so every
+    row keeps its 0-based position in the file. Rows DROID matched to multiple formats are folded while reading, see
+    MultiFormatReader
+
+    :param str | pathlib.Path path: Path to the DROID csv
+    :param int chunk_size: Number of rows per chunk
+    :param tuple[str] drop: Columns that are not parsed
+    :param str engine: One of ENGINES; 'pyarrow' requires pyarrow to be installed
+    :param str multi_format: One of MULTI_FORMAT_MODES
+    :raises OSError: If the file can't be read; raised immediately, not when iterating
+    :raises pandas.errors.ParserError: When iterating, if a row can't be parsed
+    :return typing.Iterator[pandas.DataFrame]: The chunks
+    """
+    header = read_header(path)
+    columns = [column for column in header if column not in drop]
+    dtypes = {column: COLUMNS.get(column, 'str') for column in columns}
+    if engine == 'pyarrow':
+        if pyarrow is None:
+            raise ImportError("The pyarrow engine requires pyarrow to be installed")
+        return _read_chunks_pyarrow(path, chunk_size, columns, dtypes, header, multi_format)
+    return _read_chunks_c(path, chunk_size, columns, dtypes, header, multi_format)
+
+
+def read_hierarchy(path, chunk_size, engine='c'):
+    """Reads the hierarchy of all rows of a DROID csv, see Hierarchy
+
+    :param str | pathlib.Path path: Path to the DROID csv
+    :param int chunk_size: Number of rows read at a time
+    :param str engine: One of ENGINES
+    :raises OSError: If the file can't be read
+    :raises ValueError: If a column in HIERARCHY_COLUMNS is missing
+    :raises pandas.errors.ParserError: If a row can't be parsed
+    :return Hierarchy: The hierarchy
+    """
+    header = read_header(path)
+    missing_columns = [column for column in HIERARCHY_COLUMNS if column not in header]
+    if missing_columns:
+        raise ValueError(f"Missing columns: {', '.join(missing_columns)}")
+    return Hierarchy.from_chunks(read_chunks(path, chunk_size, engine=engine,
+                                             drop=[column for column in header if column not in HIERARCHY_COLUMNS]))
+
+
+def format_chunk(chunk, remove_folders, hierarchy=None):
+    """Formats one chunk of a DROID csv to fit in the LIStA Excel template
+
+    :param pandas.DataFrame chunk: Rows as read from the DROID csv
+    :param bool remove_folders: Whether to remove folders
+    :param Hierarchy | None hierarchy: Adds the columns RELATIVE_PATH and DEPTH of the rows if passed
+    :return pandas.DataFrame: The formatted rows, indexed by their 1-based row number in the input file
+    """
+    if remove_folders:  # removes rows that contain folders
+        chunk = chunk[chunk['TYPE'].str.contains("Folder") == False]
+
+    if hierarchy is not None:
+        chunk = chunk.copy()
+        chunk['RELATIVE_PATH'], chunk['DEPTH'] = hierarchy.columns(chunk)
+
+    chunk.index += 1
+    return chunk
+
+
+def _read_chunks_c(path, chunk_size, columns, dtypes, header, multi_format):
+    # the c engine parses nullable integers about half as fast as floats, so they are parsed as floats and cast
+    # afterwards. floats represent all integers up to 2^53 exactly, which is more than enough for IDs and sizes
+    integers = {column: dtype for column, dtype in dtypes.items() if dtype == 'Int64'}
+    parse_dtypes = dtypes | dict.fromkeys(integers, 'float64')
+    with open(path, 'rb') as f:
+        reader = MultiFormatReader(f, header, multi_format)
+        for chunk in pd.read_csv(reader, chunksize=chunk_size, usecols=columns, dtype=parse_dtypes, encoding='utf8'):
+            yield chunk.astype(integers)
+
+
+def _read_chunks_pyarrow(path, chunk_size, columns, dtypes, header, multi_format):
+    convert_options = pyarrow.csv.ConvertOptions(
+        column_types={column: arrow_type(dtype) for column, dtype in dtypes.items()},
+        include_columns=columns,
+        strings_can_be_null=True,
+        true_values=['true', 'True', 'TRUE'],
+        false_values=['false', 'False', 'FALSE'],
+    )
+    start = 0
+    pending = []
+    pending_rows = 0
+
+    def to_frame(table):
+        df = table.to_pandas(types_mapper={pyarrow.int64(): pd.Int64Dtype()}.get)
+        df.index = pd.RangeIndex(start, start + len(df))
+        return df.astype(dtypes)
+
+    try:
+        # the reader returns blocks of a fixed number of bytes, so they are joined and split into chunk_size rows
+        with open(path, 'rb') as f, pyarrow.csv.open_csv(MultiFormatReader(f, header, multi_format),
+                                                         convert_options=convert_options) as reader:
+            for batch in reader:
+                pending.append(batch)
+                pending_rows += batch.num_rows
+                while pending_rows >= chunk_size:
+                    table = pyarrow.Table.from_batches(pending)
+                    yield to_frame(table.slice(0, chunk_size))
+                    start += chunk_size
+                    rest = table.slice(chunk_size)
+                    pending = rest.to_batches()
+                    pending_rows = rest.num_rows
+            if pending_rows:
+                yield to_frame(pyarrow.Table.from_batches(pending))
+    except pyarrow.ArrowInvalid as AI:
+        # raised as ParserError, so callers only have to handle the errors of the c engine
+        raise pd.errors.ParserError(str(AI)) from AI
+
+
+def arrow_type(dtype):
+    """Returns the pyarrow type a column with the passed pandas dtype is read as"""
+    if isinstance(dtype, pd.CategoricalDtype):  # checked first, since CategoricalDtype == 'category' is always True
+        return pyarrow.bool_()
+    if dtype == 'Int64':
+        return pyarrow.int64()
+    if dtype == 'category':
+        return pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    return pyarrow.string()
+
+
+class MultiFormatReader(io.RawIOBase):
+    """Wraps a DROID csv opened in binary mode and folds rows DROID matched to multiple formats into the standard
+    columns while the file is read. DROID appends a group of PUID, MIME_TYPE, FORMAT_NAME and FORMAT_VERSION for every
+    additional format, so these rows have more fields than the header. Without folding they can't be parsed; this mostly
+    happens with ~$xxx.doc lock files generated by Microsoft products, example in .test/exdir_with_bug.csv
+
+    Since DROID quotes every field, a block of lines whose number of quotes matches the header is passed through
+    unchanged; only blocks that contain a longer row are looked at line by line
+
+    :param typing.BinaryIO f: The DROID csv, opened in binary mode
+    :param list[str] header: The column names of the DROID csv
+    :param str mode: One of MULTI_FORMAT_MODES
+    """
+    def __init__(self, f, header, mode='join'):
+        super().__init__()
+        self.f = f
+        self.mode = mode
+        self.columns = len(header)
+        # the format columns are the last columns of the header, every additional format adds a group of them
+        self.format_start = header.index('PUID') if 'PUID' in header else self.columns
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        """Returns complete lines of at least size bytes, with rows with multiple formats folded"""
+        block = self.f.read(size)
+        if block and not block.endswith(b'\n'):
+            block += self.f.readline()
+        # every field of a normal row adds two quotes, so the quotes and lines are counted. numpy counts bytes several
+        # times faster than bytes.count(), and values containing escaped quotes only cause the block to be checked line
+        # by line
+        data = np.frombuffer(block, np.uint8)
+        lines = np.count_nonzero(data == ord('\n')) + (len(block) > 0 and not block.endswith(b'\n'))
+        if np.count_nonzero(data == ord('"')) == lines * 2 * self.columns:
+            return block
+        return b''.join(self._fold(line) for line in block.splitlines(keepends=True))
+
+    def _fold(self, line):
+        """Folds a single line if it has the additional format columns of a row with multiple formats
+
+        :param bytes line: The line, including its line ending
+        :return bytes: The folded line or lines or the unchanged line
+        """
+        if line.count(b'","') < self.columns:  # not more fields than the header
+            return line
+        row = next(csv.reader([line.decode('utf8')]), [])
+        width = self.columns - self.format_start
+        extra = len(row) - self.columns
+        if extra <= 0 or width == 0 or extra % width:
+            return line  # left to the parser, which reports it as malformed
+        base = row[:self.format_start]
+        formats = [row[i:i + width] for i in range(self.format_start, len(row), width)]
+        if self.mode == 'rows':
+            rows = [base + values for values in formats]
+        else:
+            # values are only joined if there is any, so columns empty for all formats stay empty
+            rows = [base + [MULTI_FORMAT_SEPARATOR.join(values) if any(values) else ''
+                            for values in zip(*formats)]]
+        out = io.StringIO()
+        csv.writer(out, quoting=csv.QUOTE_ALL, lineterminator='\n').writerows(rows)
+        return out.getvalue().encode('utf8')
+
+
+class Hierarchy:
+    """The relative path and depth of every element of a DROID csv, rebuilt from ID and PARENT_ID, since droid-csv
+    drops FILE_PATH and URI. The parent of every row is looked up once and the depths are found by pointer jumping:
+    every round adds the depth of the ancestor a row points to and makes it point to that ancestor's ancestor, so
+    log2(rows) rounds of array operations reach the top of any tree. Only the names of possible parents are kept
+
+    Rows whose parent is not in the csv are orphans; they and their elements get paths starting at the orphan. Rows in
+    or below a cycle of parents never reach a top and get no path or depth
+
+    :param numpy.ndarray ids: The ID of every row
+    :param numpy.ndarray parent_ids: The PARENT_ID of every row, -1 if it has none
+    :param numpy.ndarray names: The NAME of every row that may be a parent, None for all others
+    """
+    def __init__(self, ids, parent_ids, names):
+        self._order = np.argsort(ids, kind='stable')
+        self._ids = ids[self._order]
+        self.names = names
+        self.parents = self._lookup(parent_ids)
+        # only the names of folders and containers are kept, so a parent of any other type has no name
+        parent_rows = self.parents[self.parents >= 0]
+        self.names[parent_rows[pd.isna(self.names[parent_rows])]] = ''
+        # the parent is missing, but the row has a PARENT_ID
+        self.orphans = (self.parents < 0) & (parent_ids >= 0)
+        self.depths = (self.parents >= 0).astype('int64')
+        top = self.parents.copy()
+        for _ in range(len(ids).bit_length() + 1):
+            active = np.flatnonzero(top >= 0)
+            if len(active) == 0:
+                break
+            ancestors = top[active]
+            # both are read before they are written, so every row jumps from the state of the previous round
+            self.depths[active], top[active] = self.depths[active] + self.depths[ancestors], top[ancestors]
+        self.cycles = top >= 0
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Reads the hierarchy from the chunks of a DROID csv
+
+        :param typing.Iterable[pandas.DataFrame] chunks: Rows with the columns in HIERARCHY_COLUMNS
+        :return Hierarchy: The hierarchy
+        """
+        ids, parent_ids, names = [], [], []
+        for chunk in chunks:
+            ids.append(chunk['ID'].to_numpy(dtype='int64', na_value=-1))
+            parent_ids.append(chunk['PARENT_ID'].to_numpy(dtype='int64', na_value=-1))
+            # only folders and containers like zip files have elements
+            chunk_names = chunk['NAME'].fillna('').to_numpy(dtype=object)
+            chunk_names[(chunk['TYPE'] == 'File').to_numpy(dtype=bool, na_value=False)] = None
+            names.append(chunk_names)
+        if not ids:
+            return cls(np.empty(0, 'int64'), np.empty(0, 'int64'), np.empty(0, object))
+        return cls(np.concatenate(ids), np.concatenate(parent_ids), np.concatenate(names))
+
+    def columns(self, chunk):
+        """Returns the RELATIVE_PATH and DEPTH of the rows of a chunk. The paths are built one level at a time for all
+        rows, prepending the names of their ancestors, with the separator used by DROID on Windows
+
+        :param pandas.DataFrame chunk: Rows of the DROID csv with ID and NAME
+        :return tuple[pandas.Series, pandas.Series]: The paths and depths, indexed like chunk
+        """
+        rows = self._lookup(chunk['ID'].to_numpy(dtype='int64', na_value=-1))
+        known = rows >= 0
+        known[known] = ~self.cycles[rows[known]]
+        paths = chunk['NAME'].fillna('').to_numpy(dtype=object)
+        paths[~known] = None
+        depths = np.full(len(rows), -1, dtype='int64')
+        depths[known] = self.depths[rows[known]]
+        ancestors = np.where(known, rows, -1)
+        ancestors[known] = self.parents[ancestors[known]]
+        while (level := np.flatnonzero(ancestors >= 0)).size:
+            paths[level] = self.names[ancestors[level]] + '\\' + paths[level]
+            ancestors[level] = self.parents[ancestors[level]]
+        depths = pd.Series(depths, index=chunk.index, dtype='Int64')
+        return pd.Series(paths, index=chunk.index, dtype=object), depths.mask(depths < 0)
+
+    def _lookup(self, ids):
+        """Returns the row of every ID or -1 if it is not in the csv"""
+        if len(self._ids) == 0:
+            return np.full(len(ids), -1, dtype='int64')
+        positions = np.minimum(np.searchsorted(self._ids, ids), len(self._ids) - 1)
+        return np.where((self._ids[positions] == ids) & (ids >= 0), self._order[positions], -1)
@@ -0,0 +1,151 @@
+import csv
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# columns of the DROID csv read by each pass of duplicates; the first pass only finds the sizes shared by several files
+SIZE_COLUMNS = ('TYPE', 'SIZE')
+COLUMNS = ('ID', 'FILE_PATH', 'TYPE', 'SIZE', 'MD5_HASH')
+REPORT_COLUMNS = ('Group', 'MD5_HASH', 'SIZE', 'Count', 'Wasted bytes', 'ID', 'FILE_PATH')
+# candidate rows kept in memory before the index is spilled to disk, about 200 bytes each
+SPILL_ROWS = 1000000
+# the spilled rows are split by the first two hex digits of their MD5, so every bucket can be grouped on its own
+BUCKET_DIGITS = 2
+_INDEX_DTYPES = {'ID': 'Int64', 'FILE_PATH': 'str', 'SIZE': 'int64', 'MD5_HASH': 'str'}
+
+
+def shared_sizes(chunks):
+    """Finds the sizes of files that have the same size as another file, since only they can be duplicates. Only the
+    sizes are held in memory, 8 bytes per file. Empty files are left out, since they take up no space
+
+    :param typing.Iterable[pandas.DataFrame] chunks: Rows of the DROID csv with the columns in SIZE_COLUMNS
+    :return numpy.ndarray: The sizes, sorted
+    """
+    sizes = [_file_sizes(chunk) for chunk in chunks]
+    if not sizes:
+        return np.empty(0, dtype='int64')
+    values, counts = np.unique(np.concatenate(sizes), return_counts=True)
+    return values[(counts > 1) & (values > 0)]
+
+
+def _file_sizes(chunk):
+    files = chunk[(chunk['TYPE'] != 'Folder') & chunk['SIZE'].notna()]
+    return files['SIZE'].to_numpy(dtype='int64')
+
+
+def candidates(chunk, sizes):
+    """Returns the files of a chunk that have a size in sizes and an MD5
+
+    :param pandas.DataFrame chunk: Rows of the DROID csv with the columns in COLUMNS
+    :param numpy.ndarray sizes: The sizes returned by shared_sizes()
+    :return pandas.DataFrame: The rows with the columns of the index; MD5s are lower case
+    """
+    files = chunk[(chunk['TYPE'] != 'Folder') & chunk['SIZE'].notna() & chunk['MD5_HASH'].notna()]
+    files = files[np.isin(files['SIZE'].to_numpy(dtype='int64'), sizes)]
+    return pd.DataFrame({
+        'ID': files['ID'],
+        'FILE_PATH': files['FILE_PATH'],
+        'SIZE': files['SIZE'].astype('int64'),
+        'MD5_HASH': files['MD5_HASH'].str.lower(),
+    })
+
+
+class Index:
+    """Groups files by MD5 and size. Rows are kept in memory until there are more than spill_rows, then all rows are
+    appended to bucket files in a temporary directory, so exports larger than the memory can be grouped one bucket at
+    a time
+
+    :param int spill_rows: Number of rows kept in memory
+    """
+    def __init__(self, spill_rows=SPILL_ROWS):
+        self.spill_rows = spill_rows
+        self.spilled = False
+        self._pending = []
+        self._pending_rows = 0
+        self._spill_dir = None
+
+    def add(self, rows):
+        """Adds rows returned by candidates()
+
+        :param pandas.DataFrame rows: The rows
+        :raises OSError: If the rows are spilled and the bucket files can't be written
+        """
+        if rows.empty:
+            return
+        self._pending.append(rows)
+        self._pending_rows += len(rows)
+        if self._pending_rows >= self.spill_rows:
+            self._spill()
+
+    def groups(self):
+        """Yields the duplicate files with a Group number shared by all copies of a file. The files of every frame are
+        ordered from the largest to the smallest; the numbers are counted across all frames
+
+        :raises OSError: If the bucket files can't be read
+        :return typing.Iterator[pandas.DataFrame]: Rows with the columns in REPORT_COLUMNS, one frame per bucket or a
+            single frame if the index was never spilled
+        """
+        first_group = 1
+        if not self.spilled:
+            buckets = [pd.concat(self._pending)] if self._pending else []
+        else:
+            self._spill()
+            buckets = (pd.read_csv(path, names=list(_INDEX_DTYPES), dtype=_INDEX_DTYPES, keep_default_na=False,
+                                   na_values={'ID': ['']}) for path in sorted(Path(self._spill_dir).iterdir()))
+        for rows in buckets:
+            duplicates = _group(rows, first_group)
+            if not duplicates.empty:
+                first_group = duplicates['Group'].iat[-1] + 1
+                yield duplicates
+
+    def close(self):
+        """Removes the bucket files"""
+        self._pending.clear()
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def _spill(self):
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix='lista-tools-duplicates-')
+        self.spilled = True
+        if not self._pending:
+            return
+        rows = pd.concat(self._pending)
+        self._pending.clear()
+        self._pending_rows = 0
+        for bucket, part in rows.groupby(rows['MD5_HASH'].str[:BUCKET_DIGITS], sort=False):
+            part.to_csv(Path(self._spill_dir) / f'{bucket}.csv', mode='a', header=False, index=False,
+                        quoting=csv.QUOTE_ALL)
+
+
+def _group(rows, first_group):
+    """Returns the rows that share their MD5 and size with another row, see Index.groups()"""
+    counts = rows.groupby(['MD5_HASH', 'SIZE'], sort=False)['ID'].transform('size')
+    rows = rows[counts > 1].assign(Count=counts[counts > 1])
+    # largest files first, since they waste the most space
+    rows = rows.sort_values(['SIZE', 'MD5_HASH', 'ID'], ascending=[False, True, True], kind='stable')
+    new_group = (rows['MD5_HASH'] != rows['MD5_HASH'].shift()) | (rows['SIZE'] != rows['SIZE'].shift())
+    rows['Group'] = new_group.cumsum() + first_group - 1
+    rows['Wasted bytes'] = rows['SIZE'] * (rows['Count'] - 1)
+    return rows[list(REPORT_COLUMNS)]
+
+
+class ReportWriter:
+    """Writes the duplicate groups to a csv
+
+    :param pathlib.Path dst: Path to the report
+    """
+    def __init__(self, dst):
+        self.paths = [dst]  # like template.CsvWriter, so a partial report is removed the same way
+        self.f = open(dst, 'w', encoding='utf8', newline='')
+        self.f.write(','.join(f'"{column}"' for column in REPORT_COLUMNS) + '\n')
+
+    def write(self, duplicates):
+        """Appends a frame yielded by Index.groups()"""
+        duplicates.to_csv(self.f, header=False, index=False, quoting=csv.QUOTE_ALL, lineterminator='\n')
+
+    def close(self):
+        self.f.close()
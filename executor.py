@@ -0,0 +1,109 @@
+import heapq
+import collections
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import collisions
+
+# number of operations queued per thread, so the threads never wait for the next operation to be submitted
+QUEUED_PER_JOB = 2
+
+
+def dependencies(operations, start=0):
+    """Finds the operations every operation has to wait for, so applying them in parallel gives the same result as
+    applying them one after another: an operation waits for the last earlier operation involving its source, its
+    destination or a directory above them, compared like collisions.path_key(), and renaming, moving or removing a
+    directory waits for all earlier operations on the elements below it, at any depth, even if the directories in
+    between are not changed
+
+    :param list[tuple[str, pathlib.Path, pathlib.Path | None]] operations: The operations as (kind, src, dst)
+    :param int start: Operations before start are already applied and ignored
+    :return tuple[list[int], dict[int, list[int]]]: The number of operations every operation waits for and the
+        operations waiting for every operation
+    """
+    waiting = [0] * len(operations)
+    dependents = collections.defaultdict(list)
+    last = {}  # the last operation involving a path, by collisions.path_key()
+    keys = [[collisions.path_key(src)] if dst is None else [collisions.path_key(src), collisions.path_key(dst)]
+            for _, src, dst in operations[start:]]
+    # only directories that are the source or destination of an operation change, so the others are left out of the
+    # directories above an operation
+    changed = {key for operation_keys in keys for key in operation_keys}
+    below = collections.defaultdict(list)  # the operations below a directory
+    cache = {}
+    for n, operation_keys in enumerate(keys, start):
+        # the directories are taken from the keys, which already hashed them
+        ancestors = _ancestors(operation_keys[0][0], changed, cache)
+        if len(operation_keys) == 2 and operation_keys[1][0] != operation_keys[0][0]:
+            ancestors = ancestors | _ancestors(operation_keys[1][0], changed, cache)
+        before = {last.get(key) for key in operation_keys}
+        before.update(last[key] for key in ancestors if key in last)
+        before.update(below.pop(operation_keys[0], ()))
+        before.discard(None)
+        waiting[n] = len(before)
+        for m in before:
+            dependents[m].append(n)
+        for key in operation_keys:
+            last[key] = n
+        for key in ancestors:
+            below[key].append(n)
+    return waiting, dependents
+
+
+def run(operations, apply, jobs=1, start=0, limit=None):
+    """Applies operations and yields the outcome of every operation as soon as it is finished. With more than one job,
+    the operations are applied on a pool of threads as soon as the operations they depend on are finished, see
+    dependencies(); an operation is only submitted after the outcomes of these operations were consumed
+
+    :param list[tuple[str, pathlib.Path, pathlib.Path | None]] operations: The operations as (kind, src, dst)
+    :param typing.Callable[[int], any] apply: Applies the operation with the passed index
+    :param int jobs: Number of operations applied at the same time
+    :param int start: Index of the first operation to apply
+    :param typing.Callable[[], int] | None limit: Returns the index up to which operations may be started; checked
+        every time an operation is finished
+    :return typing.Iterator[tuple[int, any, OSError | None]]: The index of every operation, the value apply returned
+        and the error it raised
+    """
+    if jobs <= 1:
+        for n in range(start, len(operations)):
+            yield n, *_outcome(apply, n)
+        return
+
+    waiting, dependents = dependencies(operations, start)
+    ready = [n for n in range(start, len(operations)) if waiting[n] == 0]  # already sorted, so a valid heap
+    running = {}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while ready or running:
+            # the lowest indices first, so the operations are finished in about the order they were planned
+            # the limit is ignored if nothing is running, since nothing could raise it anymore
+            while ready and len(running) < jobs * QUEUED_PER_JOB and (limit is None or ready[0] < limit()
+                                                                      or not running):
+                n = heapq.heappop(ready)
+                running[pool.submit(_outcome, apply, n)] = n
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                n = running.pop(future)
+                yield n, *future.result()
+                for m in dependents.pop(n, ()):
+                    waiting[m] -= 1
+                    if waiting[m] == 0:
+                        heapq.heappush(ready, m)
+
+
+def _ancestors(directory, changed, cache):
+    """Returns the keys of a directory and all directories above it that are in changed, like collisions.path_key();
+    most operations are in the same directories, so they are cached by directory"""
+    ancestors = cache.get(directory)
+    if ancestors is None:
+        key = collisions.path_key(directory)
+        ancestors = _ancestors(directory.parent, changed, cache) if directory.parent != directory else frozenset()
+        if key in changed:
+            ancestors = ancestors | {key}
+        cache[directory] = ancestors
+    return ancestors
+
+
+def _outcome(apply, n):
+    try:
+        return apply(n), None
+    except OSError as OSE:
+        return None, OSE
@@ -0,0 +1,183 @@
+import re
+import fnmatch
+import numpy as np
+
+import scanner
+
+# the types elements can be selected by
+TYPES = ('file', 'directory', 'symlink')
+# patterns starting with this are regular expressions instead of glob patterns
+REGEX_PREFIX = 're:'
+# the type of the elements of a directory and the TYPE of the rows of a DROID csv every type selects. DROID lists
+# archives like zip files as containers and doesn't list symlinks
+_ENTRY_TYPES = {'file': scanner.FILE, 'directory': scanner.DIRECTORY, 'symlink': scanner.SYMLINK}
+_DROID_TYPES = {'file': ('File', 'Container'), 'directory': ('Folder',), 'symlink': ()}
+# units of sizes, in powers of 1024 like the Windows Explorer
+_SIZE_UNITS = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+_SIZE = re.compile(r"\s*(\d+(?:\.\d*)?)\s*([kmgt]?)i?b?\s*", re.IGNORECASE)
+
+
+def parse_size(text):
+    """Parses a size like 500, 64K, 1.5G or 2 MB
+
+    :param str text: The size
+    :raises ValueError: If text is not a size
+    :return int: The size in bytes
+    """
+    match = _SIZE.fullmatch(text)
+    if match is None:
+        raise ValueError(f"{text!r} is not a size, e.g. 500, 64K or 1.5G")
+    return int(float(match[1]) * _SIZE_UNITS[match[2].lower()])
+
+
+def compile_patterns(patterns):
+    """Compiles glob patterns and regular expressions into one regular expression, so a name is matched once, no
+    matter how many patterns there are. Glob patterns must match the whole name, regular expressions are searched in
+    it; both ignore case, like the file systems of Windows and macOS
+
+    :param typing.Iterable[str] patterns: Glob patterns, e.g. *.tmp, or regular expressions starting with REGEX_PREFIX
+    :raises re.error: If a regular expression is not valid
+    :return re.Pattern | None: The expression, used with match(); None if there are no patterns
+    """
+    parts = []
+    for pattern in patterns:
+        if pattern.startswith(REGEX_PREFIX):
+            re.compile(pattern[len(REGEX_PREFIX):])  # so errors point at the expression and not at the combined one
+            parts.append(f"(?s:.*?)(?:{pattern[len(REGEX_PREFIX):]})")
+        else:
+            parts.append(fnmatch.translate(pattern))
+    if not parts:
+        return None
+    return re.compile('|'.join(f"(?:{part})" for part in parts), re.IGNORECASE)
+
+
+class Filter:
+    """Selects the elements a command processes by their name, type and size. An excluded element is never processed
+    and an excluded directory is not even read, so nothing inside it is processed and the time it would take to scan
+    it is saved. Include patterns, types and sizes only select which of the other elements are processed; directories
+    are searched even if they are not selected, so --include '*.pdf' finds the pdf files in all subdirectories
+
+    :param typing.Iterable[str] include: Only elements whose name matches one of these patterns are selected, see
+        compile_patterns(); all if there are none
+    :param typing.Iterable[str] exclude: Elements whose name matches one of these patterns are excluded
+    :param typing.Iterable[str] types: Only elements of these types are selected; one of TYPES each, all if there are
+        none
+    :param int | None min_size: Only files of at least this many bytes are selected. Other elements have no size and
+        are not affected
+    :param int | None max_size: Only files of at most this many bytes are selected
+    :raises re.error: If a regular expression is not valid
+    """
+    def __init__(self, include=(), exclude=(), types=(), min_size=None, max_size=None):
+        self.include = compile_patterns(include)
+        self.exclude = compile_patterns(exclude)
+        self.types = {_ENTRY_TYPES[element_type] for element_type in types} or None
+        self.droid_types = [droid_type for element_type in types for droid_type in _DROID_TYPES[element_type]] or None
+        self.min_size = min_size
+        self.max_size = max_size
+
+    def excludes(self, name):
+        """Checks if an element is excluded
+
+        :param str name: The name of the element
+        :return bool: Whether it is excluded
+        """
+        return self.exclude is not None and self.exclude.match(name) is not None
+
+    def selects(self, entry):
+        """Checks if an element that is not excluded is selected. Only the size of files is read, and only if a size is
+        set; it is cached in the entry
+
+        :param scanner.Entry entry: The element
+        :raises OSError: If the size of the element can't be read
+        :return bool: Whether it is selected
+        """
+        if self.include is not None and self.include.match(entry.name) is None:
+            return False
+        if self.types is not None and entry.type not in self.types:
+            return False
+        if (self.min_size is not None or self.max_size is not None) and entry.type == scanner.FILE:
+            size = entry.stat().st_size
+            return (self.min_size is None or size >= self.min_size) and (self.max_size is None or size <= self.max_size)
+        return True
+
+    def apply(self, entries, subdirectories=None):
+        """Selects the elements of a directory. Excluded directories are removed from subdirectories, so
+        scanner.walk() doesn't descend into them
+
+        :param list[scanner.Entry] entries: All elements of the directory
+        :param list[scanner.Entry] | None subdirectories: The subdirectories yielded by scanner.walk()
+        :raises OSError: If the size of an element can't be read
+        :return list[scanner.Entry]: The selected elements
+        """
+        if self.exclude is not None:
+            entries = [entry for entry in entries if self.exclude.match(entry.name) is None]
+            if subdirectories is not None:
+                subdirectories[:] = [entry for entry in subdirectories if self.exclude.match(entry.name) is None]
+        return [entry for entry in entries if self.selects(entry)]
+
+
+class RowFilter:
+    """Applies a Filter to the rows of a DROID csv, chunk by chunk: names are matched against NAME, which includes
+    EXT, types against TYPE and sizes against SIZE. The elements inside an excluded folder or container are left out
+    as well, by their PARENT_ID. DROID lists every element after the folder it is in, so the IDs of all excluded rows
+    are known by the time their elements are read; they are kept as a sorted array
+
+    :param Filter element_filter: The filter
+    """
+    def __init__(self, element_filter):
+        self.filter = element_filter
+        self._excluded = np.empty(0, dtype='int64')  # IDs of all excluded rows so far
+
+    def apply(self, chunk):
+        """Returns the selected rows of a chunk
+
+        :param pandas.DataFrame chunk: Rows as read from the DROID csv
+        :raises ValueError: If a column needed by the filter is missing
+        :return pandas.DataFrame: The selected rows
+        """
+        element_filter = self.filter
+        sized = element_filter.min_size is not None or element_filter.max_size is not None
+        needed = ['NAME'] if element_filter.include is not None else []
+        if element_filter.exclude is not None:
+            needed += ['NAME', 'ID', 'PARENT_ID']
+        if element_filter.droid_types is not None or sized:
+            needed.append('TYPE')
+        if sized:
+            needed.append('SIZE')
+        missing_columns = [column for column in dict.fromkeys(needed) if column not in chunk.columns]
+        if missing_columns:
+            raise ValueError(f"Missing columns for the filter: {', '.join(missing_columns)}")
+
+        selected = np.ones(len(chunk), dtype=bool)
+        if element_filter.exclude is not None:
+            excluded = _matches(element_filter.exclude, chunk['NAME'])
+            ids = chunk['ID'].to_numpy(dtype='int64', na_value=-1)
+            parent_ids = chunk['PARENT_ID'].to_numpy(dtype='int64', na_value=-1)
+            excluded |= np.isin(parent_ids, self._excluded)
+            # elements of folders excluded in the same chunk are found one level at a time
+            while (below := ~excluded & np.isin(parent_ids, ids[excluded & (ids >= 0)])).any():
+                excluded |= below
+            self._excluded = np.union1d(self._excluded, ids[excluded & (ids >= 0)])
+            selected &= ~excluded
+        if element_filter.include is not None:
+            selected &= _matches(element_filter.include, chunk['NAME'])
+        if element_filter.droid_types is not None:
+            selected &= chunk['TYPE'].isin(element_filter.droid_types).to_numpy(dtype=bool)
+        if sized:
+            sizes = chunk['SIZE']
+            in_range = sizes.notna()
+            if element_filter.min_size is not None:
+                in_range &= sizes >= element_filter.min_size
+            if element_filter.max_size is not None:
+                in_range &= sizes <= element_filter.max_size
+            files = chunk['TYPE'].isin(_DROID_TYPES['file'])
+            selected &= (~files | in_range.fillna(False)).to_numpy(dtype=bool)
+        return chunk[selected]
+
+
+def _matches(pattern, names):
+    """Matches the names with the re module instead of Series.str.match(), which may use an engine of pyarrow that
+    doesn't support all of its syntax, so names in a DROID csv are matched like names of elements"""
+    match = pattern.match
+    return np.array([isinstance(name, str) and match(name) is not None for name in names.to_numpy(dtype=object)],
+                    dtype=bool)
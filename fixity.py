@@ -0,0 +1,177 @@
+import os
+import csv
+import hashlib
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# columns of the DROID csv read by verify
+COLUMNS = ('ID', 'PARENT_ID', 'URI', 'FILE_PATH', 'TYPE', 'SIZE', 'MD5_HASH')
+REPORT_COLUMNS = ('ID', 'FILE_PATH', 'Status', 'Expected size', 'Actual size', 'Expected MD5', 'Actual MD5', 'Error')
+OK = 'ok'
+MISSING = 'missing'
+SIZE_MISMATCH = 'size mismatch'
+HASH_MISMATCH = 'hash mismatch'
+UNREADABLE = 'unreadable'
+STATUSES = (OK, MISSING, SIZE_MISMATCH, HASH_MISMATCH, UNREADABLE)
+# bytes read and hashed at a time; large enough that reading isn't slowed down by the number of calls
+BUFFER_SIZE = 1024 * 1024
+# number of files queued per thread, so the threads never wait for the next file to be submitted
+QUEUED_PER_JOB = 4
+
+
+class Check:
+    """A file listed in a DROID csv and the result of checking it
+
+    :param int id_: The ID of the row
+    :param str file_path: The FILE_PATH of the row
+    :param pathlib.Path path: Where the file is expected in the target directory
+    :param int | None size: The expected size, if DROID recorded it
+    :param str | None md5: The expected MD5, if DROID recorded it
+    """
+    __slots__ = ('id', 'file_path', 'path', 'size', 'md5', 'status', 'actual_size', 'actual_md5', 'error')
+
+    def __init__(self, id_, file_path, path, size, md5):
+        self.id = id_
+        self.file_path = file_path
+        self.path = path
+        self.size = size
+        self.md5 = md5
+        self.status = None
+        self.actual_size = None
+        self.actual_md5 = None
+        self.error = None
+
+    def run(self, quick=False):
+        """Compares the size of the file and then its MD5 and sets status to one of STATUSES. Runs on the threads of
+        verify(); the MD5 is only calculated if the sizes match
+
+        :param bool quick: Only compares the size
+        :return Check: Itself
+        """
+        try:
+            self.actual_size = os.stat(self.path).st_size
+            if self.size is not None and self.actual_size != self.size:
+                self.status = SIZE_MISMATCH
+            elif quick or self.md5 is None:
+                self.status = OK
+            else:
+                self.actual_md5 = md5_file(self.path)
+                self.status = OK if self.actual_md5 == self.md5 else HASH_MISMATCH
+        except FileNotFoundError:
+            self.status = MISSING
+        except OSError as OSE:
+            self.status = UNREADABLE
+            self.error = str(OSE)
+        return self
+
+    def report_row(self):
+        """Returns the row of the check in the report"""
+        return (self.id, self.file_path, self.status, self.size, self.actual_size, self.md5, self.actual_md5,
+                self.error)
+
+
+def md5_file(path):
+    """Calculates the MD5 of a file, reading it into a reused buffer. hashlib releases the GIL while hashing, so files
+    are hashed on several cores when this runs on several threads
+
+    :param pathlib.Path path: The file
+    :raises OSError: If the file can't be read
+    :return str: The MD5 as lower case hex digits
+    """
+    md5 = hashlib.md5()
+    buffer = bytearray(BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while n := f.readinto(buffer):
+            md5.update(view[:n])
+    return md5.hexdigest()
+
+
+def droid_root(chunk):
+    """Finds the path DROID was run on in the first chunk of a DROID csv: the FILE_PATH of the first row without
+    PARENT_ID if it is a folder, or the folder containing it otherwise
+
+    :param pandas.DataFrame chunk: The first rows of the DROID csv
+    :return str | None: The path or None if there is no row without PARENT_ID
+    """
+    roots = chunk[chunk['PARENT_ID'].isna()]
+    if roots.empty:
+        return None
+    root = roots.iloc[0]
+    if root['TYPE'] == 'Folder':
+        return root['FILE_PATH']
+    return root['FILE_PATH'][:max(root['FILE_PATH'].rfind('\\'), root['FILE_PATH'].rfind('/'))]
+
+
+def checks(chunk, root, target_dir):
+    """Creates the checks of the files in a chunk of a DROID csv. A FILE_PATH is mapped to the target directory by
+    replacing root with it. Folders, files inside containers like zip files and files outside root are left out. The
+    checks are ordered from the largest to the smallest file, so the large files of a chunk don't end up last on one
+    thread while all others are idle
+
+    :param pandas.DataFrame chunk: Rows of the DROID csv with the columns in COLUMNS
+    :param str root: The path DROID was run on, see droid_root()
+    :param pathlib.Path target_dir: The directory corresponding to root
+    :return tuple[list[Check], int]: The checks and the number of files outside root
+    """
+    files = chunk[(chunk['TYPE'] != 'Folder') & chunk['URI'].str.startswith('file:', na=False)]
+    files = files.sort_values('SIZE', ascending=False, na_position='first')
+    result = []
+    outside = 0
+    prefix = root.rstrip('\\/')
+    for id_, file_path, size, md5 in zip(files['ID'], files['FILE_PATH'], files['SIZE'], files['MD5_HASH']):
+        if not isinstance(file_path, str) or not file_path.startswith(prefix) \
+                or file_path[len(prefix):len(prefix) + 1] not in ('\\', '/'):
+            outside += 1
+            continue
+        parts = file_path[len(prefix) + 1:].replace('\\', '/').split('/')
+        result.append(Check(id_, file_path, target_dir.joinpath(*parts), None if pd.isna(size) else int(size),
+                            md5.lower() if isinstance(md5, str) and md5 else None))
+    return result, outside
+
+
+def verify(batches, jobs=1, quick=False):
+    """Runs the checks on a pool of threads and yields them as they are finished. Only a few checks per thread are
+    submitted at a time, so the batches are read while the files are checked and never all held in memory
+
+    :param typing.Iterable[list[Check]] batches: The checks, e.g. one list per chunk of the DROID csv
+    :param int jobs: Number of files checked at the same time
+    :param bool quick: Only compares the sizes
+    :return typing.Iterator[Check]: The finished checks
+    """
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        running = set()
+        for batch in batches:
+            for check in batch:
+                running.add(pool.submit(check.run, quick))
+                if len(running) >= jobs * QUEUED_PER_JOB:
+                    finished, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        yield future.result()
+        while running:
+            finished, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield future.result()
+
+
+class ReportWriter:
+    """Writes the checks that found a problem to a csv
+
+    :param pathlib.Path dst: Path to the report
+    """
+    def __init__(self, dst):
+        self.paths = [dst]  # like template.CsvWriter, so a partial report is removed the same way
+        self.f = open(dst, 'w', encoding='utf8', newline='')
+        self.writer = csv.writer(self.f, quoting=csv.QUOTE_ALL, lineterminator='\n')
+        self.writer.writerow(REPORT_COLUMNS)
+
+    def write(self, check):
+        """Appends check if its status isn't OK
+
+        :param Check check: A finished check
+        """
+        if check.status != OK:
+            self.writer.writerow(check.report_row())
+
+    def close(self):
+        self.f.close()
@@ -0,0 +1,121 @@
+import csv
+import sqlite3
+import pandas as pd
+
+# a row counts as changed if one of these columns changed; rows are identified by FILE_PATH
+FINGERPRINT_COLUMNS = ('MD5_HASH', 'LAST_MODIFIED')
+ADDED = 'added'
+CHANGED = 'changed'
+REMOVED = 'removed'
+# number of removed paths fetched from the index at a time
+REMOVED_BATCH = 10000
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS rows (path TEXT PRIMARY KEY, fingerprint TEXT NOT NULL) WITHOUT ROWID;
+CREATE TEMP TABLE seen (path TEXT NOT NULL, fingerprint TEXT NOT NULL);
+'''
+
+
+class RowIndex:
+    """An SQLite file of the FILE_PATH and fingerprint of every row emitted by earlier runs of droid-csv. The paths of
+    the new export are collected in a temporary table and joined with the index chunk by chunk, so only added and
+    changed rows are returned and only they are written to the index. All changes are made in one transaction, which
+    is only committed once the delta was written, so an interrupted run leaves the index as it was
+
+    :param pathlib.Path path: Path to the index; created if it doesn't exist
+    :raises sqlite3.Error: If the file can't be opened or isn't an index
+    """
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        self.connection.execute('PRAGMA temp_store = FILE')  # the paths of all rows don't have to fit into memory
+        self.connection.executescript(_SCHEMA)
+        self.connection.execute('BEGIN')
+        self.indexed = self.connection.execute('SELECT EXISTS (SELECT 1 FROM rows)').fetchone()[0] == 1
+        self._seen = 0
+
+    def delta(self, chunk):
+        """Returns the rows of a chunk that were added or changed since the last run, with their change in the column
+        CHANGE, and records them in the index
+
+        :param pandas.DataFrame chunk: Formatted rows with FILE_PATH and the columns in FINGERPRINT_COLUMNS
+        :raises sqlite3.Error: If the index can't be read or written
+        :return pandas.DataFrame: The added and changed rows
+        """
+        paths = chunk['FILE_PATH'].fillna('')
+        fingerprints = pd.Series('', index=chunk.index)
+        for column in FINGERPRINT_COLUMNS:
+            values = chunk[column].astype(object).fillna('').astype(str) if column in chunk.columns else ''
+            fingerprints = fingerprints + '|' + values
+        first = self._seen
+        self.connection.executemany('INSERT INTO seen VALUES (?, ?)', zip(paths, fingerprints))
+        self._seen += len(chunk)
+        # the rowids of seen are the 1-based positions of the rows in the export
+        changes = self.connection.execute(
+            'SELECT seen.rowid, rows.path IS NULL FROM seen LEFT JOIN rows USING (path) '
+            'WHERE seen.rowid > ? AND (rows.path IS NULL OR rows.fingerprint != seen.fingerprint)', (first,)).fetchall()
+        positions = [rowid - first - 1 for rowid, _ in changes]
+        delta = chunk.iloc[positions].copy()
+        delta.insert(0, 'CHANGE', [ADDED if added else CHANGED for _, added in changes])
+        self.connection.executemany('INSERT INTO rows VALUES (?, ?) ON CONFLICT (path) DO UPDATE SET '
+                                    'fingerprint = excluded.fingerprint',
+                                    zip(paths.iloc[positions], fingerprints.iloc[positions]))
+        return delta
+
+    def removed(self):
+        """Yields the paths of the rows that are in the index but not in the export and removes them from the index.
+        Must be called after delta() was called for all chunks
+
+        :raises sqlite3.Error: If the index can't be read or written
+        :return typing.Iterator[list[str]]: The paths, in batches of up to REMOVED_BATCH
+        """
+        self.connection.execute('CREATE INDEX temp.seen_path ON seen (path)')
+        cursor = self.connection.execute('SELECT path FROM rows WHERE path NOT IN (SELECT path FROM seen)')
+        while batch := cursor.fetchmany(REMOVED_BATCH):
+            yield [path for path, in batch]
+        self.connection.execute('DELETE FROM rows WHERE path NOT IN (SELECT path FROM seen)')
+
+    def commit(self):
+        """Saves all changes to the index"""
+        self.connection.execute('COMMIT')
+
+    def close(self):
+        """Closes the index, discarding all changes that weren't committed"""
+        if self.connection.in_transaction:
+            self.connection.execute('ROLLBACK')
+        self.connection.close()
+
+
+class DeltaWriter:
+    """Writes the rows returned by RowIndex.delta() and the removed paths to a csv with header row. Removed rows only
+    have CHANGE and FILE_PATH, since the rest of them is not in the index
+
+    :param pathlib.Path dst: Path to the output file
+    """
+    def __init__(self, dst):
+        self.paths = [dst]
+        self.f = open(dst, 'w', encoding='utf8', newline='')
+        self.columns = None  # written with the first rows
+
+    def write(self, delta):
+        """Appends the rows of delta, indexed by their LfdNr
+
+        :param pandas.DataFrame delta: Rows returned by RowIndex.delta()
+        """
+        if self.columns is None:
+            self.columns = ['LfdNr', *delta.columns]
+            self.f.write(','.join(f'"{column}"' for column in self.columns) + '\n')
+        delta.to_csv(self.f, quoting=csv.QUOTE_ALL, lineterminator='\n', header=False)
+
+    def write_removed(self, paths):
+        """Appends a row for every removed path
+
+        :param list[str] paths: Paths returned by RowIndex.removed()
+        """
+        if self.columns is None:
+            self.columns = ['LfdNr', 'CHANGE', 'FILE_PATH']
+            self.f.write(','.join(f'"{column}"' for column in self.columns) + '\n')
+        removed = pd.DataFrame({'CHANGE': REMOVED, 'FILE_PATH': paths}, columns=self.columns)
+        removed.to_csv(self.f, quoting=csv.QUOTE_ALL, lineterminator='\n', header=False, index=False)
+
+    def close(self):
+        self.f.close()
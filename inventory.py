@@ -0,0 +1,127 @@
+import urllib.parse
+import pandas as pd
+
+import droid
+
+try:  # pyarrow is optional and only needed for the inventory
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.dataset
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# name of the partition column; every accession is a folder named accession=<name> in the inventory
+PARTITION = 'accession'
+# columns stats can group by, in addition to PARTITION
+GROUP_COLUMNS = ('PUID', 'FORMAT_NAME', 'MIME_TYPE', 'TYPE', 'EXT', 'EXTENSION_MISMATCH')
+STATS_COLUMNS = ('Count', 'Total size')
+
+
+def partition_path(store, accession):
+    """Returns the file the rows of an accession are written to. The name is escaped, so it can't leave the inventory
+
+    :param pathlib.Path store: The folder of the inventory
+    :param str accession: The name of the accession
+    :return pathlib.Path: The path
+    """
+    return store / f"{PARTITION}={urllib.parse.quote(accession, safe='')}" / 'part-0.parquet'
+
+
+def schema(columns):
+    """Returns the types the columns of formatted DROID rows are stored with: integers as int64, columns with few
+    distinct values as dictionaries, EXTENSION_MISMATCH as bool and LAST_MODIFIED as timestamp
+
+    :param typing.Iterable[str] columns: The columns of the formatted rows
+    :return pyarrow.Schema: The schema, starting with LfdNr
+    """
+    fields = [pyarrow.field('LfdNr', pyarrow.int64())]
+    for column in columns:
+        if column == 'LAST_MODIFIED':
+            fields.append(pyarrow.field(column, pyarrow.timestamp('ms')))
+        elif column == 'DEPTH':
+            fields.append(pyarrow.field(column, pyarrow.int64()))
+        else:
+            fields.append(pyarrow.field(column, droid.arrow_type(droid.COLUMNS.get(column, 'str'))))
+    return pyarrow.schema(fields)
+
+
+class ParquetWriter:
+    """Writes formatted DROID rows to the partition of an accession, one row group per chunk. The partition is
+    replaced, so an accession that is converted again isn't counted twice
+
+    :param pathlib.Path dst: Path to the partition file, see partition_path()
+    :raises ImportError: If pyarrow is not installed
+    """
+    def __init__(self, dst):
+        if pyarrow is None:
+            raise ImportError("The parquet format requires pyarrow to be installed")
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        self.paths = [dst]
+        self.schema = None  # known with the first rows
+        self.writer = None
+
+    def write(self, chunk):
+        """Appends the rows of chunk, indexed by their LfdNr
+
+        :param pandas.DataFrame chunk: Formatted DROID rows
+        """
+        if self.writer is None:
+            self._open(chunk.columns)
+        frame = chunk.reset_index(names='LfdNr')
+        if 'LAST_MODIFIED' in frame.columns:
+            frame['LAST_MODIFIED'] = pd.to_datetime(frame['LAST_MODIFIED'], format='ISO8601', errors='coerce')
+        if 'EXTENSION_MISMATCH' in frame.columns:
+            frame['EXTENSION_MISMATCH'] = frame['EXTENSION_MISMATCH'].astype('boolean')
+        self.writer.write_table(pyarrow.Table.from_pandas(frame, schema=self.schema, preserve_index=False))
+
+    def close(self):
+        """Finishes the file; must be called for the output to be readable. Writes an empty file if there were no rows
+        """
+        if self.writer is None:
+            self._open([])
+        self.writer.close()
+
+    def _open(self, columns):
+        self.schema = schema(columns)
+        self.writer = pyarrow.parquet.ParquetWriter(self.paths[0], self.schema)
+
+
+def stats(store, by, accessions=None):
+    """Counts the rows of the inventory and sums their sizes by the values of a column. Only that column and SIZE are
+    read, and only from the partitions of the selected accessions
+
+    :param pathlib.Path store: The folder of the inventory
+    :param str by: PARTITION or one of GROUP_COLUMNS
+    :param list[str] | None accessions: Only counts these accessions, defaults to all
+    :raises ImportError: If pyarrow is not installed
+    :raises OSError: If the inventory can't be read
+    :raises ValueError: If there are no accessions, a column is missing or a file is not a valid parquet file
+    :return pandas.DataFrame: The values of the column with the columns in STATS_COLUMNS, largest count first
+    """
+    if pyarrow is None:
+        raise ImportError("The inventory requires pyarrow to be installed")
+    # only the partition files are read, so other files in the inventory, like the errors of watch, don't matter
+    files = sorted(str(path) for path in store.glob(f'{PARTITION}=*/*.parquet'))
+    if not files:
+        raise ValueError(f"{store.name} contains no accessions")
+    dataset = pyarrow.dataset.dataset(files, format='parquet', partitioning='hive', partition_base_dir=str(store))
+    missing_columns = [column for column in (by, 'SIZE') if column not in dataset.schema.names]
+    if missing_columns:
+        raise ValueError(f"Missing columns: {', '.join(missing_columns)}")
+    row_filter = pyarrow.dataset.field(PARTITION).isin(accessions) if accessions else None
+    parts = []
+    # aggregated batch by batch, so only the totals of every batch are held in memory
+    for batch in dataset.to_batches(columns=[by, 'SIZE'], filter=row_filter):
+        table = pyarrow.Table.from_batches([batch])
+        if pyarrow.types.is_dictionary(table.schema.field(by).type):
+            # the dictionaries differ between row groups
+            table = table.set_column(0, by, pyarrow.compute.cast(table[by], table.schema.field(by).type.value_type))
+        parts.append(table.group_by(by).aggregate([('SIZE', 'sum'), ([], 'count_all')]).to_pandas())
+    if not parts:
+        return pd.DataFrame({column: pd.Series(dtype='int64') for column in STATS_COLUMNS},
+                            index=pd.Index([], name=by))
+    totals = pd.concat(parts).groupby(by, dropna=False).agg({'count_all': 'sum', 'SIZE_sum': 'sum'})
+    totals.columns = list(STATS_COLUMNS)
+    totals = totals.astype('int64')
+    return totals.sort_values(['Count', 'Total size'], ascending=False, kind='stable')
@@ -0,0 +1,142 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+
+# operations are started at most this many operations after the last progress written to the journal, so after a crash
+# at most this many operations have to be checked for whether they were already applied
+BATCH_SIZE = 1000
+
+
+class Journal:
+    """Write-ahead journal of the renames, moves and removed directories of a command. The complete plan is written
+    before the first operation is applied, the progress is appended in batches afterwards. This allows an interrupted
+    command to be continued and an applied command to be undone, without walking the directory again
+
+    The journal is a file of JSON lines: a header with the command and target directory, the planned operations as lists
+    of up to BATCH_SIZE [kind, src, dst] and lines recording the progress as {"done": n, "failed": [...]} or
+    {"complete": true}
+
+    :param pathlib.Path path: Path to the journal file
+    """
+    def __init__(self, path):
+        self.path = path
+        self.f = None
+        self.pending_failed = []
+
+    @staticmethod
+    def path_for(journal_dir, target_dir):
+        """Returns the path of the journal of a target directory
+
+        :param pathlib.Path journal_dir: The directory the journals are kept in
+        :param pathlib.Path target_dir: The target directory of the command
+        :return pathlib.Path: The path of the journal
+        """
+        return journal_dir / f"{hashlib.sha1(str(target_dir).encode('utf8')).hexdigest()[:16]}.jsonl"
+
+    def start(self, command, target_dir, operations):
+        """Writes the plan of a command, replacing any previous journal of the target directory
+
+        :param str command: Name of the command
+        :param pathlib.Path target_dir: The target directory of the command
+        :param list[tuple[str, pathlib.Path, pathlib.Path | None]] operations: The planned operations as (kind, src,
+            dst), where kind is 'move' or 'rmdir'
+        :raises OSError: If the journal could not be written
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.f = open(self.path, 'w', encoding='utf8')
+        self.f.write(json.dumps({'command': command, 'target_dir': str(target_dir)}) + '\n')
+        # encoding a whole batch at once is several times faster than encoding every operation on its own
+        for start in range(0, len(operations), BATCH_SIZE):
+            self.f.write(json.dumps([[kind, str(src), None if dst is None else str(dst)]
+                                     for kind, src, dst in operations[start:start + BATCH_SIZE]]) + '\n')
+        self._sync()
+
+    def resume(self):
+        """Opens an existing journal to append further progress
+
+        :raises OSError: If the journal could not be opened
+        """
+        self.f = open(self.path, 'a', encoding='utf8')
+
+    def fail(self, n):
+        """Records that operation n failed; written with the next call of Journal.commit()
+
+        :param int n: Index of the operation
+        """
+        self.pending_failed.append(n)
+
+    def commit(self, done):
+        """Records that all operations before done were applied or failed
+
+        :param int done: Number of operations that were processed
+        :raises OSError: If the journal could not be written
+        """
+        self.f.write(json.dumps({'done': done, 'failed': self.pending_failed}) + '\n')
+        self.pending_failed = []
+        self._sync()
+
+    def complete(self):
+        """Records that the command finished and closes the journal
+
+        :raises OSError: If the journal could not be written
+        """
+        self.f.write(json.dumps({'complete': True}) + '\n')
+        self._sync()
+        self.close()
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+    def load(self):
+        """Reads the journal. A last line that was only partially written before a crash is ignored
+
+        :raises OSError: If the journal could not be read
+        :raises ValueError: If the journal is damaged
+        :return JournalState: The contents of the journal
+        """
+        state = JournalState()
+        with open(self.path, encoding='utf8') as f:
+            lines = f.read().split('\n')
+        header = json.loads(lines[0])
+        state.command = header['command']
+        state.target_dir = Path(header['target_dir'])
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break  # partially written or empty last line
+            if isinstance(record, list):
+                state.operations.extend((kind, Path(src), None if dst is None else Path(dst))
+                                        for kind, src, dst in record)
+            elif record.get('complete'):
+                state.complete = True
+            else:
+                state.done = record['done']
+                state.failed.update(record['failed'])
+        return state
+
+    def remove(self):
+        """Deletes the journal
+
+        :raises OSError: If the journal could not be deleted
+        """
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+    def _sync(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+
+class JournalState:
+    """The contents of a journal, see Journal.load()"""
+    def __init__(self):
+        self.command = None
+        self.target_dir = None
+        self.operations = []
+        self.done = 0
+        self.failed = set()
+        self.complete = False
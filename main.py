@@ -1,18 +1,33 @@
+import os
 import sys
-import re
-import csv
+import json
+import time
 import click
-import requests
+import shutil
+import zipfile
+import threading
+import multiprocessing
 import subprocess
-import pandas as pd
-from prettytable import PrettyTable, DOUBLE_BORDER
-from packaging import version
 from pathlib import Path
 
+# pandas, requests and the modules importing them are imported where they are needed, since importing them
+# takes longer than most commands that don't need them
+
+# seconds a cached newest version is used before it is fetched again
+VERSION_CACHE_TTL = 24 * 60 * 60
+# seconds after which fetching the newest version is given up
+VERSION_REQUEST_TIMEOUT = 3
+
 
 class ListaTools:
     def __init__(self):
+        import output
+        import metrics
         self.params = {}
+        # prints nothing until the logging level is known, see ListaTools.insert_params()
+        self.output = output.Output()
+        # always recorded, but only written with --metrics-json or --profile
+        self.metrics = metrics.Metrics()
         self.target_dir = None
         self.versionfile_url = r'https://github.com/stadtarchiv-lindau/lista-tools/releases/latest/download/VERSION'
         if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):  # checks if script is running from binary or .py
@@ -23,80 +38,149 @@ class ListaTools:
             self.executable_path = Path(sys.executable)
             # noinspection PyProtectedMember
             self.update_path = Path(sys._MEIPASS) / 'update.exe'
+            self.template_path = Path(sys._MEIPASS) / 'template.xlsx'
         else:
             self.is_bundled = False
             self.versionfile_path = Path(__file__).parent / 'VERSION'
             self.executable_path = Path(__file__)
             self.update_path = Path(__file__).parent / 'update.py'
+            self.template_path = Path(__file__).parent / 'template.xlsx'
+
+        if os.name == 'nt':
+            cache_dir = Path(os.environ.get('LOCALAPPDATA', Path.home())) / 'lista-tools'
+        else:
+            cache_dir = Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'lista-tools'
+        self.version_cache_path = cache_dir / 'version.json'
+        # the journals are kept outside the target directory, so they are never renamed or moved themselves
+        self.journal_dir = cache_dir / 'journals'
 
         self.installed_version = self._get_installed_version()
-        self.newest_version = self._get_newest_version()
+        self._newest_version = None  # fetched when first needed, see ListaTools.newest_version
 
-    def insert_params(self, logging, noconfirm, target_dir):
+    @property
+    def newest_version(self):
+        """The newest available version, fetched from GitHub on first access
+
+        :return str: A string of the available version or 'Error' if it could not be determined
+        """
+        if self._newest_version is None:
+            self._newest_version = self._get_newest_version()
+        return self._newest_version
+
+    def insert_params(self, logging, noconfirm, target_dir, offline, metrics_json=None, profile=None, log_file=None):
         """Used to insert parameters after cli() has been called
 
         :param str logging: Verbosity of script; can be one of [debug | full | warn | error | none]
         :param bool noconfirm: Skips all confirmation prompts to allow script to be run without any user input
         :param pathlib.Path target_dir: The directory the script will be working in, defaults to working directory
+        :param bool offline: Never accesses the network; the update check only uses the cached newest version
+        :param pathlib.Path | None metrics_json: Writes the metrics of the run to this file, '-' prints them
+        :param str | None profile: Profiles the run; one of metrics.PROFILE_MODES
+        :param pathlib.Path | None log_file: Also writes everything, including the details of every element, to this
+            file
         """
         self.params.update({'logging': logging,
                             'noconfirm': noconfirm,
                             'target_dir': target_dir,
+                            'offline': offline,
+                            'metrics_json': metrics_json,
+                            'profile': profile,
+                            'log_file': log_file,
                             })
         self.target_dir = self.params.get('target_dir')  # extracted to variable for cleaner code
+        self.output.level = logging
+        if log_file is not None:
+            try:
+                self.output.open_log(log_file)
+            except OSError as OSE:
+                self.report_error("An error occurred when opening the log file", OSE, abort=True)
         self.print_debug(f"Logging: {self.params.get('logging')}")
         self.print_debug(f"Noconfirm: {self.params.get('noconfirm')}")
         self.print_debug(f"Target directory: {self.params.get('target_dir')}")
+        self.print_debug(f"Offline: {self.params.get('offline')}")
+        self.print_debug(f"Metrics: {self.params.get('metrics_json')}")
+        self.print_debug(f"Profile: {self.params.get('profile')}")
+        self.print_debug(f"Log file: {self.params.get('log_file')}")
+
+    def start_metrics(self, command):
+        """Starts recording the metrics of a run and the profiler, if requested
+
+        :param str | None command: Name of the command that is run
+        """
+        self.metrics.start(command, self.params.get('profile'))
+
+    def write_metrics(self):
+        """Writes the metrics of the run as JSON to the file passed with --metrics-json, to stdout if it is '-' or to
+        stderr if only --profile was passed, so they never mix with the output of the command. The raw cProfile
+        statistics are saved next to the file with the extension .prof
+        """
+        dst = self.params.get('metrics_json')
+        to_file = dst is not None and str(dst) != '-'
+        document = self.metrics.stop(dst.with_suffix('.prof') if to_file else None)
+        document['version'] = self.installed_version
+        document['argv'] = sys.argv[1:]
+        text = json.dumps(document, indent=2, ensure_ascii=False)
+        if not to_file:
+            self.output.flush()  # so the metrics come after everything the command printed
+            click.echo(text, err=dst is None)
+            return
+        try:
+            dst.write_text(text + '\n', encoding='utf8')
+        except OSError as OSE:
+            self.report_error("An error occurred when writing the metrics", OSE)
 
     def update_check(self, force):
-        """Checks if an update is available and calls ListaTools.update() if it is
+        """Checks if an update is available and calls ListaTools.update() if it is. Unless forced, only the cached
+        newest version is used, so the check never waits for the network. If the cache is outdated, it is refreshed in
+        the background and a newer version is reported on the next start
 
         :param bool force: Always opens update dialogue
         """
         if force:
             self.print_info("Forcing update")
             self.update()
-        elif self._newer_version_available():
+            return
+        cached_version, checked_at = self._read_version_cache()
+        if cached_version is not None:
+            self._newest_version = cached_version
+        if not self.params.get('offline') and time.time() - checked_at > VERSION_CACHE_TTL:
+            # daemon thread, so the program never waits for it to finish
+            threading.Thread(target=self._refresh_version_cache, daemon=True).start()
+        if cached_version is not None and self._newer_version_available():
             self.print_info("A newer version is available")
             self.update()
 
     def print_debug(self, text):
-        """Prints text if logging level is 'debug'
+        """Prints text if logging level is 'debug', see output.Output
 
         :param any text: What to print
         """
-        if self.params.get('logging') in 'debug':
-            print(f"DEBUG: {text}")
+        self.output.debug(text)
 
-    def print_info(self, text, end='\n', flush=False):
-        """Prints text if logging level is one of [debug | full]
+    def print_info(self, text, end='\n'):
+        """Prints text if logging level is one of [debug | full], see output.Output
 
         :param any text: What to print
-        :param str end: passed to print()
-        :param bool flush: passed to print()
+        :param str end: Printed after text
         """
-        if self.params.get('logging') in ('debug', 'full'):
-            print(text, end=end, flush=flush)
+        self.output.info(text, end=end)
 
     def report_warning(self, text):
-        """Prints text if logging level is one of [debug | full | warn]
+        """Prints text if logging level is one of [debug | full | warn], see output.Output
 
         :param any text: What to print
         """
-        if self.params.get('logging') in ('debug', 'full', 'warn'):
-            print(f"WARNING: {text}")
+        self.output.warning(text)
 
     def report_error(self, text, error, abort=False):
-        """Prints text and error if logging level is one of [debug | full | warn | error]
-        Exits afterwards if abort=True
+        """Prints text and error if logging level is one of [debug | full | warn | error], see output.Output
+        Exits afterwards if abort=True; the buffered output is written when exiting
 
         :param any text: What to print
         :param BaseException error: The error to print
         :param bool abort: Whether to exit after printing
         """
-        if self.params.get('logging') in ('debug', 'full', 'warn', 'error'):
-            print(f"ERROR: {text}")
-            print(error)
+        self.output.error(text, error)
         if abort is True:
             sys.exit()
 
@@ -108,8 +192,8 @@ class ListaTools:
         """
         if self.params.get('noconfirm'):
             return True
-        self.print_info(f"{text} [y/N]: ", end='')
-        choice = input()[0].casefold()
+        with self.metrics.phase('confirm'):
+            choice = self.output.ask(f"{text} [y/N]: ")[0].casefold()
         match choice:
             case 'y':
                 return True
@@ -138,66 +222,307 @@ class ListaTools:
             return 'Error'
 
     def _get_newest_version(self):
-        """Fetches the newest available version from GitHub
+        """Fetches the newest available version from GitHub and caches it. Falls back to the cached version if fetching
+        fails or the network may not be accessed
 
         :return str: A string of the available version or 'Error' if any error occurred
         """
+        if self.params.get('offline'):
+            self.print_debug("Offline, using cached newest version")
+            return self._read_version_cache()[0] or 'Error'
         try:
-            r = requests.get(self.versionfile_url)
-            content = r.content.decode().strip()  # decodes bytes object to str
-            return content
-        except requests.RequestException as RE:
-            self.report_error("An error occurred when fetching the newest version.", RE)
-            return 'Error'
+            return self._fetch_newest_version()
+        except OSError as OSE:  # requests.RequestException is a subclass of OSError
+            self.report_error("An error occurred when fetching the newest version.", OSE)
+            return self._read_version_cache()[0] or 'Error'
+
+    def _fetch_newest_version(self):
+        """Fetches the newest available version from GitHub and writes it to the version cache
+
+        :raises OSError: If fetching or caching failed
+        :return str: A string of the available version
+        """
+        import requests
+        r = requests.get(self.versionfile_url, timeout=VERSION_REQUEST_TIMEOUT)
+        r.raise_for_status()
+        content = r.content.decode().strip()  # decodes bytes object to str
+        self._write_version_cache(content)
+        return content
+
+    def _refresh_version_cache(self):
+        """Fetches the newest version in the background; errors are only printed when debugging, since they would
+        interrupt the output of the running command"""
+        try:
+            self._fetch_newest_version()
+        except OSError as OSE:
+            self.print_debug(f"Refreshing the version cache failed: {OSE}")
+
+    def _read_version_cache(self):
+        """Reads the cached newest version
+
+        :return tuple[str | None, float]: The cached version and the time it was fetched at or (None, 0) if there is
+            no valid cache
+        """
+        try:
+            with open(self.version_cache_path, encoding='utf8') as f:
+                cache = json.load(f)
+            return str(cache['version']), float(cache['checked_at'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None, 0
+
+    def _write_version_cache(self, newest_version):
+        """Writes the newest version to the version cache. The cache is replaced atomically, so a background refresh
+        that is stopped when the program exits never leaves a broken cache
+
+        :param str newest_version: The version to cache
+        :raises OSError: If the cache could not be written
+        """
+        self.version_cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.version_cache_path.with_name(f"{self.version_cache_path.name}.{os.getpid()}.tmp")
+        with open(temp_path, 'w', encoding='utf8') as f:
+            json.dump({'version': newest_version, 'checked_at': time.time()}, f)
+        os.replace(temp_path, self.version_cache_path)
 
     def _newer_version_available(self):
         """Compares the installed and available version
 
         :return bool: True if newer version is available, False if not
         """
+        from packaging import version
         try:
-            if version.parse(self.newest_version) > version.parse(self.newest_version):
+            if version.parse(self.newest_version) > version.parse(self.installed_version):
                 return True
             else:
                 return False
         except version.InvalidVersion:
-            pass
-
-    def _rename_files(self, changes):
-        """Lists changes in changes and asks for user confirmation, then renames them
-
-        :param list[tuple] changes:
-        """
-        # table.add_row([idx, element.name, new_stem + element.suffix, self.get_element_type(element)])
-        # changes.append((idx, element, element.with_stem(new_stem), self.get_element_type(element)))
-        # table = PrettyTable(["ID", "Old filename", "New filename", "Type"])
-        table = PrettyTable(["ID", "Old filename", "New filename", "Type"])
-        for tup in changes:
-            idx, element, new_element, element_type = tup
-            table.add_row([idx, element.name, new_element.name, element_type])
-        table.align = 'l'
-        table.align['ID'] = 'r'
-        table.set_style(DOUBLE_BORDER)
-        self.print_info(table)
+            return False
+
+    def _plan(self, plan_function, error_text, on_conflict, **options):
+        """Plans the changes of a command in the target directory, see api.plan_clean_filenames() and others. Every
+        name collision is listed and counted; aborts if a directory can't be read or if on_conflict is 'abort' and
+        new names are taken
+
+        :param typing.Callable[..., api.Plan] plan_function: The function planning the changes
+        :param str error_text: Reported if a directory can't be read
+        :param str on_conflict: What happens if a new name is taken; one of collisions.POLICIES
+        :param options: Passed to plan_function
+        :return api.Plan: The plan
+        """
+        import api
+        try:
+            plan = plan_function(self.target_dir, on_conflict=on_conflict, recorder=self.metrics, **options)
+        except OSError as OSE:
+            self.report_error(error_text, OSE, abort=True)
+        except api.ConflictError as CE:
+            self._report_conflicts(CE.conflicts, on_conflict)
+        # noinspection PyUnboundLocalVariable
+        self.metrics.count('entries_scanned', plan.scanned)
+        if plan.conflicts:
+            self._report_conflicts(plan.conflicts, on_conflict)
+        return plan
+
+    def _report_conflicts(self, conflicts, on_conflict):
+        """Lists and counts the moves whose new name is taken; aborts if on_conflict is 'abort'
+
+        :param list[tuple[pathlib.Path, pathlib.Path, pathlib.Path | None]] conflicts: The source, the planned
+            destination and the resolved destination of every conflict
+        :param str on_conflict: What happens if a new name is taken; one of collisions.POLICIES
+        """
+        self.metrics.count('conflicts', len(conflicts))
+        for src, dst, resolved in conflicts:
+            self.output.detail(f"Name taken: ./{os.path.relpath(src, self.target_dir)} → {dst.name}, "
+                               + (f"renamed to {resolved.name} instead" if resolved is not None else "skipped"))
+        count = len(conflicts)
+        taken = f"{count} new name{' is' if count == 1 else 's are'} already taken"
+        if on_conflict == 'abort':
+            src, dst, _ = conflicts[0]
+            self.report_error(f"{taken}. No changes were made",
+                              f"e.g. ./{os.path.relpath(src, self.target_dir)} → {dst.name}", abort=True)
+        self.report_warning(f"{taken}. " + ("A counter was added" if on_conflict == 'suffix' else "Skipped"))
+
+    def _rename_files(self, plan, jobs=1, preview='list', plan_out=None, element_filter=None):
+        """Shows the changes of a plan and asks for user confirmation, then renames the elements
+
+        :param api.Plan plan: The planned renames
+        :param int jobs: Number of renames applied at the same time
+        :param str preview: 'list' lists the changes that rename anything before the summary, 'summary' only shows the
+            summary; one of preview.PREVIEW_MODES
+        :param str | pathlib.Path | None plan_out: Writes all changes to this file as csv or JSON lines
+        :param filters.Filter | None element_filter: The filter the elements were selected with
+        """
+        import preview as pv
+        if element_filter is not None:
+            self.metrics.count('entries_filtered', plan.scanned - len(plan.changes))
+            self.print_debug(f"{len(plan.changes)} of {plan.scanned} elements are selected")
+        if plan_out is not None:
+            self._write_plan(plan, plan_out)
+        with self.metrics.phase('preview'):
+            if preview == 'list' and self.params.get('logging') in ('debug', 'full'):
+                # the tables are rendered while they are shown, so the prompt appears as soon as the pager is closed
+                rows = sum(map(pv.is_change, plan.changes))
+                if not self.params.get('noconfirm') and sys.stdout.isatty() \
+                        and rows + 4 > shutil.get_terminal_size().lines:
+                    self.output.flush()
+                    click.echo_via_pager(pv.pages(plan.changes, self.target_dir))
+                else:
+                    for page in pv.pages(plan.changes, self.target_dir):
+                        self.print_info(page, end='')
+            self.print_info(plan.summary())
         if not self.confirm("Do you want to apply these changes?"):
             self.abort()
+        for tup in plan.changes:
+            self.print_debug(tup)
+        self._apply_plan(plan, jobs=jobs)
+
+    def _write_plan(self, plan, plan_out):
+        """Writes all planned changes to a file, see api.Plan.write()
+
+        :param api.Plan plan: The plan
+        :param str | pathlib.Path plan_out: Name of the file or path to it
+        """
+        dst = Path(plan_out)
+        if not dst.is_absolute():
+            dst = (self.target_dir / dst).absolute()
+        if dst.exists():
+            if not self.confirm(f"{dst.name} exists. Do you want to overwrite?"):
+                self.abort()
         try:
-            self.print_info(f"Renaming: 0/{len(changes)}", end='', flush=True)
-            for n, tup in enumerate(changes, 1):
-                _, src, dst, _ = tup
-                self.print_debug(tup)
-                self.print_info(f"\rRenaming: {n}/{len(changes)}", end='', flush=True)
-                if src == dst:
-                    self.print_debug("Already the same name, skipping")
-                    continue
-                try:
-                    src.rename(dst)
-                except OSError as OSE:
-                    self.report_error(f"An error occurred when renaming file number {n}. Skipping", OSE)
-                    continue
-            self.print_info("")
+            with self.metrics.phase('write'):
+                plan.write(dst)
+            self.metrics.count('bytes_written', dst.stat().st_size)
         except OSError as OSE:
-            self.report_error("An error occurred when renaming the files", OSE)
+            self.report_error("An error occurred when writing the plan", OSE, abort=True)
+        self.print_info(f"Plan saved as {dst.name}")
+
+    def _apply_plan(self, plan, state=None, jobs=1):
+        """Applies a plan, recording it in the journal of the target directory first, see api.apply(). An interrupted
+        command can be continued with ListaTools.resume() and an applied one undone with ListaTools.undo()
+
+        :param api.Plan plan: The plan
+        :param journal.JournalState | None state: The journal of an interrupted run, if it is continued
+        :param int jobs: Number of operations applied at the same time, see executor.run()
+        """
+        import api
+        operations = plan.operations
+        # exdir lists every move; if they only go to the log file, the progress is shown instead
+        list_moves = plan.command == 'exdir'
+        start = state.done if state is not None else 0
+        try:
+            outcomes = api.apply(plan, jobs, self.journal_dir, state, recorder=self.metrics)
+        except api.JournalError as JE:
+            self.report_error(str(JE), JE.__cause__, abort=True)
+        progress = self.output.progress("Moving" if list_moves else "Renaming", len(operations), start) \
+            if not list_moves or self.output.has_log else None
+        try:
+            # noinspection PyUnboundLocalVariable
+            for count, (n, outcome, error) in enumerate(outcomes, start + 1):
+                kind, src, dst = operations[n]
+                if error is not None:
+                    self.metrics.count('failures')
+                    if kind == 'move':
+                        self.report_error(f"An error occurred when renaming "
+                                          f"./{os.path.relpath(src, self.target_dir)}. Skipping", error)
+                    else:
+                        self.report_error(f"An error occurred when removing "
+                                          f"./{os.path.relpath(src, self.target_dir)}", error)
+                elif outcome == 'applied':
+                    self.metrics.count('renames_done' if kind == 'move' else 'directories_removed')
+                    if kind == 'move':
+                        self.output.detail(f"{'Moved' if list_moves else 'Renamed'}: "
+                                           f"./{src.relative_to(self.target_dir).as_posix()} → ./{dst.name}",
+                                           console=list_moves)
+                elif outcome == 'skipped':
+                    self.metrics.count('skipped')
+                if progress is not None:
+                    progress.update(count)
+        except api.JournalError as JE:
+            self.report_error(f"{JE}, use '{plan.command} --resume' to continue", JE.__cause__, abort=True)
+        if progress is not None:
+            progress.close()
+
+    def _load_journal(self):
+        """Reads the journal of the target directory
+
+        :return journal.JournalState | None: The journal or None if there is none
+        """
+        import api
+        try:
+            return api.load_journal(self.target_dir, self.journal_dir)
+        except (OSError, api.ListaToolsError) as E:
+            self.report_error("An error occurred when reading the journal", E, abort=True)
+
+    def _check_unfinished_journal(self):
+        """Asks for confirmation before the journal of an interrupted command is replaced by a new one"""
+        state = self._load_journal()
+        if state is None or state.complete:
+            return
+        self.report_warning(f"The last {state.command} in the target directory was interrupted after "
+                            f"{state.done}/{len(state.operations)} changes. It can be continued with "
+                            f"'{state.command} --resume'")
+        if not self.confirm("Do you want to discard it and start over?"):
+            self.abort()
+
+    def resume(self, command, jobs=1):
+        """Continues an interrupted command from the last progress written to its journal, without listing the
+        elements again
+
+        :param str command: Name of the command to continue
+        :param int jobs: Number of operations applied at the same time
+        """
+        state = self._load_journal()
+        if state is None or state.complete:
+            self.print_info(f"There is no interrupted {command} to continue in the target directory")
+            return
+        if state.command != command:
+            self.print_info(f"The interrupted command in the target directory is {state.command}, not {command}")
+            self.abort()
+        self.print_info(f"Continuing {command} after {state.done}/{len(state.operations)} changes")
+        import api
+        self._apply_plan(api.Plan.from_journal(state), state, jobs)
+
+    def undo(self):
+        """See caller function documentation"""
+        import api
+        import journal
+        state = self._load_journal()
+        if state is None:
+            self.print_info("There is nothing to undo in the target directory")
+            return
+        # operations after the last progress written to the journal were applied if the command was interrupted
+        applied = [n for n, (kind, src, dst) in enumerate(state.operations) if n not in state.failed and (
+            n < state.done or (not state.complete and n < state.done + journal.BATCH_SIZE
+                               and api.is_applied(kind, src, dst)))]
+        self.print_info(f"Undoing {state.command}: {len(applied)} changes")
+        if not self.confirm("Do you want to undo these changes?"):
+            self.abort()
+        errors = 0
+        # in reverse, so directories are created before their elements are moved back into them
+        for n in reversed(applied):
+            kind, src, dst = state.operations[n]
+            # skipped if already undone, so an interrupted undo can be repeated
+            if os.path.lexists(src):
+                self.metrics.count('skipped')
+                continue
+            try:
+                with self.metrics.phase('apply'):
+                    if kind == 'move':
+                        dst.rename(src)
+                    else:
+                        src.mkdir()
+                self.metrics.count('changes_undone')
+            except OSError as OSE:
+                self.report_error(f"An error occurred when restoring ./{os.path.relpath(src, self.target_dir)}",
+                                  OSE)
+                self.metrics.count('failures')
+                errors += 1
+        if errors:
+            self.report_warning(f"{errors} changes could not be undone. The journal is kept, so undo can be repeated")
+            return
+        try:
+            journal.Journal(journal.Journal.path_for(self.journal_dir, self.target_dir)).remove()
+        except OSError as OSE:
+            self.report_error("An error occurred when removing the journal", OSE)
+        self.print_info("Undone")
 
     def update(self):
         """Confirms if user wants to update, and calls update script if that is the case
@@ -209,8 +534,8 @@ class ListaTools:
         if not self.confirm("Do you want to update?"):
             return
         self.print_info("Starting update. Please reopen lista-tools after the update has finished.")
-        passed_params = self.params
-        passed_params['target_dir'] = str(self.target_dir)
+        # read back with ast.literal_eval(), which can't read paths
+        passed_params = {key: str(value) if isinstance(value, Path) else value for key, value in self.params.items()}
         if self.is_bundled:
             self.print_debug(str(passed_params))
             subprocess.Popen([self.update_path, self.executable_path, str(passed_params)])
@@ -219,21 +544,41 @@ class ListaTools:
 
         sys.exit()
 
-    @staticmethod
-    def get_element_type(path):
-        """Returns string of type that the element is
+    def compile_filter(self, include=(), exclude=(), types=(), min_size=None, max_size=None):
+        """Compiles the options that select the elements a command processes; aborts if one of them is not valid
 
-        :param pathlib.Path path: Path to the element to be analyzed
-        :return str: String of element type
+        :param typing.Iterable[str] include: Glob patterns or regular expressions of the selected names
+        :param typing.Iterable[str] exclude: Glob patterns or regular expressions of the excluded names
+        :param typing.Iterable[str] types: The selected types; one of filters.TYPES each
+        :param str | None min_size: The smallest selected file size, e.g. 64K
+        :param str | None max_size: The largest selected file size
+        :return filters.Filter | None: The filter, None if no option is passed
         """
-        if Path.is_dir(path):
-            return "Directory"
-        elif Path.is_file(path):
-            return "File"
-        elif Path.is_symlink(path):
-            return "Symlink"
-        else:
-            return "Other"
+        import re
+        import filters
+        if not (include or exclude or types or min_size or max_size):
+            return None
+        try:
+            sizes = [None if size is None else filters.parse_size(size) for size in (min_size, max_size)]
+        except ValueError as VE:
+            self.report_error("The size is not valid", VE, abort=True)
+        try:
+            # noinspection PyUnboundLocalVariable
+            return filters.Filter(include, exclude, types, *sizes)
+        except re.error as RE:
+            self.report_error(f"The regular expression {RE.pattern!r} is not valid", RE, abort=True)
+
+    def check_engine(self, engine):
+        """Falls back to the default csv parser if the selected one is not installed
+
+        :param str engine: The csv parser selected with --engine; 'c' or 'pyarrow'
+        :return str: The csv parser to use
+        """
+        import droid
+        if engine == 'pyarrow' and droid.pyarrow is None:
+            self.report_warning("pyarrow is not installed. Falling back to the default engine")
+            return 'c'
+        return engine
 
     def print_version(self):
         """See caller function documentation"""
@@ -242,135 +587,785 @@ class ListaTools:
         self.print_info(f"Newest version available: {self.newest_version}")
         self.print_info("------------------------------")
 
-    def clean_filenames(self):
-        """See caller function documentation"""
-        substitutions = {
-            "ä": "ae",
-            "ö": "oe",
-            "ü": "ue",
-            "ß": "ss",
-            "Ä": "Ae",
-            "Ö": "Oe",
-            "Ü": "Ue",
-        }
-        changes = []
-        for idx, element_relative in enumerate(Path.iterdir(self.target_dir), 1):
-            element = element_relative.resolve()
-            new_stem = re.sub(r"[^a-zäöüßA-ZÄÖÜ0-9_-]", '_', element.stem)
-            for pattern, replacement in substitutions.items():
-                new_stem = re.sub(pattern, replacement, new_stem)
-            changes.append((idx, element, element.with_stem(new_stem), self.get_element_type(element)))
-
-        self._rename_files(changes)
-
-    def droid_csv(self, input, output, remove_folders):
+    def clean_filenames(self, resume=False, jobs=1, recursive=False, preview='list', plan_out=None,
+                        on_conflict='suffix', element_filter=None):
+        """See caller function documentation
+
+        :param bool resume: Continues the interrupted clean-filenames instead
+        :param int jobs: Number of renames applied at the same time
+        :param bool recursive: Also cleans up the names of all elements in subdirectories
+        :param str preview: How the changes are shown before confirming; one of preview.PREVIEW_MODES
+        :param str | None plan_out: Writes all planned changes to this file as csv or JSON lines
+        :param str on_conflict: What happens if a new name is taken; one of collisions.POLICIES
+        :param filters.Filter | None element_filter: Only cleans up the names of the selected elements
+        """
+        if resume:
+            self.resume('clean-filenames', jobs)
+            return
+        self._check_unfinished_journal()
+        import api
+        plan = self._plan(api.plan_clean_filenames, "An error occurred when reading the target directory", on_conflict,
+                          recursive=recursive, element_filter=element_filter)
+        self._rename_files(plan, jobs, preview, plan_out, element_filter)
+
+    def droid_csv(self, inputs, output, remove_folders, chunk_size, engine, multi_format, output_format, paths=False,
+                  merge=False, jobs=1, incremental=None, accession=None, element_filter=None):
         """See caller function documentation
 
-        :param str | pathlib.Path input: Name of input file or path to it
-        :param str | pathlib.Path output: Name of input file or path to it
+        :param str | pathlib.Path | tuple[str] inputs: Names of the input files or paths or glob patterns of them
+        :param str | pathlib.Path | None output: Name of output file or path to it, defaults to 'output.' and the
+            extension of output_format. With output_format 'parquet' the inventory folder, defaults to 'inventory'
         :param bool remove_folders: Whether to remove folders
+        :param int chunk_size: Number of rows read, formatted and written at a time
+        :param str engine: The csv parser to use; one of droid.ENGINES
+        :param str multi_format: How rows with multiple formats are folded; one of droid.MULTI_FORMAT_MODES
+        :param str output_format: The format of the output file; one of template.FORMATS or 'parquet'
+        :param bool paths: Adds the columns RELATIVE_PATH and DEPTH, rebuilt from ID and PARENT_ID
+        :param bool merge: Merges several input files into one output with renumbered IDs
+        :param int jobs: Number of input files converted at the same time
+        :param str | pathlib.Path | None incremental: Only writes the rows that changed since the last run with this
+            index file
+        :param str | None accession: Name of the accession in the inventory, defaults to the name of the input file
+        :param filters.Filter | None element_filter: Only writes the rows of the selected elements
         """
-        src = Path(input)
-        if not src.is_absolute():
-            src = (self.target_dir / src).absolute()
-        dst = Path(output)
-        if not dst.is_absolute():
-            dst = (self.target_dir / dst).absolute()
+        import sqlite3
+        import pandas as pd
+        import api
+        import droid
+        import inventory
+        engine = self.check_engine(engine)
+        if output_format == 'parquet' and inventory.pyarrow is None:
+            self.report_error("The parquet format can't be used", "pyarrow is not installed", abort=True)
+        sources = self._expand_droid_inputs(inputs)
+        if incremental is not None and (len(sources) > 1 or output_format != 'csv'):
+            self.report_error("--incremental can only be used with one input file and --format csv", "The changes "
+                              "are written to a csv with header row and the index is kept per input file", abort=True)
+        if accession is not None and (len(sources) > 1 or output_format != 'parquet'):
+            self.report_error("--accession can only be used with one input file and --format parquet", "It names "
+                              "the rows of the input file in the inventory", abort=True)
+        if len(sources) > 1:
+            self._droid_csv_batch(sources, output, merge, jobs, {
+                'chunk_size': chunk_size, 'engine': engine, 'multi_format': multi_format,
+                'output_format': output_format, 'remove_folders': remove_folders, 'paths': paths,
+                'template_path': self.template_path, 'filter': element_filter})
+            return
+        src = sources[0]
+        if output_format == 'parquet':
+            store = Path(output or "inventory")
+            if not store.is_absolute():
+                store = (self.target_dir / store).absolute()
+            accession = accession or src.stem
+            dst = inventory.partition_path(store, accession)
+            if dst.exists():
+                if not self.confirm(f"{accession} is already in {store.name}. Do you want to replace it?"):
+                    self.abort()
+        else:
+            dst = Path(output or f"output.{output_format}")
+            if not dst.is_absolute():
+                dst = (self.target_dir / dst).absolute()
+
+            if dst.exists():
+                if not self.confirm(f"{dst.name} exists. Do you want to overwrite?"):
+                    self.abort()
+
+        hierarchy = self._read_droid_hierarchy(src, chunk_size, engine) if paths else None
+        index = self._open_row_index(incremental) if incremental is not None else None
+        # FILE_PATH identifies the rows in the index
+        drop = [column for column in droid.DROPPED_COLUMNS if index is None or column != 'FILE_PATH']
         try:
-            with open(src, 'r', encoding='utf8') as f:
-                df = pd.read_csv(f)
+            reader = api.DroidReader(src, chunk_size, engine, multi_format, remove_folders, hierarchy=hierarchy,
+                                     element_filter=element_filter, drop=drop, recorder=self.metrics)
         except OSError as OSE:
             self.report_error("An error occurred when reading the input file", OSE, abort=True)
+        try:
+            if index is not None:
+                import incremental as inc
+                writer = inc.DeltaWriter(dst)
+            else:
+                writer = api.open_writer(dst, output_format, self.template_path)
+        except (OSError, zipfile.BadZipFile) as E:
+            self.report_error("An error occurred when creating the output file", E, abort=True)
+
+        if remove_folders:
+            self.print_debug("Removing rows with folders")
+        changes = {}  # number of rows by change, if incremental
+        progress = None  # started after the first rows are shown
+        try:
+            # noinspection PyUnboundLocalVariable
+            for n, chunk in enumerate(reader):
+                if index is not None:
+                    with self.metrics.phase('index'):
+                        chunk = index.delta(chunk)
+                    for change, count in chunk['CHANGE'].value_counts().items():
+                        changes[change] = changes.get(change, 0) + count
+                if n == 0:
+                    self.print_info(chunk.head())
+                    progress = self.output.progress("Converted rows", done=reader.rows)
+                with self.metrics.phase('write'):
+                    # noinspection PyUnboundLocalVariable
+                    writer.write(chunk)
+                self.metrics.count('rows_written', len(chunk))
+                progress.update(reader.rows)
+            if index is not None:
+                with self.metrics.phase('index'):
+                    for removed in index.removed():
+                        changes[inc.REMOVED] = changes.get(inc.REMOVED, 0) + len(removed)
+                        writer.write_removed(removed)
+            with self.metrics.phase('write'):
+                writer.close()
+            if index is not None:
+                with self.metrics.phase('index'):
+                    index.commit()  # only once the changes are saved, so they are written again if anything fails
+            self.metrics.count('bytes_read', src.stat().st_size)
+            self.metrics.count('bytes_written', sum(path.stat().st_size for path in writer.paths))
+            if progress is not None:
+                progress.close()
+        except OSError as OSE:
+            self.report_error("An error occurred when converting the input file", OSE)
+            self._remove_partial_output(writer)
+        except sqlite3.Error as SE:
+            self.report_error("An error occurred when updating the index", SE)
+            self._remove_partial_output(writer)
         except pd.errors.ParserError as PE:
-            # had some problems in the past with files having more data columns than headers, which causes the parser to
-            # not work. current fix is to manually add more header columns. this mostly happens with csv's containing
-            # data on ~$xxx.doc lock files generated by Microsoft products, as DROID recognizes them to have multiple
-            # file formats; example file demonstrating bug in .test/exdir_with_bug.csv
+            # rows with more entries than there are header columns are folded by droid.MultiFormatReader if DROID
+            # matched them to multiple formats, so this only happens with otherwise malformed rows
             self.report_error("An error occurred when parsing the input file. This may be caused by some rows having "
                               "more entries than there are header columns. For more info see the droid-csv "
                               "documentation on GitHub (https://github.com/stadtarchiv-lindau/lista-tools#droid-csv)",
-                              PE, abort=True)
+                              PE)
+            self._remove_partial_output(writer)
+        except ValueError as VE:
+            self.report_error("An error occurred when filtering the rows", VE)
+            self._remove_partial_output(writer)
+        else:
+            if index is not None:
+                for change, count in changes.items():
+                    self.metrics.count(f'rows_{change}', int(count))
+                self.print_info(", ".join(f"{changes.get(change, 0)} {change}"
+                                          for change in (inc.ADDED, inc.CHANGED, inc.REMOVED)))
+            if output_format == 'parquet':
+                # noinspection PyUnboundLocalVariable
+                self.print_info(f"Saved as accession {accession} in {store.name}")
+                return
+            self.print_info(f"Saved as {', '.join(path.name for path in writer.paths)}")
+            return
+        finally:
+            if index is not None:
+                index.close()
+        self.abort()
+
+    def _open_row_index(self, path):
+        """Opens the index of an incremental droid-csv; aborts if it can't be opened
+
+        :param str | pathlib.Path path: Name of the index file or path to it
+        :return incremental.RowIndex: The index
+        """
+        import sqlite3
+        import incremental
+        path = Path(path)
+        if not path.is_absolute():
+            path = (self.target_dir / path).absolute()
+        try:
+            index = incremental.RowIndex(path)
+        except sqlite3.Error as SE:
+            self.report_error(f"An error occurred when opening the index {path.name}", SE, abort=True)
+        # noinspection PyUnboundLocalVariable
+        if not index.indexed:
+            self.print_info(f"{path.name} is empty, so all rows are written as added")
+        return index
+
+    def _expand_droid_inputs(self, inputs):
+        """Expands glob patterns, e.g. *.csv, since the Windows console passes them unchanged. Paths are relative to the
+        target directory. Names without a pattern are kept even if the file doesn't exist, so the error is reported
+        when it is read. Outputs of a batch conversion matched by a pattern are left out
+
+        :param str | pathlib.Path | tuple[str] inputs: Names, paths or glob patterns of the input files
+        :return list[pathlib.Path]: Absolute paths of the input files, without duplicates
+        """
+        import glob
+        sources = []
+        for pattern in ([inputs] if isinstance(inputs, (str, Path)) else inputs):
+            path = Path(pattern)
+            if not path.is_absolute():
+                path = (self.target_dir / path).absolute()
+            if not any(character in str(pattern) for character in '*?['):
+                sources.append(path)
+                continue
+            matches = sorted(Path(match) for match in glob.glob(str(path), recursive=True) if Path(match).is_file())
+            if not matches:
+                self.report_warning(f"No files match {pattern}")
+            sources.extend(matches)
+        sources = list(dict.fromkeys(sources))
+        outputs = {source.with_stem(f"{source.stem}_output") for source in sources}
+        if len(sources) > 1 and any(source in outputs for source in sources):
+            self.print_debug("Left out the outputs of earlier batch conversions")
+            sources = [source for source in sources if source not in outputs]
+        if not sources:
+            self.report_error("No input files", "None of the patterns match a file", abort=True)
+        return sources
 
-        self.print_info("Loaded csv into DataFrame")
-        if remove_folders:  # removes rows that contain folders
-            df = df[df['TYPE'].str.contains("Folder") == False]
-            self.print_info("Removed rows with folders")
+    def _droid_csv_batch(self, sources, output, merge, jobs, options):
+        """Converts several DROID csv files in a pool of processes, each into its own output next to the input, e.g.
+        a.csv → a_output.csv, or merged into one output. The rows of a merged output are numbered across all inputs
+        and the IDs and PARENT_IDs of every input are shifted by the largest IDs of the inputs before it, so they stay
+        unique. A file that can't be converted is reported and left out, without stopping the others
 
+        :param list[pathlib.Path] sources: The input files
+        :param str | pathlib.Path | None output: Name of the merged output file or path to it or, with the parquet
+            format, of the inventory folder
+        :param bool merge: Merges all inputs into one output
+        :param int jobs: Number of files converted at the same time
+        :param dict options: The options of droid-csv passed to batch.convert()
+        """
+        import tempfile
+        import api
+        import batch
+        import inventory
+        from concurrent.futures import ProcessPoolExecutor
+        output_format = options['output_format']
+        if output_format == 'parquet':
+            if merge:
+                self.report_error("--merge can't be used with --format parquet", "Every input file is stored as an "
+                                  "accession of its own, named like the file", abort=True)
+            store = Path(output or "inventory")
+            if not store.is_absolute():
+                store = (self.target_dir / store).absolute()
+            destinations = [inventory.partition_path(store, source.stem) for source in sources]
+            if len(set(destinations)) < len(destinations):
+                self.report_error("Several input files have the same name", "They would be stored as the same "
+                                  "accession", abort=True)
+        elif merge:
+            dst = Path(output or f"output.{output_format}")
+            if not dst.is_absolute():
+                dst = (self.target_dir / dst).absolute()
+            destinations = [dst]
+        elif output is not None:
+            self.report_error("--output can't be used with several input files", "Pass --merge to merge them into "
+                              "one output file or leave out --output to convert every file on its own", abort=True)
+        else:
+            destinations = [source.with_name(f"{source.stem}_output.{output_format}") for source in sources]
         # noinspection PyUnboundLocalVariable
-        df.index += 1
-        # removes decimals
-        df = df.astype({'SIZE': 'Int64', 'ID': 'Int64', 'PARENT_ID': 'Int64', 'FORMAT_COUNT': 'Int64'})
-        self.print_info("Formatted numbers as integers")
-        df = df.drop(['URI', 'FILE_PATH', 'METHOD', 'STATUS'], axis=1)  # removes columns not present in template
-        self.print_info("Dropped unused columns")
+        existing = [source.stem if output_format == 'parquet' else dst.name
+                    for source, dst in zip(sources, destinations) if dst.exists()]
+        if existing:
+            names = ', '.join(existing[:5]) + (', ...' if len(existing) > 5 else '')
+            if not self.confirm(f"{names} exist{'s' if len(existing) == 1 else ''}. Do you want to overwrite?"):
+                self.abort()
 
-        self.print_info(df.head())
+        self.print_info(f"Converting {len(sources)} files with {min(jobs, len(sources))} processes")
+        failed = []
+        writer = None
+        part_dir = tempfile.mkdtemp(prefix='lista-tools-batch-') if merge else None
+        progress = self.output.progress("Converted files", len(sources))
+        try:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(sources))) as pool:
+                if merge:
+                    futures = [pool.submit(batch.convert, source, None, options, Path(part_dir) / f"{n}.pickle")
+                               for n, source in enumerate(sources)]
+                else:
+                    futures = [pool.submit(batch.convert, source, dst, options)
+                               for source, dst in zip(sources, destinations)]
+                rows_before = ids_before = 0
+                # the results are collected in the order of the inputs, so the merged output is written while the
+                # following files are still converted
+                for future in futures:
+                    with self.metrics.phase('convert'):
+                        result = future.result()
+                    self.metrics.count('rows_parsed', result.rows)
+                    if result.error is not None:
+                        failed.append(result.src)
+                        self.report_error(f"{result.error[0]}: {result.src.name}", result.error[1])
+                    elif merge:
+                        if writer is None:
+                            writer = api.open_writer(destinations[0], output_format, options['template_path'])
+                        with self.metrics.phase('write'):
+                            for chunk in batch.read_part(result.paths[0]):
+                                writer.write(batch.renumber(chunk, rows_before, ids_before))
+                        rows_before += result.rows
+                        ids_before += result.max_id
+                        self.metrics.count('rows_written', result.rows_written)
+                        self.output.detail(f"Merged: {result.src.name}")
+                    else:
+                        self.metrics.count('rows_written', result.rows_written)
+                        outputs = (f"accession {result.src.stem}" if output_format == 'parquet'
+                                   else ', '.join(path.name for path in result.paths))
+                        self.output.detail(f"Converted: {result.src.name} → {outputs}")
+                    progress.update(progress.done + 1)
+                if writer is not None:
+                    with self.metrics.phase('write'):
+                        writer.close()
+            progress.close()
+        except (OSError, zipfile.BadZipFile) as E:
+            self.report_error("An error occurred when writing the merged output file", E)
+            if writer is not None:
+                self._remove_partial_output(writer)
+        else:
+            if failed:
+                self.report_warning(f"{len(failed)} of {len(sources)} files could not be converted: "
+                                    f"{', '.join(path.name for path in failed)}")
+            if writer is not None:
+                self.print_info(f"Saved as {', '.join(path.name for path in writer.paths)}")
+            elif not merge:
+                self.print_info(f"Converted {len(sources) - len(failed)} files")
+            return
+        finally:
+            if part_dir is not None:
+                shutil.rmtree(part_dir, ignore_errors=True)
+        self.abort()
+
+    def _read_droid_hierarchy(self, src, chunk_size, engine):
+        """Reads ID, PARENT_ID, NAME and TYPE of all rows of a DROID csv in a first pass, since the parent of a row may
+        come after it. Aborts if the file can't be read and warns about orphans and cycles
+
+        :param pathlib.Path src: Path to the DROID csv
+        :param int chunk_size: Number of rows read at a time
+        :param str engine: The csv parser to use; one of droid.ENGINES
+        :return droid.Hierarchy: The hierarchy of the rows
+        """
+        import pandas as pd
+        import droid
+        try:
+            with self.metrics.phase('hierarchy'):
+                hierarchy = droid.read_hierarchy(src, chunk_size, engine)
+        except OSError as OSE:
+            self.report_error("An error occurred when reading the input file", OSE)
+        except pd.errors.ParserError as PE:
+            self.report_error("An error occurred when parsing the input file", PE)
+        except ValueError as VE:
+            self.report_error("The paths can't be rebuilt", VE)
+        else:
+            if hierarchy.orphans.any():
+                self.report_warning(f"{hierarchy.orphans.sum()} elements have a PARENT_ID that is not in the input "
+                                    f"file. Their paths start at the element itself")
+            if hierarchy.cycles.any():
+                self.report_warning(f"{hierarchy.cycles.sum()} elements are in or below a cycle of PARENT_IDs and get "
+                                    f"no path and depth")
+            return hierarchy
+        self.abort()
+
+    def _remove_partial_output(self, writer):
+        """Closes and deletes output files that could not be written completely, see api.remove_partial_output()
+
+        :param template.CsvWriter | template.XlsxWriter writer: The writer of the output files
+        """
+        import api
+        for path, error in api.remove_partial_output(writer):
+            if error is None:
+                self.print_info(f"Removed incomplete output file {path.name}")
+            else:
+                self.report_error(f"An error occurred when removing the incomplete output file {path.name}", error)
+
+    def verify(self, input, output, quick, jobs, chunk_size, engine, droid_root):
+        """See caller function documentation
+
+        :param str | pathlib.Path input: Name of the DROID csv or path to it
+        :param str | pathlib.Path | None output: Name of the report or path to it, defaults to 'verify.csv'
+        :param bool quick: Only compares the sizes
+        :param int jobs: Number of files checked at the same time
+        :param int chunk_size: Number of rows read at a time
+        :param str engine: The csv parser to use; one of droid.ENGINES
+        :param str | None droid_root: The path DROID was run on, defaults to the path of the first element in the csv
+        """
+        import pandas as pd
+        import droid
+        import fixity
+        src = Path(input)
+        if not src.is_absolute():
+            src = (self.target_dir / src).absolute()
+        dst = Path(output or "verify.csv")
+        if not dst.is_absolute():
+            dst = (self.target_dir / dst).absolute()
 
         if dst.exists():
             if not self.confirm(f"{dst.name} exists. Do you want to overwrite?"):
                 self.abort()
 
+        engine = self.check_engine(engine)
         try:
-            with open(dst, 'w', encoding='utf8') as f:
-                # csv.QUOTE_ALL to prevent issues with whitespace characters in data
-                # header=False removes header row, since the Excel template has its own header row
-                df.to_csv(f, quoting=csv.QUOTE_ALL, lineterminator='\n', header=False)
-                self.print_info(f"Saved as {dst.name}")
+            header = droid.read_header(src)
+            missing_columns = [column for column in fixity.COLUMNS if column not in header]
+            if missing_columns:
+                self.report_error("The input file is not a DROID csv", f"Missing columns: "
+                                  f"{', '.join(missing_columns)}", abort=True)
+            reader = droid.read_chunks(src, chunk_size, drop=[column for column in header
+                                                              if column not in fixity.COLUMNS], engine=engine)
+            report = fixity.ReportWriter(dst)
         except OSError as OSE:
-            self.report_error("An error occurred when reading the input file", OSE, abort=True)
+            self.report_error("An error occurred when opening the input file or the report", OSE, abort=True)
+
+        counts = dict.fromkeys(fixity.STATUSES, 0)
+        outside = 0
+        progress = None  # started after the path DROID was run on is shown
+
+        def batches():
+            nonlocal droid_root, outside, progress
+            # noinspection PyUnboundLocalVariable
+            for chunk in self.metrics.iterate('read', reader):
+                self.metrics.count('rows_parsed', len(chunk))
+                if droid_root is None:
+                    droid_root = fixity.droid_root(chunk)
+                    if droid_root is None:
+                        self.report_error("The path DROID was run on could not be found", "No element without "
+                                          "PARENT_ID in the first rows. Pass it with --droid-root", abort=True)
+                    self.print_info(f"Verifying {droid_root} against {self.target_dir}")
+                    progress = self.output.progress("Verified files")
+                batch, batch_outside = fixity.checks(chunk, droid_root, self.target_dir)
+                outside += batch_outside
+                yield batch
+
+        verified = 0
+        try:
+            with self.metrics.phase('verify'):
+                for check in fixity.verify(batches(), jobs=jobs, quick=quick):
+                    verified += 1
+                    counts[check.status] += 1
+                    # noinspection PyUnboundLocalVariable
+                    report.write(check)
+                    if check.status != fixity.OK:
+                        self.output.detail(f"{check.status.capitalize()}: {check.file_path}")
+                    if check.actual_md5 is not None:
+                        self.metrics.count('bytes_read', check.actual_size)
+                    progress.update(verified)
+            report.close()
+        except OSError as OSE:
+            self.report_error("An error occurred when writing the report", OSE)
+            self._remove_partial_output(report)
+        except pd.errors.ParserError as PE:
+            self.report_error("An error occurred when parsing the input file", PE)
+            self._remove_partial_output(report)
+        else:
+            if progress is not None:
+                progress.close()
+            self.metrics.count('files_verified', verified)
+            self.metrics.count('mismatches', verified - counts[fixity.OK])
+            if outside:
+                self.report_warning(f"{outside} files are not inside {droid_root} and were not verified")
+            self.print_info(", ".join(f"{count} {status}" for status, count in counts.items()))
+            if counts[fixity.OK] == verified:
+                self.print_info("All files match")
+            self.print_info(f"Saved report as {dst.name}")
+            return
+        self.abort()
 
-    def exdir(self, recursion):
+    def duplicates(self, input, output, chunk_size, engine, spill_rows):
         """See caller function documentation
 
-        :param bool recursion: Toggles recursive behaviour
+        :param str | pathlib.Path input: Name of the DROID csv or path to it
+        :param str | pathlib.Path | None output: Name of the report or path to it, defaults to 'duplicates.csv'
+        :param int chunk_size: Number of rows read at a time
+        :param str engine: The csv parser to use; one of droid.ENGINES
+        :param int spill_rows: Number of possible duplicates kept in memory before they are written to temporary files
         """
-        def extract():
-            self.print_debug(f"Inside exdir: {self.target_dir}")
-            for directory in Path.iterdir(self.target_dir):
-                remove_dir = True
-                # files can be skipped, as on the first iteration they are already in WORKING_DIR and don't need to be
-                # moved and for all subsequent calls the previous iteration has already moved them
-                if Path.is_file(directory):
-                    continue
-                for element in Path.iterdir(directory):
-                    dst = self.target_dir / f"{directory.name.upper()}_ {element.name}"
+        import pandas as pd
+        import droid
+        import duplicates
+        src = Path(input)
+        if not src.is_absolute():
+            src = (self.target_dir / src).absolute()
+        dst = Path(output or "duplicates.csv")
+        if not dst.is_absolute():
+            dst = (self.target_dir / dst).absolute()
+
+        if dst.exists():
+            if not self.confirm(f"{dst.name} exists. Do you want to overwrite?"):
+                self.abort()
+
+        engine = self.check_engine(engine)
+        try:
+            header = droid.read_header(src)
+            missing_columns = [column for column in duplicates.COLUMNS if column not in header]
+            if missing_columns:
+                self.report_error("The input file is not a DROID csv", f"Missing columns: "
+                                  f"{', '.join(missing_columns)}", abort=True)
+            report = duplicates.ReportWriter(dst)
+        except OSError as OSE:
+            self.report_error("An error occurred when opening the input file or the report", OSE, abort=True)
+
+        index = duplicates.Index(spill_rows)
+        groups = files = wasted_bytes = 0
+        try:
+            # only files with the same size can be duplicates, so the first pass reads nothing but the sizes
+            progress = self.output.progress("Read sizes")
+            reader = droid.read_chunks(src, chunk_size, engine=engine,
+                                       drop=[column for column in header if column not in duplicates.SIZE_COLUMNS])
+
+            def counted(chunks):
+                for chunk in chunks:
+                    self.metrics.count('rows_parsed', len(chunk))
+                    progress.update(progress.done + len(chunk))
+                    yield chunk
+
+            sizes = duplicates.shared_sizes(self.metrics.iterate('read', counted(reader)))
+            progress.close()
+            self.print_debug(f"{len(sizes)} sizes are shared by several files")
+
+            progress = self.output.progress("Indexed rows")
+            reader = droid.read_chunks(src, chunk_size, engine=engine,
+                                       drop=[column for column in header if column not in duplicates.COLUMNS])
+            for chunk in self.metrics.iterate('read', counted(reader)):
+                with self.metrics.phase('index'):
+                    index.add(duplicates.candidates(chunk, sizes))
+            progress.close()
+            if index.spilled:
+                self.print_debug("The index was written to temporary files")
+
+            with self.metrics.phase('group'):
+                for duplicate_files in index.groups():
+                    groups = duplicate_files['Group'].iat[-1]
+                    files += len(duplicate_files)
+                    # every group repeats its wasted bytes on all of its rows
+                    wasted_bytes += int(duplicate_files.drop_duplicates('Group')['Wasted bytes'].sum())
+                    with self.metrics.phase('write'):
+                        # noinspection PyUnboundLocalVariable
+                        report.write(duplicate_files)
+            report.close()
+        except OSError as OSE:
+            self.report_error("An error occurred when finding the duplicates", OSE)
+            self._remove_partial_output(report)
+        except pd.errors.ParserError as PE:
+            self.report_error("An error occurred when parsing the input file", PE)
+            self._remove_partial_output(report)
+        else:
+            self.metrics.count('duplicate_groups', int(groups))
+            self.metrics.count('duplicate_files', files)
+            self.metrics.count('wasted_bytes', wasted_bytes)
+            self.print_info(f"Found {files} files in {groups} groups of duplicates, wasting "
+                            f"{wasted_bytes / (1024 * 1024):.1f} MB")
+            self.print_info(f"Saved report as {dst.name}")
+            return
+        finally:
+            index.close()
+        self.abort()
+
+    def stats(self, store, by, accessions, output):
+        """See caller function documentation
+
+        :param str | pathlib.Path | None store: Name of the inventory folder or path to it, defaults to 'inventory'
+        :param str by: The column the rows are grouped by; inventory.PARTITION or one of inventory.GROUP_COLUMNS
+        :param tuple[str] accessions: Only counts these accessions, defaults to all
+        :param str | pathlib.Path | None output: Also writes the statistics to this csv
+        """
+        import csv
+        import inventory
+        store = Path(store or "inventory")
+        if not store.is_absolute():
+            store = (self.target_dir / store).absolute()
+        if output is not None:
+            dst = Path(output)
+            if not dst.is_absolute():
+                dst = (self.target_dir / dst).absolute()
+            if dst.exists():
+                if not self.confirm(f"{dst.name} exists. Do you want to overwrite?"):
+                    self.abort()
+        try:
+            with self.metrics.phase('query'):
+                totals = inventory.stats(store, by, list(accessions))
+        except ImportError as IE:
+            self.report_error("The inventory can't be read", IE, abort=True)
+        except OSError as OSE:
+            self.report_error("An error occurred when reading the inventory", OSE, abort=True)
+        except ValueError as VE:
+            self.report_error(f"{store.name} is not an inventory made by droid-csv --format parquet", VE, abort=True)
+        # noinspection PyUnboundLocalVariable
+        self.metrics.count('rows_counted', int(totals['Count'].sum()))
+        self.print_info(totals.to_string())
+        if output is None:
+            return
+        try:
+            # noinspection PyUnboundLocalVariable
+            totals.to_csv(dst, quoting=csv.QUOTE_ALL, lineterminator='\n', encoding='utf8')
+        except OSError as OSE:
+            self.report_error("An error occurred when writing the statistics", OSE, abort=True)
+        self.print_info(f"Saved as {dst.name}")
+
+    def watch(self, directory, output_dir, interval, settle, jobs, options):
+        """See caller function documentation
+
+        :param str | pathlib.Path | None directory: The watched folder or path to it, defaults to the target directory
+        :param str | pathlib.Path output_dir: The folder the outputs and errors are written to or path to it
+        :param float interval: Seconds between two scans of the watched folder
+        :param float settle: Seconds a file must stay unchanged before it is converted
+        :param int jobs: Number of files converted at the same time
+        :param dict options: The options of droid-csv passed to batch.convert()
+        """
+        import collections
+        import batch
+        import watch
+        import inventory
+        from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+        options['engine'] = self.check_engine(options['engine'])
+        if options['output_format'] == 'parquet' and inventory.pyarrow is None:
+            self.report_error("The parquet format can't be used", "pyarrow is not installed", abort=True)
+        directory = Path(directory) if directory is not None else self.target_dir
+        output_dir = Path(output_dir)
+        if not directory.is_absolute():
+            directory = (self.target_dir / directory).absolute()
+        if not output_dir.is_absolute():
+            output_dir = (self.target_dir / output_dir).absolute()
+        if not directory.is_dir():
+            self.report_error("The watched folder doesn't exist", directory, abort=True)
+        try:
+            output_dir.mkdir(parents=True, exist_ok=True)
+        except OSError as OSE:
+            self.report_error("An error occurred when creating the output folder", OSE, abort=True)
+
+        watcher = watch.Watcher(directory, settle)
+        queue = collections.deque()  # files that are ready, converted in order as processes become free
+        running = {}  # future: (input file, output file)
+        converted = failed = 0
+        self.print_info(f"Watching {directory} for DROID csv files, converting them into {output_dir}. "
+                        f"Press Ctrl+C to stop")
+        # the processes are kept for the whole watch, so pandas is only imported once per process
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            try:
+                while True:
                     try:
-                        element.rename(dst)
-                        self.print_info(f"Moved: ./{directory.name}/{element.name} → ./{dst.name}")
+                        ready = watcher.poll(time.monotonic())
                     except OSError as OSE:
-                        self.report_error("An error occurred when moving the files", OSE)
-                        remove_dir = False  # won't remove parent if moving failed on child
+                        self.report_error("An error occurred when scanning the watched folder", OSE)
+                        ready = []
+                    for src, _ in ready:
+                        if options['output_format'] == 'parquet':
+                            dst = inventory.partition_path(output_dir, src.stem)
+                        else:
+                            dst = output_dir / f"{src.stem}_output.{options['output_format']}"
+                        if watch.up_to_date(src, [dst, output_dir / f"{src.stem}_error.txt"]):
+                            self.print_debug(f"Already converted: {src.name}")
+                            continue
+                        queue.append((src, dst))
+                    # only as many files as there are processes are submitted, so files that change while they wait
+                    # are read in their final state
+                    while queue and len(running) < jobs:
+                        src, dst = queue.popleft()
+                        self.output.detail(f"Converting: {src.name}")
+                        running[pool.submit(batch.convert, src, dst, options)] = (src, dst)
+                    if not running:
+                        time.sleep(interval)
                         continue
+                    finished, _ = wait(running, timeout=interval, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        src, dst = running.pop(future)
+                        result = future.result()
+                        self.metrics.count('rows_parsed', result.rows)
+                        error_file = output_dir / f"{src.stem}_error.txt"
+                        if result.error is None:
+                            converted += 1
+                            self.metrics.count('rows_written', result.rows_written)
+                            outputs = (f"accession {src.stem}" if options['output_format'] == 'parquet'
+                                       else ', '.join(path.name for path in result.paths))
+                            self.print_info(f"Converted: {src.name} → {outputs}")
+                            error_file.unlink(missing_ok=True)  # from an earlier version of the file
+                            continue
+                        failed += 1
+                        self.report_error(f"{result.error[0]}: {src.name}", result.error[1])
+                        try:
+                            watch.write_error(error_file, src, *result.error)
+                        except OSError as OSE:
+                            self.report_error(f"An error occurred when writing {error_file.name}", OSE)
+                    self.output.flush()  # the watch may be idle for a long time after this
+            except KeyboardInterrupt:
+                # the processes are interrupted as well, so the outputs they were writing are incomplete
+                pool.shutdown(wait=True, cancel_futures=True)
+                for src, dst in running.values():
+                    dst.unlink(missing_ok=True)
+                self.metrics.count('files_converted', converted)
+                self.metrics.count('files_failed', failed)
+                self.print_info(f"Converted {converted} files, {failed} could not be converted")
+                self.output.flush()
+                raise
 
-                if remove_dir is True:
-                    Path.rmdir(directory)
-
-            if recursion is False:
-                return
-            for element in Path.iterdir(self.target_dir):
-                if Path.is_dir(element):
-                    self.print_info(f"Found more directories, extracting them")
-                    extract()
-                    break
+    def exdir(self, recursion, resume=False, jobs=1, on_conflict='suffix', element_filter=None):
+        """See caller function documentation
 
-        # calls function for the first time
-        extract()
+        :param bool recursion: Toggles recursive behaviour
+        :param bool resume: Continues the interrupted exdir instead
+        :param int jobs: Number of moves applied at the same time
+        :param str on_conflict: What happens if a new name is taken; one of collisions.POLICIES
+        :param filters.Filter | None element_filter: Only moves the selected elements; excluded directories are kept
+            as they are
+        """
+        if resume:
+            self.resume('exdir', jobs)
+            return
+        self._check_unfinished_journal()
+        import api
+        plan = self._plan(api.plan_exdir, "An error occurred when reading the directories. No changes were made",
+                          on_conflict, recursion=recursion, element_filter=element_filter)
+        moves = sum(kind == 'move' for kind, _, _ in plan.operations)
+        self.print_debug(f"Planned {moves} moves and {len(plan.operations) - moves} directories to remove")
+        self._apply_plan(plan, jobs=jobs)
 
-    def rename(self, prefix):
+    def rename(self, prefix, resume=False, jobs=1, preview='list', plan_out=None, on_conflict='suffix',
+               element_filter=None):
         """See caller function documentation
 
         :param any prefix: The prefix to add
+        :param bool resume: Continues the interrupted rename instead; prefix is ignored
+        :param int jobs: Number of renames applied at the same time
+        :param str preview: How the changes are shown before confirming; one of preview.PREVIEW_MODES
+        :param str | None plan_out: Writes all planned changes to this file as csv or JSON lines
+        :param str on_conflict: What happens if a new name is taken; one of collisions.POLICIES
+        :param filters.Filter | None element_filter: Only renames the selected elements
         """
-        changes = []
-        for idx, element_rel in enumerate(Path.iterdir(self.target_dir), 1):  # uses idx as ID; starts at 1
-            element = element_rel.resolve()
-            new_name = f"{prefix}{element.name}"
-            changes.append((idx, element, element.with_name(new_name), self.get_element_type(element)))
-
-        self._rename_files(changes)
+        if resume:
+            self.resume('rename', jobs)
+            return
+        self._check_unfinished_journal()
+        import api
+        plan = self._plan(api.plan_rename, "An error occurred when reading the target directory", on_conflict,
+                          prefix=prefix, element_filter=element_filter)
+        self._rename_files(plan, jobs, preview, plan_out, element_filter)
 
 
 if __name__ == '__main__':
+    # the process pool of droid-csv starts the bundled executable again for every worker
+    multiprocessing.freeze_support()
+
+    def filter_options(command):
+        """Adds the options that select the elements a command processes, see ListaTools.compile_filter()"""
+        for option in reversed([
+            click.option('--include', multiple=True, metavar='PATTERN', help="Only processes elements whose name "
+                         "matches this pattern, e.g. '*.pdf'. Case is ignored and patterns starting with 're:' are "
+                         "regular expressions searched in the name. Directories are still searched if they don't "
+                         "match. Can be passed several times"),
+            click.option('--exclude', multiple=True, metavar='PATTERN', help="Never processes elements whose name "
+                         "matches this pattern, like --include, e.g. '.git' or '~$*'. Excluded directories are skipped "
+                         "with everything inside them, without reading them. Can be passed several times"),
+            click.option('--type', 'types', type=click.Choice(['file', 'directory', 'symlink']), multiple=True,
+                         help="Only processes elements of this type. Can be passed several times, defaults to all "
+                         "types"),
+            click.option('--min-size', default=None, metavar='SIZE', help="Only processes files of at least this "
+                         "size, e.g. 500, 64K or 1.5G. Other elements are not affected"),
+            click.option('--max-size', default=None, metavar='SIZE', help="Only processes files of at most this size, "
+                         "see --min-size")]):
+            command = option(command)
+        return command
+
+    def on_conflict_option(command):
+        """Adds the option that selects what happens if a new name is already taken, see collisions.resolve()"""
+        return click.option('--on-conflict', type=click.Choice(['suffix', 'skip', 'abort']), default='suffix',
+                            help="What happens if the new name of an element is already taken, by another element or "
+                            "another new name. Names that only differ in case count as the same. 'suffix' adds a "
+                            "counter to the new name, e.g. a_1.txt, 'skip' leaves the element as it is, 'abort' stops "
+                            "before anything is changed, defaults to 'suffix'")(command)
+
+    def csv_options(rows):
+        """Returns a decorator adding the options that select how the csv files of DROID are read, see
+        ListaTools.check_engine()
+
+        :param str rows: What happens to the rows of a chunk, e.g. 'read and written'
+        """
+        def decorator(command):
+            for option in reversed([
+                click.option('--chunk-size', type=click.IntRange(min=1), default=100000, help=f"The number of rows "
+                             f"that are {rows} at a time. Lower values reduce memory usage, defaults to 100000"),
+                click.option('--engine', type=click.Choice(['c', 'pyarrow']), default='c', help="The csv parser to "
+                             "use. 'pyarrow' is faster on large files, but requires pyarrow to be installed, defaults "
+                             "to 'c'")]):
+                command = option(command)
+            return command
+        return decorator
+
     @click.group(invoke_without_command=True, no_args_is_help=True)
     @click.option('-l', '--logging', type=click.Choice(['none', 'error', 'warn', 'full', 'debug'],
                   case_sensitive=False), default='full', help="The level of verbosity of the script. 'none' prints "
@@ -387,61 +1382,255 @@ if __name__ == '__main__':
                   "current and available version")
     @click.option('-d', '--debug', is_flag=True, default=False, help="Functionally identical to '-l debug'."
                                                                      " Implemented for nicer commands. Overrides '-l'")
-    def cli(logging, noconfirm, target_dir, updateflag, versionflag, debug):
+    @click.option('--offline', is_flag=True, default=False, help="Never accesses the network. The update check only "
+                  "uses the newest version cached by previous runs")
+    @click.option('--metrics-json', type=click.Path(dir_okay=False, allow_dash=True, path_type=Path), default=None,
+                  help="Writes the time spent in every phase of the command and counts of what it did to this JSON "
+                  "file at the end of the run. '-' prints them instead")
+    @click.option('--profile', type=click.Choice(['cpu', 'memory']), default=None, help="Also profiles the run. 'cpu' "
+                  "lists the functions the most time was spent in and saves the cProfile statistics next to the "
+                  "--metrics-json file, 'memory' lists the lines that allocated the most memory. Without "
+                  "--metrics-json the metrics are printed to stderr")
+    @click.option('--log-file', type=click.Path(dir_okay=False, path_type=Path), default=None, help="Also appends "
+                  "everything to this file, including debug info and every element that is renamed or moved, "
+                  "regardless of --logging. The elements are then only written to the file and the console shows the "
+                  "progress instead")
+    def cli(logging, noconfirm, target_dir, updateflag, versionflag, debug, offline, metrics_json, profile, log_file):
         if debug is True:
             logging = 'debug'
-        ltt.insert_params(logging=logging, noconfirm=noconfirm, target_dir=target_dir)
+        ltt.insert_params(logging=logging, noconfirm=noconfirm, target_dir=target_dir, offline=offline,
+                          metrics_json=metrics_json, profile=profile, log_file=log_file)
+        if metrics_json is not None or profile is not None:
+            ctx = click.get_current_context()
+            ltt.start_metrics(ctx.invoked_subcommand)
+            # also called if the command aborts
+            ctx.call_on_close(ltt.write_metrics)
         if versionflag:
             ltt.print_version()
         ltt.update_check(force=updateflag)
 
     @cli.command()
-    def clean_filenames():
+    @click.option('--resume', is_flag=True, default=False, help="Continues the last clean-filenames in the target "
+                  "directory if it was interrupted, without listing the elements again")
+    @click.option('-j', '--jobs', type=click.IntRange(min=1), default=1, help="The number of renames applied at the "
+                  "same time. Higher values are faster on network drives, defaults to 1")
+    @click.option('-r', '--recursive', is_flag=True, default=False, help="Also cleans up the names of all elements "
+                  "in subdirectories. The elements of a directory are renamed before the directory itself")
+    @click.option('--preview', type=click.Choice(['list', 'summary']), default='list', help="How the changes are "
+                  "shown before confirming. 'list' lists every element that is renamed, in a pager if the list doesn't "
+                  "fit on the screen, followed by the number of changes by type, 'summary' only shows the number of "
+                  "changes, defaults to 'list'")
+    @click.option('--plan-out', default=None, help="Also writes all planned changes to this file, as JSON lines if "
+                  "the name ends with .jsonl and as csv otherwise")
+    @on_conflict_option
+    @filter_options
+    def clean_filenames(resume, jobs, recursive, preview, plan_out, on_conflict, include, exclude, types, min_size,
+                        max_size):
         """Cleans up filenames by substituting all non-alphanumerical characters with underscores.
         Also replaces the German Umlaute with their alphanumerical counterparts (e.g. ä → ae)
         """
-        ltt.clean_filenames()
+        ltt.clean_filenames(resume=resume, jobs=jobs, recursive=recursive, preview=preview, plan_out=plan_out,
+                            on_conflict=on_conflict, element_filter=ltt.compile_filter(include, exclude, types,
+                                                                                        min_size, max_size))
 
     @cli.command()
     # paths are passed as str, since all checks are done in the function itself
-    @click.argument('input')
-    @click.option('-o', '--output', default='output.csv', help="The name of the output file, defaults to 'output.csv'")
+    @click.argument('inputs', metavar='INPUT...', nargs=-1, required=True)
+    @click.option('-o', '--output', default=None, help="The name of the output file, defaults to 'output.csv' or "
+                  "'output.xlsx', depending on --format. Can only be used with several input files if they are "
+                  "merged. With --format parquet the inventory folder, defaults to 'inventory'")
+    @click.option('-f', '--format', 'output_format', type=click.Choice(['csv', 'xlsx', 'parquet']), default='csv',
+                  help="The format of the output file. 'csv' writes a csv without header row to be pasted into the "
+                  "LIStA Excel template, 'xlsx' writes the rows directly into a copy of the template. If the rows "
+                  "don't fit into one sheet, they are continued in additional files, e.g. output_2.xlsx. 'parquet' "
+                  "adds the rows as an accession to the inventory folder passed with --output, which can be queried "
+                  "with stats, and requires pyarrow to be installed, defaults to 'csv'")
     # ' /-F' defines -F as alias for the --remove-folders
     @click.option(' /-F', '--keep-folders/--remove-folders', 'remove_folders', default=False, help="Removes all rows "
                   "containing information on folders, defaults to '--keep-folders'")
-    def droid_csv(input, output, remove_folders):
+    @csv_options('read and written')
+    @click.option('--multi-format', type=click.Choice(['join', 'rows']), default='join', help="How rows of "
+                  "elements DROID matched to multiple formats are written. 'join' joins the values of all formats into "
+                  "one row, 'rows' writes one row per format, defaults to 'join'")
+    @click.option('--paths', is_flag=True, default=False, help="Adds the columns RELATIVE_PATH and DEPTH, which are "
+                  "rebuilt from ID and PARENT_ID, since FILE_PATH is not part of the template. Reads the input file "
+                  "twice")
+    @click.option('--merge', is_flag=True, default=False, help="Merges several input files into one output file. "
+                  "The rows are numbered across all files and the IDs and PARENT_IDs of every file are shifted, so "
+                  "they stay unique")
+    @click.option('-j', '--jobs', type=click.IntRange(min=1), default=os.cpu_count() or 1, help="The number of input "
+                  "files converted at the same time, defaults to the number of CPUs")
+    @click.option('--incremental', 'incremental', default=None, metavar='INDEX', help="Only writes the rows that were "
+                  "added, changed or removed since the last run with the same INDEX file, identified by FILE_PATH and "
+                  "compared by MD5_HASH and LAST_MODIFIED. The output is a csv with header row and the column CHANGE. "
+                  "INDEX is created on the first run")
+    @click.option('--accession', default=None, help="The name the rows are stored as in the inventory with --format "
+                  "parquet. An accession that is already in the inventory is replaced, defaults to the name of the "
+                  "input file without extension")
+    @filter_options
+    def droid_csv(inputs, output, output_format, remove_folders, chunk_size, engine, multi_format, paths, merge, jobs,
+                  incremental, accession, include, exclude, types, min_size, max_size):
         """Formats a csv file made by DROID to fit in the LIStA Excel template
 
-        INPUT is the path to the input file
+        INPUT is the path to the input file. Several files or patterns like *.csv can be passed; every file is
+        converted into its own output file next to it, e.g. a.csv → a_output.csv, unless --merge is passed.
+        The filter options select rows by NAME, TYPE and SIZE; the rows of the elements inside an excluded folder are
+        left out as well
         """
-        ltt.droid_csv(input=input, output=output, remove_folders=remove_folders)
+        ltt.droid_csv(inputs=inputs, output=output, remove_folders=remove_folders, chunk_size=chunk_size,
+                      engine=engine, multi_format=multi_format, output_format=output_format, paths=paths,
+                      merge=merge, jobs=jobs, incremental=incremental, accession=accession,
+                      element_filter=ltt.compile_filter(include, exclude, types, min_size, max_size))
 
     @cli.command()
     # ' /-R' defines -R as alias for the --no-recursion
     @click.option(' /-R', '--recursion/--no-recursion', 'recursion', default=True, help="Toggles recursive behaviour. "
                   "If '--no-recursion' is passed, only the top layer of directories will be , defaults to "
                   "'--recursion'")
-    def exdir(recursion):
+    @click.option('--resume', is_flag=True, default=False, help="Continues the last exdir in the target directory "
+                  "if it was interrupted, without listing the elements again")
+    @click.option('-j', '--jobs', type=click.IntRange(min=1), default=1, help="The number of moves applied at the same "
+                  "time. Higher values are faster on network drives, defaults to 1")
+    @on_conflict_option
+    @filter_options
+    def exdir(recursion, resume, jobs, on_conflict, include, exclude, types, min_size, max_size):
         """Extracts all folders inside the target directory and adds the name of the parent folder as a prefix to the
         extracted element. If recursion is turned on, this will repeat until there are only files left in the target
         directory
         """
-        ltt.exdir(recursion=recursion)
+        ltt.exdir(recursion=recursion, resume=resume, jobs=jobs, on_conflict=on_conflict,
+                  element_filter=ltt.compile_filter(include, exclude, types, min_size, max_size))
 
     @cli.command()
-    @click.argument('prefix')
-    def rename(prefix):
+    # not required, since it isn't needed with --resume
+    @click.argument('prefix', required=False)
+    @click.option('--resume', is_flag=True, default=False, help="Continues the last rename in the target directory "
+                  "if it was interrupted, without listing the elements again")
+    @click.option('-j', '--jobs', type=click.IntRange(min=1), default=1, help="The number of renames applied at the "
+                  "same time. Higher values are faster on network drives, defaults to 1")
+    @click.option('--preview', type=click.Choice(['list', 'summary']), default='list', help="How the changes are "
+                  "shown before confirming. 'list' lists every element that is renamed, in a pager if the list doesn't "
+                  "fit on the screen, followed by the number of changes by type, 'summary' only shows the number of "
+                  "changes, defaults to 'list'")
+    @click.option('--plan-out', default=None, help="Also writes all planned changes to this file, as JSON lines if "
+                  "the name ends with .jsonl and as csv otherwise")
+    @on_conflict_option
+    @filter_options
+    def rename(prefix, resume, jobs, preview, plan_out, on_conflict, include, exclude, types, min_size, max_size):
         """Adds the passed prefix to all elements in the target directory
 
         PREFIX is the prefix to add
         """
-        ltt.rename(prefix=prefix)
+        if prefix is None and not resume:
+            raise click.UsageError("Missing argument 'PREFIX'.")
+        ltt.rename(prefix=prefix, resume=resume, jobs=jobs, preview=preview, plan_out=plan_out,
+                   on_conflict=on_conflict, element_filter=ltt.compile_filter(include, exclude, types, min_size,
+                                                                              max_size))
+
+    @cli.command()
+    # paths are passed as str, since all checks are done in the function itself
+    @click.argument('input')
+    @click.option('-o', '--output', default=None, help="The name of the report, defaults to 'verify.csv'")
+    @click.option('--quick', is_flag=True, default=False, help="Only compares the sizes of the files instead of "
+                  "calculating their MD5")
+    @click.option('-j', '--jobs', type=click.IntRange(min=1), default=os.cpu_count() or 1, help="The number of files "
+                  "checked at the same time, defaults to the number of CPUs")
+    @csv_options('read')
+    @click.option('--droid-root', default=None, help="The path DROID was run on, as written in the FILE_PATH column. "
+                  "It is replaced with the target directory to find the files, defaults to the path of the first "
+                  "element in the csv")
+    def verify(input, output, quick, jobs, chunk_size, engine, droid_root):
+        """Checks the files in the target directory against the sizes and MD5 hashes in a csv file made by DROID and
+        writes every missing or changed file to a report
+
+        INPUT is the path to the DROID csv
+        """
+        ltt.verify(input=input, output=output, quick=quick, jobs=jobs, chunk_size=chunk_size, engine=engine,
+                   droid_root=droid_root)
+
+    @cli.command()
+    # paths are passed as str, since all checks are done in the function itself
+    @click.argument('input')
+    @click.option('-o', '--output', default=None, help="The name of the report, defaults to 'duplicates.csv'")
+    @csv_options('read')
+    @click.option('--spill-rows', type=click.IntRange(min=1), default=1000000, help="The number of possible "
+                  "duplicates kept in memory. If there are more, they are written to temporary files and grouped one "
+                  "part at a time. Lower values reduce memory usage, defaults to 1000000")
+    def duplicates(input, output, chunk_size, engine, spill_rows):
+        """Finds duplicate files in a csv file made by DROID by their MD5 hash and size and writes every group of
+        duplicates with the wasted bytes to a report
+
+        INPUT is the path to the DROID csv
+        """
+        ltt.duplicates(input=input, output=output, chunk_size=chunk_size, engine=engine, spill_rows=spill_rows)
+
+    @cli.command()
+    # paths are passed as str, since all checks are done in the function itself
+    @click.argument('store', required=False)
+    @click.option('--by', type=click.Choice(['accession', 'PUID', 'FORMAT_NAME', 'MIME_TYPE', 'TYPE', 'EXT',
+                                             'EXTENSION_MISMATCH']), default='PUID', help="The column the elements "
+                  "are grouped by, defaults to 'PUID'")
+    @click.option('-a', '--accession', 'accessions', multiple=True, help="Only counts the elements of this "
+                  "accession. Can be passed several times, defaults to all accessions")
+    @click.option('-o', '--output', default=None, help="Also writes the statistics to this csv")
+    def stats(store, by, accessions, output):
+        """Counts the elements in an inventory made by droid-csv --format parquet and sums up their sizes, grouped by
+        format, type, extension or accession
+
+        STORE is the path to the inventory folder, defaults to 'inventory'
+        """
+        ltt.stats(store=store, by=by, accessions=accessions, output=output)
+
+    @cli.command()
+    # paths are passed as str, since all checks are done in the function itself
+    @click.argument('directory', required=False)
+    @click.option('-o', '--output-dir', default='converted', help="The folder the outputs are written to, e.g. "
+                  "a.csv → a_output.csv, or the inventory with --format parquet. If a file can't be converted, the "
+                  "error is written to a_error.txt instead, defaults to 'converted'")
+    @click.option('--interval', type=click.FloatRange(min=0.1), default=2.0, help="Seconds between two scans of the "
+                  "watched folder, defaults to 2")
+    @click.option('--settle', type=click.FloatRange(min=0), default=5.0, help="Seconds the size and modification time "
+                  "of a file must stay the same before it is converted, so files that are still being written are not "
+                  "read, defaults to 5")
+    @click.option('-j', '--jobs', type=click.IntRange(min=1), default=os.cpu_count() or 1, help="The number of files "
+                  "converted at the same time, defaults to the number of CPUs")
+    @click.option('-f', '--format', 'output_format', type=click.Choice(['csv', 'xlsx', 'parquet']), default='csv',
+                  help="The format of the output files, see droid-csv. With 'parquet' every file is stored as an "
+                  "accession named like the file, defaults to 'csv'")
+    # ' /-F' defines -F as alias for the --remove-folders
+    @click.option(' /-F', '--keep-folders/--remove-folders', 'remove_folders', default=False, help="Removes all rows "
+                  "containing information on folders, defaults to '--keep-folders'")
+    @csv_options('read and written')
+    @click.option('--multi-format', type=click.Choice(['join', 'rows']), default='join', help="How rows of "
+                  "elements DROID matched to multiple formats are written, see droid-csv, defaults to 'join'")
+    @click.option('--paths', is_flag=True, default=False, help="Adds the columns RELATIVE_PATH and DEPTH, see "
+                  "droid-csv")
+    @filter_options
+    def watch(directory, output_dir, interval, settle, jobs, output_format, remove_folders, chunk_size, engine,
+              multi_format, paths, include, exclude, types, min_size, max_size):
+        """Watches a folder and converts every DROID csv that is saved in it like droid-csv, until stopped with
+        Ctrl+C. Files that change are converted again
+
+        DIRECTORY is the watched folder, defaults to the target directory
+        """
+        ltt.watch(directory=directory, output_dir=output_dir, interval=interval, settle=settle, jobs=jobs, options={
+            'chunk_size': chunk_size, 'engine': engine, 'multi_format': multi_format, 'output_format': output_format,
+            'remove_folders': remove_folders, 'paths': paths, 'template_path': ltt.template_path,
+            'filter': ltt.compile_filter(include, exclude, types, min_size, max_size)})
+
+    @cli.command()
+    def undo():
+        """Undoes the last clean-filenames, exdir or rename in the target directory, including the changes made before
+        it was interrupted
+        """
+        ltt.undo()
 
     # __init__ is run outside of cli() to avoid having to return ltt,
     # since params are only known after cli() runs
+    ltt = ListaTools()
     try:
-        ltt = ListaTools()
         cli()
     except KeyboardInterrupt as KI:
+        ltt.output.flush()  # so the message comes after everything printed before
         print("Interrupted by user!")
         sys.exit()
@@ -0,0 +1,150 @@
+import sys
+import time
+import datetime
+import contextlib
+
+# ways a run can be profiled in addition to the metrics; 'cpu' profiles the main thread with cProfile, 'memory' traces
+# all allocations with tracemalloc
+PROFILE_MODES = ('cpu', 'memory')
+# number of functions or allocation sites listed in the metrics of a profiled run
+PROFILE_TOP = 25
+# returned by next() in Metrics.iterate() when there are no items left
+_END = object()
+
+
+class Metrics:
+    """Records the time spent in every phase of a command and counts what it did. Phases don't overlap: a phase
+    started while another one is running pauses it, e.g. confirming to overwrite a file while the plan is written only
+    counts as 'confirm'. Phases and counters are only used from the main thread
+    """
+    def __init__(self):
+        self.command = None
+        self.phases = {}  # seconds spent in every phase
+        self.counters = {}
+        self.profile = None
+        self._profiler = None
+        self._started_at = None
+        self._started = time.perf_counter()
+        self._running = []  # [name, start] of the phase that is running and the ones it paused
+
+    def start(self, command, profile=None):
+        """Starts the wall time of a command and the profiler
+
+        :param str | None command: Name of the command
+        :param str | None profile: One of PROFILE_MODES or None to not profile
+        """
+        self.command = command
+        self.profile = profile
+        self._started_at = datetime.datetime.now().astimezone()
+        self._started = time.perf_counter()
+        if profile == 'cpu':
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif profile == 'memory':
+            import tracemalloc
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Adds the time spent in the with block to a phase"""
+        now = time.perf_counter()
+        if self._running:
+            self._pause(now)
+        self._running.append([name, now])
+        try:
+            yield
+        finally:
+            self._pause(time.perf_counter())
+            self._running.pop()
+            if self._running:
+                self._running[-1][1] = time.perf_counter()
+
+    def iterate(self, name, iterable):
+        """Yields the items of iterable, adding the time spent producing them to a phase, e.g. the time spent reading
+        the chunks of a file
+
+        :param str name: Name of the phase
+        :param typing.Iterable iterable: The items
+        :return typing.Iterator: The items of iterable
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                item = next(iterator, _END)
+            if item is _END:
+                return
+            yield item
+
+    def count(self, name, n=1):
+        """Adds n to a counter"""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def stop(self, profile_path=None):
+        """Stops the profiler and returns everything that was recorded
+
+        :param pathlib.Path | None profile_path: Where the raw cProfile statistics are saved if the run was profiled
+            with 'cpu', e.g. to be viewed with snakeviz
+        :return dict: The metrics as JSON serializable document
+        """
+        document = {
+            'command': self.command,
+            'started_at': self._started_at.isoformat(timespec='seconds') if self._started_at else None,
+            'wall_seconds': round(time.perf_counter() - self._started, 6),
+            'phases': {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            'counters': dict(self.counters),
+            'peak_rss_mb': _peak_rss_mb(),
+        }
+        if self.profile == 'cpu':
+            document['profile'] = self._stop_cpu_profile(profile_path)
+        elif self.profile == 'memory':
+            document['profile'] = self._stop_memory_profile()
+        self.profile = None
+        return document
+
+    def _pause(self, now):
+        name, start = self._running[-1]
+        self.phases[name] = self.phases.get(name, 0) + now - start
+
+    def _stop_cpu_profile(self, profile_path):
+        """Returns the functions the most time was spent in, including the functions they called"""
+        import pstats
+        self._profiler.disable()
+        stats = pstats.Stats(self._profiler)
+        if profile_path is not None:
+            stats.dump_stats(profile_path)
+        # noinspection PyUnresolvedReferences
+        # stats is filled in by Stats.__init__()
+        functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP]
+        return {
+            'mode': 'cpu',
+            'file': str(profile_path) if profile_path is not None else None,
+            'functions': [{'function': f"{file}:{line}({name})", 'calls': calls, 'total_seconds': round(total, 6),
+                           'cumulative_seconds': round(cumulative, 6)}
+                          for (file, line, name), (_, calls, total, cumulative, _) in functions],
+        }
+
+    @staticmethod
+    def _stop_memory_profile():
+        """Returns the peak of the traced memory and the lines that allocated the most memory that is still in use"""
+        import tracemalloc
+        _, peak = tracemalloc.get_traced_memory()
+        statistics = tracemalloc.take_snapshot().statistics('lineno')[:PROFILE_TOP]
+        tracemalloc.stop()
+        return {
+            'mode': 'memory',
+            'peak_traced_mb': round(peak / (1024 * 1024), 3),
+            'allocations': [{'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                             'size_mb': round(stat.size / (1024 * 1024), 3), 'count': stat.count}
+                            for stat in statistics],
+        }
+
+
+def _peak_rss_mb():
+    """Returns the peak resident memory of this process in MB or None if it can't be measured on this platform"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
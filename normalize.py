@@ -0,0 +1,53 @@
+import re
+import unicodedata
+
+# German Umlaute and ß are replaced with their alphanumerical counterparts
+SUBSTITUTIONS = {
+    "ä": "ae",
+    "ö": "oe",
+    "ü": "ue",
+    "ß": "ss",
+    "Ä": "Ae",
+    "Ö": "Oe",
+    "Ü": "Ue",
+}
+# number of names cleaned in one pass by clean_stems()
+BATCH_SIZE = 10000
+
+# everything that is left after the substitutions and is not alphanumerical, an underscore or a hyphen
+_NOT_ALLOWED = re.compile(r"[^a-zA-Z0-9_-]")
+# same, but keeps the '/' used to join batches of names; it can't appear in file names on any system
+_NOT_ALLOWED_IN_BATCH = re.compile(r"[^a-zA-Z0-9_/-]")
+
+
+def clean_stem(stem):
+    """Cleans up a file name without its extension. The name is normalized to composed characters first, so Umlaute
+    stored as a letter followed by a combining diaeresis, like macOS does, are replaced like all others
+
+    :param str stem: The name to clean up
+    :return str: The cleaned up name
+    """
+    return _NOT_ALLOWED.sub('_', _substitute(unicodedata.normalize('NFC', stem)))
+
+
+def clean_stems(stems):
+    """Cleans up many file names like clean_stem(), but joins every BATCH_SIZE names into one string, so normalizing,
+    substituting and replacing only run once per batch instead of once per name
+
+    :param list[str] stems: The names to clean up; must not contain '/'
+    :return list[str]: The cleaned up names, in the same order
+    """
+    cleaned = []
+    for start in range(0, len(stems), BATCH_SIZE):
+        joined = '/'.join(stems[start:start + BATCH_SIZE])
+        joined = _NOT_ALLOWED_IN_BATCH.sub('_', _substitute(unicodedata.normalize('NFC', joined)))
+        cleaned.extend(joined.split('/'))
+    return cleaned
+
+
+def _substitute(text):
+    """Applies SUBSTITUTIONS; str.replace() is used, since str.translate() is several times slower when characters are
+    replaced with more than one character"""
+    for character, replacement in SUBSTITUTIONS.items():
+        text = text.replace(character, replacement)
+    return text
@@ -0,0 +1,241 @@
+import sys
+import time
+import atexit
+import threading
+
+# levels of verbosity, every level prints everything the levels before it print
+LEVELS = ('none', 'error', 'warn', 'full', 'debug')
+# console output is written once this many characters are buffered or FLUSH_INTERVAL seconds after the oldest of them
+BUFFER_SIZE = 64 * 1024
+FLUSH_INTERVAL = 0.2
+# seconds between two redraws of a progress line; updates in between are only counted
+REFRESH_INTERVAL = 0.1
+
+
+class Output:
+    """Buffers everything printed to the console and writes it in large blocks, since writing every line on its own
+    takes up a large share of the runtime on Windows consoles and over remote sessions. The buffer is written before
+    prompts, when a progress line is redrawn and when the program exits.
+
+    If a log file is opened, everything is also written to it, including debug info and details of every element,
+    regardless of the level. Details are then only written to the log file, so the console only shows the progress
+
+    :param str | None level: One of LEVELS; nothing is printed to the console if it is None
+    """
+    def __init__(self, level=None):
+        self.level = level
+        self._buffer = []
+        self._buffered = 0
+        self._buffered_at = None  # when the oldest buffered text was added
+        self._progress = None  # the progress line that is shown; it is ended before anything else is printed
+        # a line can only be replaced on a terminal; redirected output only gets the final state of a progress line
+        self._terminal = sys.stdout is not None and sys.stdout.isatty()
+        self._log = None
+        self._log_second = None  # the timestamp of the log is only formatted once per second
+        self._log_timestamp = ''
+        self._lock = threading.Lock()  # the version cache is refreshed on another thread
+        atexit.register(self.close)
+
+    @property
+    def level(self):
+        return self._level
+
+    @level.setter
+    def level(self, level):
+        self._level = level
+        self._rank = LEVELS.index(level) if level in LEVELS else 0
+
+    @property
+    def has_log(self):
+        """True if a log file is open, so details are written to it instead of to the console"""
+        return self._log is not None
+
+    def open_log(self, path):
+        """Appends everything that is printed from now on to a log file
+
+        :param pathlib.Path path: Path to the log file
+        :raises OSError: If the file can't be opened
+        """
+        self._log = open(path, 'a', encoding='utf8')
+
+    def debug(self, text):
+        """Prints text if the level is 'debug'"""
+        self._write(text, 'debug', 'DEBUG: ')
+
+    def info(self, text, end='\n'):
+        """Prints text if the level is one of [debug | full]
+
+        :param any text: What to print
+        :param str end: Printed after text
+        """
+        self._write(text, 'full', end=end)
+
+    def warning(self, text):
+        """Prints text if the level is one of [debug | full | warn]"""
+        self._write(text, 'warn', 'WARNING: ')
+
+    def error(self, text, error):
+        """Prints text and error if the level is one of [debug | full | warn | error]
+
+        :param any text: What to print
+        :param BaseException error: The error to print
+        """
+        self._write(f"{text}\n{error}", 'error', 'ERROR: ')
+
+    def detail(self, text, console=False):
+        """Writes what happened to a single element to the log file. Without a log file, it is printed like info() if
+        console is True and not at all otherwise
+
+        :param any text: What to print
+        :param bool console: Whether to print it if there is no log file
+        """
+        if self._log is not None:
+            self._write_log('DETAIL', text)
+        elif console:
+            self._write(text, 'full')
+
+    def ask(self, text):
+        """Prints text if the level is one of [debug | full] and waits for input
+
+        :param str text: The prompt
+        :return str: The input
+        """
+        self.info(text, end='')
+        self.flush()
+        return input()
+
+    def progress(self, label, total=None, done=0, render=None):
+        """Starts a progress line, see Progress
+
+        :param str label: Printed before the progress
+        :param int | None total: The number of steps or None if it isn't known
+        :param int done: The number of steps already done
+        :param typing.Callable[[int, int | None], str] | None render: Returns the progress line of done and total
+            steps, instead of e.g. 'Renaming: 5/10'
+        :return Progress: The progress line
+        """
+        return Progress(self, label, total, done, render)
+
+    def flush(self):
+        """Writes the buffered console output"""
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """Writes the buffered output and closes the log file"""
+        with self._lock:
+            self._flush()
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def _write(self, text, level, prefix='', end='\n'):
+        if self._log is not None:
+            self._write_log(level.upper(), text)
+        if self._rank < LEVELS.index(level):
+            return
+        with self._lock:
+            if self._progress is not None and self._progress.shown:
+                self._progress.shown = False
+                self._append('\n')
+            self._append(f"{prefix}{text}{end}")
+            # warnings and errors are shown right away, since they may be followed by a long running step
+            if level in ('error', 'warn') or self._buffered >= BUFFER_SIZE \
+                    or time.monotonic() - self._buffered_at >= FLUSH_INTERVAL:
+                self._flush()
+
+    def _write_log(self, level, text):
+        now = int(time.time())
+        if now != self._log_second:
+            self._log_second = now
+            self._log_timestamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now))
+        with self._lock:
+            self._log.write(f"{self._log_timestamp} {level:<7} {text}\n")
+
+    def _draw(self, progress, line):
+        """Replaces the progress line with line and writes it right away"""
+        with self._lock:
+            if progress is not self._progress:
+                if self._progress is not None and self._progress.shown:
+                    self._append('\n')
+                self._progress = progress
+            if not self._terminal:
+                return  # written once it is ended
+            self._append(f"\r{line}")
+            progress.shown = True
+            self._flush()
+
+    def _end(self, progress, line):
+        """Ends the progress line with its final state line, so the next output starts on a new line"""
+        with self._lock:
+            if not self._terminal:
+                self._append(f"{line}\n")
+            elif progress.shown:
+                self._append('\n')
+                progress.shown = False
+            if progress is self._progress:
+                self._progress = None
+            self._flush()
+
+    def _append(self, text):
+        if not self._buffer:
+            self._buffered_at = time.monotonic()
+        self._buffer.append(text)
+        self._buffered += len(text)
+
+    def _flush(self):
+        if self._buffer:
+            sys.stdout.write(''.join(self._buffer))
+            self._buffer.clear()
+            self._buffered = 0
+        sys.stdout.flush()
+
+
+class Progress:
+    """A line showing the progress of a long running step, redrawn at most every REFRESH_INTERVAL seconds. It is only
+    printed if the level of the output is one of [debug | full]; the final state is also written to the log file. If
+    the output is redirected, e.g. to a file, only the final state is printed, since the line can't be replaced
+
+    :param Output output: Where the line is printed
+    :param str label: Printed before the progress
+    :param int | None total: The number of steps or None if it isn't known
+    :param int done: The number of steps already done
+    :param typing.Callable[[int, int | None], str] | None render: Returns the progress line of done and total steps
+    """
+    def __init__(self, output, label, total=None, done=0, render=None):
+        self.output = output
+        self.label = label
+        self.total = total
+        self.done = done
+        self.render = render
+        self.shown = False  # whether the line is the last line of the console
+        self._visible = output.level in ('debug', 'full')
+        self._drawn_at = 0
+        self.update(done, force=True)
+
+    def update(self, done, force=False):
+        """Sets the number of steps done and redraws the line if it wasn't redrawn for REFRESH_INTERVAL seconds
+
+        :param int done: The number of steps done
+        :param bool force: Redraws the line in any case
+        """
+        self.done = done
+        if not self._visible:
+            return
+        now = time.monotonic()
+        if force or now - self._drawn_at >= REFRESH_INTERVAL:
+            self._drawn_at = now
+            self.output._draw(self, self._line())
+
+    def close(self):
+        """Draws the final state and ends the line"""
+        if self._visible:
+            self.update(self.done, force=True)
+            self.output._end(self, self._line())
+        if self.output.has_log:
+            self.output._write_log('INFO', self._line())
+
+    def _line(self):
+        if self.render is not None:
+            return self.render(self.done, self.total)
+        return f"{self.label}: {self.done}" + (f"/{self.total}" if self.total is not None else '')
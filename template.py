@@ -0,0 +1,206 @@
+import re
+import csv
+import zipfile
+import posixpath
+import numpy as np
+import pandas as pd
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+# Excel can't open sheets with more rows than this, including the header row
+EXCEL_MAX_ROWS = 1048576
+FORMATS = ('csv', 'xlsx')
+
+_NS = {
+    'main': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+    'rel': 'http://schemas.openxmlformats.org/package/2006/relationships',
+    'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+}
+# escapes the characters with a special meaning in XML and removes the ones that are not allowed in XML, even escaped
+_XML_ESCAPES = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'}
+                             | dict.fromkeys([*range(0x00, 0x09), 0x0b, 0x0c, *range(0x0e, 0x20)]))
+
+
+class CsvWriter:
+    """Appends DROID rows to a header-less csv, which can be pasted into the LIStA Excel template
+
+    :param pathlib.Path dst: Path to the output file
+    """
+    def __init__(self, dst):
+        self.paths = [dst]
+        self.f = open(dst, 'w', encoding='utf8')
+
+    def write(self, chunk):
+        """Appends the rows of chunk, indexed by their LfdNr
+
+        :param pandas.DataFrame chunk: Formatted DROID rows
+        """
+        # csv.QUOTE_ALL to prevent issues with whitespace characters in data
+        # header=False removes header row, since the Excel template has its own header row
+        chunk.to_csv(self.f, quoting=csv.QUOTE_ALL, lineterminator='\n', header=False)
+
+    def close(self):
+        self.f.close()
+
+
+class XlsxWriter:
+    """Streams DROID rows into the data sheet of a copy of the LIStA Excel template. All parts of the template are
+    copied unchanged, except for the data sheet, of which only the header row is kept. The rows are written straight
+    into the compressed sheet as inline strings, so the memory usage doesn't depend on the number of rows. When a sheet
+    is full, the rows continue in a new copy of the template named like dst with a counter added, e.g. output_2.xlsx
+
+    :param pathlib.Path template_path: Path to template.xlsx
+    :param pathlib.Path dst: Path to the (first) output file
+    :param int max_rows: Maximum number of rows per sheet, including the header row
+    """
+    def __init__(self, template_path, dst, max_rows=EXCEL_MAX_ROWS):
+        self.template_path = Path(template_path)
+        self.dst = dst
+        self.max_rows = max_rows
+        self.paths = []
+        with zipfile.ZipFile(self.template_path) as template:
+            self.sheet_name = self._data_sheet_name(template)
+            sheet = template.read(self.sheet_name).decode('utf8')
+            self.header = self._header_names(template, sheet)
+        start = sheet.index('<sheetData>') + len('<sheetData>')
+        end = sheet.index('</sheetData>')
+        rows = re.findall(r'<row\b.*?</row>', sheet[start:end], flags=re.DOTALL)
+        # the dimension would be outdated and the sort state refers to the example rows, both are optional
+        self.sheet_head = re.sub(r'<dimension\b[^>]*/>', '', sheet[:start])
+        self.sheet_tail = re.sub(r'<sortState\b[^>]*/>|<sortState\b.*?</sortState>', '',
+                                 sheet[end + len('</sheetData>'):], flags=re.DOTALL)
+        self.header_row = rows[0]
+        # the styles of the example row in the template are used for the data rows
+        self.styles = dict(re.findall(r'<c r="([A-Z]+)2"(?: s="(\d+)")?', rows[1])) if len(rows) > 1 else {}
+        self.zip = None
+        self.sheet = None
+        self.rows_in_sheet = 0
+
+    def write(self, chunk):
+        """Appends the rows of chunk, indexed by their LfdNr. Columns of the template that are not in chunk are left
+        empty, columns of chunk that are not in the template are ignored
+
+        :param pandas.DataFrame chunk: Formatted DROID rows
+        """
+        while len(chunk) > 0:
+            if self.sheet is None or self.rows_in_sheet >= self.max_rows:
+                self._next_file()
+            free = self.max_rows - self.rows_in_sheet
+            part, chunk = chunk.iloc[:free], chunk.iloc[free:]
+            self.sheet.write(self._rows_xml(part, self.rows_in_sheet + 1).encode('utf8'))
+            self.rows_in_sheet += len(part)
+
+    def close(self):
+        """Finishes the current file; must be called for the output to be a valid workbook"""
+        if self.zip is None:
+            return
+        self.sheet.write(f'</sheetData>{self.sheet_tail}'.encode('utf8'))
+        self.sheet.close()
+        with zipfile.ZipFile(self.template_path) as template:
+            for info in template.infolist():
+                if info.filename == self.sheet_name:
+                    continue
+                data = template.read(info)
+                if info.filename == 'xl/workbook.xml':
+                    # the filter range of the template refers to its example rows
+                    data = re.sub(rb'(\$A\$1:\$[A-Z]+\$)\d+', rb'\g<1>' + str(self.rows_in_sheet).encode(), data)
+                self.zip.writestr(info, data, compress_type=zipfile.ZIP_DEFLATED)
+        self.zip.close()
+        self.zip = None
+        self.sheet = None
+
+    def _next_file(self):
+        self.close()
+        n = len(self.paths) + 1
+        path = self.dst if n == 1 else self.dst.with_stem(f"{self.dst.stem}_{n}")
+        self.paths.append(path)
+        # the lowest compression level is several times faster and the sheet only gets slightly larger
+        self.zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1)
+        # force_zip64, since the sheet may grow larger than 2 GiB before it is compressed
+        self.sheet = self.zip.open(self.sheet_name, 'w', force_zip64=True)
+        self.sheet.write(f'{self.sheet_head}{self.header_row}'.encode('utf8'))
+        self.rows_in_sheet = 1
+
+    def _rows_xml(self, chunk, first_row):
+        """Builds the XML of the rows of chunk column by column, which is much faster than building it cell by cell
+
+        :param pandas.DataFrame chunk: Formatted DROID rows
+        :param int first_row: The row number of the first row in chunk
+        :return str: The XML of the rows
+        """
+        rows = pd.Series([f'<row r="{n}">' for n in range(first_row, first_row + len(chunk))],
+                         index=chunk.index, dtype=object)
+        for n, name in enumerate(self.header):
+            letter = _column_letter(n)
+            style = f' s="{self.styles[letter]}"' if self.styles.get(letter) else ''
+            if name == 'LfdNr':
+                rows += _cells(chunk.index.to_series(), style)
+            elif name in chunk.columns:
+                rows += _cells(chunk[name], style)
+            else:
+                rows += f'<c{style}/>'
+        return ''.join(rows + '</row>')
+
+    @staticmethod
+    def _data_sheet_name(template):
+        """Returns the name of the zip member of the first sheet of the workbook"""
+        workbook = ET.fromstring(template.read('xl/workbook.xml'))
+        rel_id = workbook.find('main:sheets/main:sheet', _NS).get(f"{{{_NS['r']}}}id")
+        rels = ET.fromstring(template.read('xl/_rels/workbook.xml.rels'))
+        target = next(rel.get('Target') for rel in rels.findall('rel:Relationship', _NS) if rel.get('Id') == rel_id)
+        return target.lstrip('/') if target.startswith('/') else posixpath.normpath(f'xl/{target}')
+
+    @staticmethod
+    def _header_names(template, sheet):
+        """Returns the values of the first row of the sheet, resolving shared strings"""
+        try:
+            shared = ET.fromstring(template.read('xl/sharedStrings.xml'))
+            strings = [''.join(t.text or '' for t in si.iter(f"{{{_NS['main']}}}t"))
+                       for si in shared.findall('main:si', _NS)]
+        except KeyError:
+            strings = []
+        names = []
+        for cell in ET.fromstring(sheet).find('main:sheetData/main:row', _NS).findall('main:c', _NS):
+            value = ''.join(node.text or '' for node in cell.iter() if node.tag in (f"{{{_NS['main']}}}v",
+                                                                                    f"{{{_NS['main']}}}t"))
+            names.append(strings[int(value)] if cell.get('t') == 's' else value)
+        return names
+
+
+def _cells(series, style):
+    """Returns the XML of the cells of a column; booleans and numbers keep their type, everything else is written as
+    an inline string
+
+    :param pandas.Series series: The column
+    :param str style: The style attribute of the cells, e.g. ' s="8"'
+    :return pandas.Series: The XML of every cell
+    """
+    empty = f'<c{style}/>'
+    if isinstance(series.dtype, pd.CategoricalDtype) and not pd.api.types.is_bool_dtype(series.cat.categories.dtype):
+        # every category is only converted once
+        categories = _cells(pd.Series(series.cat.categories), style).to_numpy()
+        if len(categories) == 0:  # e.g. the PUID of a chunk of only folders
+            return pd.Series(empty, index=series.index, dtype=object)
+        codes = series.cat.codes.to_numpy()
+        # missing values have the code -1, which is clipped to a valid index and replaced with empty cells
+        return pd.Series(np.where(codes >= 0, categories[codes.clip(0)], empty), index=series.index, dtype=object)
+    if pd.api.types.is_bool_dtype(series.dtype) or isinstance(series.dtype, pd.CategoricalDtype):
+        cells = series.astype(object).map({True: f'<c{style} t="b"><v>1</v></c>',
+                                           False: f'<c{style} t="b"><v>0</v></c>'})
+    elif pd.api.types.is_numeric_dtype(series.dtype):
+        cells = f'<c{style}><v>' + series.astype(object).where(series.notna()).astype(str) + '</v></c>'
+        cells = cells.where(series.notna())
+    else:
+        text = series.astype(object).where(series.notna()).str.translate(_XML_ESCAPES)
+        cells = f'<c{style} t="inlineStr"><is><t xml:space="preserve">' + text + '</t></is></c>'
+    return cells.astype(object).fillna(empty)
+
+
+def _column_letter(n):
+    """Returns the letter of the 0-based column number n, e.g. 0 → A, 26 → AA"""
+    letters = ''
+    n += 1
+    while n:
+        n, remainder = divmod(n - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import collisions  # noqa: E402
+
+
+def test_chain_longer_than_recursion_limit():
+    count = sys.getrecursionlimit() + 100
+    moves = [(Path(f'/d/{n}.txt'), Path(f'/d/{n + 1}.txt')) for n in range(count)]
+    resolution = collisions.resolve(moves, [src for src, _ in moves])
+    assert resolution.conflicts == []
+    assert resolution.destinations == [dst for _, dst in moves]
+    # every name is freed before it is taken, so the last move comes first
+    assert resolution.order == list(reversed(range(count)))
+
+
+def test_cycle_is_skipped():
+    moves = [(Path('/d/a.txt'), Path('/d/b.txt')), (Path('/d/b.txt'), Path('/d/a.txt'))]
+    resolution = collisions.resolve(moves, [src for src, _ in moves], 'skip')
+    assert resolution.destinations == [Path('/d/a.txt'), Path('/d/b.txt')]
+    assert resolution.order == []
+    assert len(resolution.conflicts) == 2
+
+
+def test_cycle_is_broken_with_suffix():
+    moves = [(Path('/d/a.txt'), Path('/d/b.txt')), (Path('/d/b.txt'), Path('/d/a.txt'))]
+    resolution = collisions.resolve(moves, [src for src, _ in moves])
+    # b.txt is moved away first, which frees its name for a.txt
+    assert resolution.destinations == [Path('/d/b.txt'), Path('/d/a_1.txt')]
+    assert resolution.order == [1, 0]
+    assert resolution.conflicts == [(Path('/d/b.txt'), Path('/d/a.txt'), Path('/d/a_1.txt'))]
+
+
+def test_taken_name_is_suffixed():
+    moves = [(Path('/d/a.txt'), Path('/d/B.txt'))]
+    resolution = collisions.resolve(moves, [Path('/d/a.txt'), Path('/d/b.txt')])
+    assert resolution.destinations == [Path('/d/B_1.txt')]
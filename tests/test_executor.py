@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import executor  # noqa: E402
+
+
+def test_directory_waits_for_elements_below_unchanged_directories():
+    operations = [('move', Path('/t/sub dir/inner/a b.txt'), Path('/t/sub dir/inner/a_b.txt')),
+                  ('move', Path('/t/sub dir'), Path('/t/sub_dir'))]
+    waiting, dependents = executor.dependencies(operations)
+    assert waiting == [0, 1]
+    assert dependents[0] == [1]
+
+
+def test_elements_wait_for_directory_above():
+    operations = [('move', Path('/t/a'), Path('/t/b')),
+                  ('move', Path('/t/b/x y'), Path('/t/b/x_y'))]
+    waiting, _ = executor.dependencies(operations)
+    assert waiting == [0, 1]
+
+
+def test_independent_operations_run_in_parallel():
+    operations = [('move', Path('/t/a b'), Path('/t/a_b')),
+                  ('move', Path('/t/c d'), Path('/t/c_d'))]
+    waiting, _ = executor.dependencies(operations)
+    assert waiting == [0, 0]
+
+
+def test_parallel_run_renames_nested_tree(tmp_path):
+    inner = tmp_path / 'top dir' / 'inner'
+    inner.mkdir(parents=True)
+    operations = []
+    for n in range(50):
+        (inner / f"f {n}.txt").touch()
+        operations.append(('move', inner / f"f {n}.txt", inner / f"f_{n}.txt"))
+    operations.append(('move', tmp_path / 'top dir', tmp_path / 'top_dir'))
+
+    def apply(n):
+        _, src, dst = operations[n]
+        src.rename(dst)
+
+    errors = [error for _, _, error in executor.run(operations, apply, jobs=8) if error is not None]
+    assert errors == []
+    assert sorted(path.name for path in (tmp_path / 'top_dir' / 'inner').iterdir()) == \
+        sorted(f"f_{n}.txt" for n in range(50))
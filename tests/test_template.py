@@ -0,0 +1,19 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import template  # noqa: E402
+
+
+def test_cells_of_categorical_column_without_categories():
+    series = pd.Series([None, None], dtype='category')
+    assert list(template._cells(series, ' s="1"')) == ['<c s="1"/>', '<c s="1"/>']
+
+
+def test_cells_of_categorical_column_with_missing_values():
+    series = pd.Series(['fmt/18', None, 'fmt/18'], dtype='category')
+    cells = template._cells(series, '')
+    assert cells[1] == '<c/>'
+    assert cells[0] == cells[2] == '<c t="inlineStr"><is><t xml:space="preserve">fmt/18</t></is></c>'
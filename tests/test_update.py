@@ -0,0 +1,127 @@
+import re
+import sys
+import hashlib
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import update  # noqa: E402
+
+BINARY = bytes(range(256)) * 4096  # 1 MiB, so the download takes several chunks
+OTHER_BINARY = bytes(reversed(range(256))) * 4096
+
+
+class Release(BaseHTTPRequestHandler):
+    """Serves lista-tools.exe and SHA256 like the GitHub releases, with switches for the cases the updater handles"""
+    binary = BINARY
+    sha256 = hashlib.sha256(BINARY).hexdigest()
+    ranges = True  # answers Range requests with 206
+    content_length = True  # sends content-length; otherwise the end of the body is the end of the connection
+    received = []  # (path, Range header) of every request
+
+    def do_GET(self):
+        Release.received.append((self.path, self.headers.get('Range')))
+        if self.path.endswith('/SHA256'):
+            self._send(200, f"{self.sha256}\n".encode())
+            return
+        match = re.fullmatch(r'bytes=(\d+)-', self.headers.get('Range') or '')
+        if match is None or not self.ranges:
+            self._send(200, self.binary)
+            return
+        start = int(match.group(1))
+        if start >= len(self.binary):
+            self._send(416, b'', {'Content-Range': f"bytes */{len(self.binary)}"})
+            return
+        self._send(206, self.binary[start:],
+                   {'Content-Range': f"bytes {start}-{len(self.binary) - 1}/{len(self.binary)}"})
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if self.content_length:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def release(monkeypatch):
+    """Starts the server on a free port and resets the switches of Release after the test"""
+    for name in ('binary', 'sha256', 'ranges', 'content_length'):
+        monkeypatch.setattr(Release, name, getattr(Release, name))
+    monkeypatch.setattr(Release, 'received', [])
+    monkeypatch.setattr(update.time, 'sleep', lambda seconds: None)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Release)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/download"
+    server.shutdown()
+    server.server_close()
+
+
+def updater(tmp_path, release_url, noconfirm=True):
+    exec_path = tmp_path / 'lista-tools.exe'
+    exec_path.write_bytes(b'old version')
+    return update.Updater(exec_path, {'target_dir': str(tmp_path), 'noconfirm': noconfirm}, release_url)
+
+
+def test_partial_download_is_continued_with_range(tmp_path, release):
+    up = updater(tmp_path, release)
+    up.exec_path_part.write_bytes(BINARY[:300000])
+    assert up._download() == hashlib.sha256(BINARY).hexdigest()
+    assert up.exec_path_part.read_bytes() == BINARY
+    assert Release.received == [('/download/lista-tools.exe', 'bytes=300000-')]
+
+
+def test_range_ignored_by_server_restarts_download(tmp_path, release):
+    Release.ranges = False
+    up = updater(tmp_path, release)
+    up.exec_path_part.write_bytes(BINARY[:300000])
+    assert up._download() == hashlib.sha256(BINARY).hexdigest()
+    assert up.exec_path_part.read_bytes() == BINARY
+
+
+def test_download_without_content_length(tmp_path, release):
+    Release.content_length = False
+    up = updater(tmp_path, release)
+    assert up._download() == hashlib.sha256(BINARY).hexdigest()
+    assert up.exec_path_part.read_bytes() == BINARY
+    assert up._render_progress(len(BINARY), None) == "Downloaded 1.0 MB"
+
+
+def test_range_not_satisfiable_restarts_download(tmp_path, release):
+    up = updater(tmp_path, release)
+    up.exec_path_part.write_bytes(BINARY + b'left over')  # longer than the file, so the range starts after its end
+    assert up._download() == hashlib.sha256(BINARY).hexdigest()
+    assert up.exec_path_part.read_bytes() == BINARY
+    assert Release.received == [('/download/lista-tools.exe', f'bytes={len(BINARY) + 9}-'),
+                                ('/download/lista-tools.exe', None)]
+
+
+def test_part_file_of_other_version_is_downloaded_again(tmp_path, release):
+    up = updater(tmp_path, release)
+    up.exec_path_part.write_bytes(OTHER_BINARY[:300000])
+    with pytest.raises(SystemExit):
+        up.update()
+    assert up.exec_path.read_bytes() == BINARY
+    assert not up.exec_path_part.exists() and not up.exec_path_old.exists()
+    assert [header for _, header in Release.received] == [None, 'bytes=300000-', None]
+
+
+def test_hash_mismatch_aborts_without_replacing(tmp_path, release, monkeypatch):
+    Release.sha256 = hashlib.sha256(OTHER_BINARY).hexdigest()
+    up = updater(tmp_path, release, noconfirm=False)
+    asked = []
+    monkeypatch.setattr(up, 'confirm', lambda text: asked.append(text) or False)
+    with pytest.raises(SystemExit):
+        up.update()
+    assert len(asked) == 1 and 'does not match' in asked[0]
+    assert up.exec_path.read_bytes() == b'old version'
+    assert not up.exec_path_part.exists() and not up.exec_path_new.exists()
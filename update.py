@@ -1,46 +1,67 @@
+import re
 import sys
 import time
 import requests
 import hashlib
 from pathlib import Path
 from ast import literal_eval
+from urllib3.util.retry import Retry
+from requests.adapters import HTTPAdapter
+
+import output
+
+RELEASE_URL = r'https://github.com/stadtarchiv-lindau/lista-tools/releases/latest/download'
+# bytes written and hashed at a time
+CHUNK_SIZE = 1024 * 1024
+# seconds to wait for the connection and for each chunk
+REQUEST_TIMEOUT = (10, 60)
+# number of times a failed request or an interrupted download is tried again, waiting twice as long every time
+RETRIES = 5
+RETRY_BACKOFF = 1
 
 
 class Updater:
-    def __init__(self):
-        self.exec_path = Path(sys.argv[1])
+    def __init__(self, exec_path, params, release_url=RELEASE_URL):
+        """
+        :param pathlib.Path exec_path: The executable to replace
+        :param dict params: The parameters of lista-tools
+        :param str release_url: Where the binary and its hash are downloaded from, e.g. a local server when testing
+        """
+        self.exec_path = Path(exec_path)
         self.exec_path_old = Path(f"{self.exec_path}.old")
         self.exec_path_new = Path(f"{self.exec_path}.new")
-        self.params = literal_eval(sys.argv[2])  # literal_eval to convert str representation of a dict to a dict
+        # the download is kept if it is interrupted and continued on the next update
+        self.exec_path_part = Path(f"{self.exec_path}.part")
+        self.params = params
         self.params['target_dir'] = Path(self.params.get('target_dir'))
-        self.binary_url = r'https://github.com/stadtarchiv-lindau/lista-tools/releases/latest/download/lista-tools.exe'
-        self.sha256_url = r'https://github.com/stadtarchiv-lindau/lista-tools/releases/latest/download/SHA256'
-        self.update()
+        self.output = output.Output(self.params.get('logging'))
+        if self.params.get('log_file'):
+            try:
+                self.output.open_log(self.params.get('log_file'))
+            except OSError as OSE:
+                self.report_error("An error occurred when opening the log file", OSE)
+        self.binary_url = f'{release_url}/lista-tools.exe'
+        self.sha256_url = f'{release_url}/SHA256'
+        self.session = self._create_session()
 
     def print_debug(self, text):
-        if self.params.get('logging') in 'debug':
-            print(f"DEBUG: {text}")
+        self.output.debug(text)
 
-    def print_info(self, text, end='\n', flush=False):
-        if self.params.get('logging') in ('debug', 'full'):
-            print(text, end=end, flush=flush)
+    def print_info(self, text, end='\n'):
+        self.output.info(text, end=end)
 
     def report_warning(self, text):
-        if self.params.get('logging') in ('debug', 'full', 'warn'):
-            print(f"WARNING: {text}")
+        self.output.warning(text)
 
     def report_error(self, text, error, abort=False):
-        if self.params.get('logging') in ('debug', 'full', 'warn', 'error'):
-            print(f"ERROR: {text}")
-            print(error)
+        self.output.error(text, error)
         if abort is True:
             sys.exit()
 
     def confirm(self, text):
         if self.params.get('noconfirm'):
             return True
-        self.print_info(f"{text} [y/N]: ", end='')
-        choice = input()[0].casefold()
+        choice = self.output.ask(f"{text} [y/N]: ")[0].casefold()
         self.print_info("")
         match choice:
             case 'y':
@@ -58,7 +79,7 @@ class Updater:
             if dst.exists():
                 if not self.confirm(f"{dst.name} exists. Do you want to overwrite?"):
                     self.abort()
-            src.rename(dst)
+            src.replace(dst)
         except OSError as OSE:
             self.report_error("An error occurred when renaming the temporary files. Please try again or manually "
                               "download the newest version from GitHub and delete the temporary files.", OSE,
@@ -66,11 +87,112 @@ class Updater:
 
         time.sleep(1)
 
+    @staticmethod
+    def _create_session():
+        """Returns a session that keeps the connection open between requests and tries failed connections and server
+        errors again"""
+        retry = Retry(total=RETRIES, backoff_factor=RETRY_BACKOFF, status_forcelist=(429, 500, 502, 503, 504))
+        adapter = HTTPAdapter(max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @staticmethod
+    def _render_progress(bytes_done, total_length):
+        if not total_length:  # the server didn't send the size
+            return f"Downloaded {bytes_done / (1024 * 1024):.1f} MB"
+        p_bar_progress = int(50 * bytes_done / total_length)
+        p_bar_percentage = round((100 * bytes_done / total_length), 1)
+        return f"[{'═' * p_bar_progress + ' ' * (50 - p_bar_progress)}] {p_bar_percentage}%"
+
+    def _download(self):
+        """Downloads the binary to the .part file, hashing it while it is written. A .part file left by an interrupted
+        update is continued with a Range request, and so is a download interrupted now, up to RETRIES times
+
+        :raises requests.RequestException: If the download failed too often
+        :raises OSError: If the .part file could not be written
+        :return str: The SHA-256 of the downloaded file
+        """
+        sha256 = hashlib.sha256()
+        bytes_done = 0
+        if self.exec_path_part.exists():
+            with open(self.exec_path_part, 'rb') as partfile:
+                while chunk := partfile.read(CHUNK_SIZE):
+                    sha256.update(chunk)
+                    bytes_done += len(chunk)
+            self.print_info(f"Continuing the download after {bytes_done / (1024 * 1024):.1f} MB")
+        attempt = 0
+        while True:
+            headers = {'Range': f'bytes={bytes_done}-'} if bytes_done else {}
+            try:
+                with self.session.get(self.binary_url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT) as r:
+                    if r.status_code == 416:  # the .part file is complete or doesn't belong to this version
+                        self.print_debug("Range not satisfiable, restarting the download")
+                        sha256, bytes_done = hashlib.sha256(), 0
+                        self.exec_path_part.unlink()
+                        continue
+                    r.raise_for_status()
+                    if bytes_done and r.status_code != 206:  # the server ignored the range
+                        self.print_debug("Range not supported, restarting the download")
+                        sha256, bytes_done = hashlib.sha256(), 0
+                    total_length = self._total_length(r, bytes_done)
+                    progress = self.output.progress("Downloading", total_length, bytes_done, self._render_progress)
+                    with open(self.exec_path_part, 'ab' if bytes_done else 'wb') as partfile:
+                        for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                            partfile.write(chunk)
+                            sha256.update(chunk)
+                            bytes_done += len(chunk)
+                            progress.update(bytes_done)
+                    progress.close()
+                if total_length is not None and bytes_done < total_length:
+                    raise requests.ConnectionError(f"The connection was closed after {bytes_done} of {total_length} "
+                                                   f"bytes")
+                return sha256.hexdigest()
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as RE:
+                attempt += 1
+                if attempt > RETRIES:
+                    raise
+                self.report_warning(f"The download was interrupted, continuing in {RETRY_BACKOFF * 2 ** attempt} s: "
+                                    f"{RE}")
+                time.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+    def _download_or_abort(self):
+        """Calls Updater._download() and aborts if it fails
+
+        :return str: The SHA-256 of the downloaded file
+        """
+        try:
+            return self._download()
+        except requests.RequestException as RE:
+            self.report_error("An error occurred when downloading the latest binary. Run the update again to continue "
+                              "the download", RE, abort=True)
+        except OSError as OSE:
+            self.report_error("An error occurred when saving the temporary file. Please try again or manually download "
+                              "the newest version from GitHub and delete the temporary files.", OSE, abort=True)
+
+    @staticmethod
+    def _total_length(r, offset):
+        """Returns the size of the whole file or None if the server didn't send it
+
+        :param requests.Response r: The response to a request of the file, starting at offset if it is a 206
+        :param int offset: The number of bytes already downloaded
+        """
+        if r.status_code == 206:
+            match = re.fullmatch(r'bytes \d+-\d+/(\d+)', r.headers.get('content-range', ''))
+            if match is not None:
+                return int(match.group(1))
+        content_length = r.headers.get('content-length')
+        if content_length is None or not content_length.isdigit():
+            return None
+        return int(content_length) + (offset if r.status_code == 206 else 0)
+
     def update(self):
         self.print_info("Getting latest hash")
         self.print_info(f"Download source: {self.sha256_url}")
         try:
-            r_sha256 = requests.get(self.sha256_url)
+            r_sha256 = self.session.get(self.sha256_url, timeout=REQUEST_TIMEOUT)
+            r_sha256.raise_for_status()
             expected_hash = r_sha256.content.decode().strip()
             self.print_info(f"Latest build hash: {expected_hash}")
         except requests.RequestException as RE:
@@ -82,46 +204,29 @@ class Updater:
 
         self.print_info("Downloading binary")
         self.print_info(f"Download source: {self.binary_url}")
-        try:
-            r_binary = requests.get(self.binary_url, stream=True)
-            total_length = int(r_binary.headers.get('content-length'))
-            bytes_done = 0
-            response_list = []
-            for chunk in r_binary.iter_content(chunk_size=4096):
-                bytes_done += len(chunk)
-                response_list.append(chunk)
-                p_bar_progress = int(50 * bytes_done / total_length)
-                p_bar_percentage = round((100 * bytes_done / total_length), 1)
-                self.print_info(f"\r[{'═' * p_bar_progress + ' ' * (50 - p_bar_progress)}] {p_bar_percentage}%", end='',
-                                flush=True)
-            self.print_info("")
-        except requests.RequestException as RE:
-            self.report_error("An error occurred when downloading the latest binary", RE, abort=True)
+        downloaded_hash = self._download_or_abort()
 
-        # noinspection PyUnboundLocalVariable
-        downloaded_data = b''.join(response_list)
         self.print_info("Verifying hashes")
-        if expected_hash is None:
-            pass
-        elif expected_hash != hashlib.sha256(downloaded_data).hexdigest():
+        if expected_hash is not None and expected_hash != downloaded_hash and self.exec_path_part.exists():
+            # the continued .part file may have been left by another version, and without content-length a closed
+            # connection can't be told apart from the end of the file, so the whole file is downloaded once more
+            self.report_warning("The downloaded file does not match the latest build hash. Downloading it again")
+            try:
+                self.exec_path_part.unlink()
+            except OSError as OSE:
+                self.report_error("An error occurred when removing the temporary file", OSE, abort=True)
+            downloaded_hash = self._download_or_abort()
+        if expected_hash is not None and expected_hash != downloaded_hash:
             if not self.confirm("The latest build hash does not match the downloaded file. The file may be compromised."
                                 " Only proceed if you know what you are doing. Do you still want to update? "
                                 "(NOT RECOMMENDED)"):
+                # not continued by the next update, since it is complete or broken
+                self.exec_path_part.unlink(missing_ok=True)
                 self.abort()
+        elif expected_hash is not None:
+            self.print_info("Hashes match")
 
-        self.print_info("Hashes match. Writing data to file")
-        try:  # saving downloaded file as .exe.new
-            if self.exec_path_new.exists():
-                if not self.confirm(f"{self.exec_path_new.name} exists. Do you want to overwrite?"):
-                    self.abort()
-
-            with open(self.exec_path_new, 'wb') as newfile:
-                newfile.write(downloaded_data)
-            self.print_info(f"Saved as {self.exec_path_new.name}")
-        except OSError as OSE:
-            self.report_error("An error occurred when saving the temporary file. Please try again or manually download "
-                              "the newest version from GitHub and delete the temporary files.", OSE, abort=True)
-
+        self._rename(self.exec_path_part, self.exec_path_new)  # renaming .exe.part -> .exe.new
         self._rename(self.exec_path, self.exec_path_old)  # renaming .exe -> .exe.old
         self._rename(self.exec_path_new, self.exec_path)  # renaming .exe.new -> .exe
 
@@ -132,10 +237,11 @@ class Updater:
             self.report_error("An error occurred when removing the temporary file. Please try again or remove the file "
                               "manually", OSE)
 
-        self.print_info("Update complete. Press Enter to exit", end='', flush=True)
+        self.print_info("Update complete. Press Enter to exit", end='')
         self.print_info("")
         sys.exit()
 
 
 if __name__ == '__main__':
-    Updater()
+    # literal_eval to convert str representation of a dict to a dict
+    Updater(Path(sys.argv[1]), literal_eval(sys.argv[2])).update()
@@ -0,0 +1,96 @@
+import os
+import fnmatch
+
+# seconds the size and modification time of a file must stay the same before it is converted, so files that are still
+# being written by DROID or copied into the folder are not read
+SETTLE = 5.0
+# files in the watched folder that are converted
+PATTERN = '*.csv'
+
+
+class Watcher:
+    """Finds new and changed files in a folder by scanning it, since notifications are not reliable on network drives.
+    A file is only returned once it stopped changing for settle seconds and only again if it changes afterwards
+
+    :param pathlib.Path directory: The watched folder; subfolders are not scanned
+    :param float settle: Seconds a file must stay unchanged
+    :param str pattern: Names of the files that are returned
+    """
+    def __init__(self, directory, settle=SETTLE, pattern=PATTERN):
+        self.directory = directory
+        self.settle = settle
+        self.pattern = pattern
+        self._changing = {}  # name: (signature, time the signature was first seen)
+        self._returned = {}  # name: signature when it was returned
+
+    def poll(self, now):
+        """Scans the folder once
+
+        :param float now: The current time.monotonic()
+        :raises OSError: If the folder can't be scanned
+        :return list[tuple[pathlib.Path, tuple[int, int]]]: The files that are ready, with their size and modification
+            time, ordered by name
+        """
+        ready = []
+        present = set()
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                # outputs of droid-csv are left out in case the output folder is the watched folder
+                if not fnmatch.fnmatch(entry.name.casefold(), self.pattern) \
+                        or entry.name.casefold().endswith('_output.csv'):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue  # removed while scanning
+                present.add(entry.name)
+                signature = (stat.st_size, stat.st_mtime_ns)
+                if self._returned.get(entry.name) == signature:
+                    continue
+                changing = self._changing.get(entry.name)
+                if changing is None or changing[0] != signature:
+                    self._changing[entry.name] = (signature, now)
+                elif now - changing[1] >= self.settle:
+                    del self._changing[entry.name]
+                    self._returned[entry.name] = signature
+                    ready.append((self.directory / entry.name, signature))
+        # files that were removed are returned again if they come back
+        for names in (self._changing, self._returned):
+            for name in names.keys() - present:
+                del names[name]
+        return sorted(ready)
+
+
+def up_to_date(src, destinations):
+    """Checks if one of the outputs of a file is newer than it, e.g. because it was converted before the watch was
+    restarted
+
+    :param pathlib.Path src: The input file
+    :param typing.Iterable[pathlib.Path] destinations: Its output file and error file
+    :return bool: Whether one of them is newer
+    """
+    try:
+        modified = src.stat().st_mtime_ns
+    except OSError:
+        return False
+    for dst in destinations:
+        try:
+            if dst.stat().st_mtime_ns >= modified:
+                return True
+        except OSError:
+            pass  # doesn't exist
+    return False
+
+
+def write_error(path, src, text, error):
+    """Writes why a file could not be converted to a text file in the output folder
+
+    :param pathlib.Path path: Path to the error file
+    :param pathlib.Path src: The input file
+    :param str text: What went wrong
+    :param str error: The error message
+    :raises OSError: If the file can't be written
+    """
+    path.write_text(f"{src.name}\n{text}\n{error}\n", encoding='utf8')